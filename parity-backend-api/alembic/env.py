@@ -17,6 +17,13 @@ from models.module import Module
 from models.user_progress import UserProgress
 from models.affirmation import Affirmation
 from models.affirmation_template import AffirmationTemplate
+from models.user_stats import UserStats
+from models.affirmation_delivery import AffirmationDelivery
+from models.scheduled_affirmation import ScheduledAffirmation
+from models.cache_version import CacheVersion
+from models.ttl_entry import TTLEntry
+from models.user_document import UserDocument, UserDocumentSection
+from models.rate_limit_bucket import RateLimitBucket
 
 config = context.config
 
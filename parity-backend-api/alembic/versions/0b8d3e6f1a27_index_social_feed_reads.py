@@ -0,0 +1,29 @@
+"""Index the social feed, comment and gesture reads
+
+Revision ID: 0b8d3e6f1a27
+Revises: f47b2e9d1c63
+Create Date: 2026-10-19 14:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0b8d3e6f1a27'
+down_revision: Union[str, None] = 'f47b2e9d1c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_created_at', 'posts', ['created_at'], unique=False)
+    op.create_index('ix_comments_post_id_created_at', 'comments', ['post_id', 'created_at'], unique=False)
+    op.create_index('ix_caring_gestures_post_id_created_at', 'caring_gestures', ['post_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_caring_gestures_post_id_created_at', table_name='caring_gestures')
+    op.drop_index('ix_comments_post_id_created_at', table_name='comments')
+    op.drop_index('ix_posts_created_at', table_name='posts')
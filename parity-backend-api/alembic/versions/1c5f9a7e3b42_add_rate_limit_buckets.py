@@ -0,0 +1,32 @@
+"""Add shared rate limit buckets
+
+Revision ID: 1c5f9a7e3b42
+Revises: 0b8d3e6f1a27
+Create Date: 2026-10-19 16:05:27.914032
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '1c5f9a7e3b42'
+down_revision: Union[str, None] = '0b8d3e6f1a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(length=128), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('refilled_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('ix_rate_limit_buckets_refilled_at', 'rate_limit_buckets', ['refilled_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rate_limit_buckets_refilled_at', table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,41 @@
+"""Add materialized user stats
+
+Revision ID: 3c7d2a91e5b4
+Revises: 8982078211c8
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def UUID():
+    return sa.String(36)
+
+
+revision: str = '3c7d2a91e5b4'
+down_revision: Union[str, None] = '8982078211c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_stats',
+    sa.Column('user_id', UUID(), nullable=False),
+    sa.Column('modules_completed', sa.Integer(), nullable=False),
+    sa.Column('progress_total', sa.Integer(), nullable=False),
+    sa.Column('progress_count', sa.Integer(), nullable=False),
+    sa.Column('posts_count', sa.Integer(), nullable=False),
+    sa.Column('affirmations_sent', sa.Integer(), nullable=False),
+    sa.Column('streak_days', sa.Integer(), nullable=False),
+    sa.Column('last_active_date', sa.Date(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats')
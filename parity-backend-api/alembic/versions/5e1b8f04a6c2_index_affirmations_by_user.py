@@ -0,0 +1,25 @@
+"""Index affirmations by user and creation time
+
+Revision ID: 5e1b8f04a6c2
+Revises: 3c7d2a91e5b4
+Create Date: 2026-10-19 10:04:17.552930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '5e1b8f04a6c2'
+down_revision: Union[str, None] = '3c7d2a91e5b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_affirmations_user_id_created_at', 'affirmations', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_affirmations_user_id_created_at', table_name='affirmations')
@@ -0,0 +1,43 @@
+"""Add affirmation delivery outbox
+
+Revision ID: a4f09c3d7e21
+Revises: 5e1b8f04a6c2
+Create Date: 2026-10-19 11:26:53.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def UUID():
+    return sa.String(36)
+
+
+revision: str = 'a4f09c3d7e21'
+down_revision: Union[str, None] = '5e1b8f04a6c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('affirmation_deliveries',
+    sa.Column('id', UUID(), nullable=False),
+    sa.Column('affirmation_id', UUID(), nullable=False),
+    sa.Column('channel', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['affirmation_id'], ['affirmations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_affirmation_deliveries_status_next_attempt_at', 'affirmation_deliveries', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_affirmation_deliveries_status_next_attempt_at', table_name='affirmation_deliveries')
+    op.drop_table('affirmation_deliveries')
@@ -0,0 +1,47 @@
+"""Add scheduled affirmations
+
+Revision ID: c81e5d2b9f37
+Revises: a4f09c3d7e21
+Create Date: 2026-10-19 12:41:08.771352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def UUID():
+    return sa.String(36)
+
+
+revision: str = 'c81e5d2b9f37'
+down_revision: Union[str, None] = 'a4f09c3d7e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('scheduled_affirmations',
+    sa.Column('id', UUID(), nullable=False),
+    sa.Column('user_id', UUID(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('template_id', UUID(), nullable=True),
+    sa.Column('sent_via', sa.String(length=50), nullable=False),
+    sa.Column('recipient_info', sa.JSON(), nullable=False),
+    sa.Column('scheduled_at', sa.DateTime(), nullable=True),
+    sa.Column('recurrence', sa.String(length=20), nullable=True),
+    sa.Column('last_sent_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['template_id'], ['affirmation_templates.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_scheduled_affirmations_scheduled_at', 'scheduled_affirmations', ['scheduled_at'], unique=False)
+    op.create_index('ix_scheduled_affirmations_user_id', 'scheduled_affirmations', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scheduled_affirmations_user_id', table_name='scheduled_affirmations')
+    op.drop_index('ix_scheduled_affirmations_scheduled_at', table_name='scheduled_affirmations')
+    op.drop_table('scheduled_affirmations')
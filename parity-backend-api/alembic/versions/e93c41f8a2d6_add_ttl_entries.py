@@ -0,0 +1,33 @@
+"""Add shared TTL store table
+
+Revision ID: e93c41f8a2d6
+Revises: d2a6b7e40c58
+Create Date: 2026-10-19 14:52:10.386471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e93c41f8a2d6'
+down_revision: Union[str, None] = 'd2a6b7e40c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ttl_entries',
+    sa.Column('namespace', sa.String(length=50), nullable=False),
+    sa.Column('key', sa.String(length=128), nullable=False),
+    sa.Column('value', sa.JSON(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('namespace', 'key')
+    )
+    op.create_index('ix_ttl_entries_expires_at', 'ttl_entries', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ttl_entries_expires_at', table_name='ttl_entries')
+    op.drop_table('ttl_entries')
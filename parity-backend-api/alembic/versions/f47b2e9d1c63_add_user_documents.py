@@ -0,0 +1,45 @@
+"""Add persisted user settings and profile documents
+
+Revision ID: f47b2e9d1c63
+Revises: e93c41f8a2d6
+Create Date: 2026-10-19 16:08:45.219037
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def UUID():
+    return sa.String(36)
+
+
+revision: str = 'f47b2e9d1c63'
+down_revision: Union[str, None] = 'e93c41f8a2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_documents',
+    sa.Column('user_id', UUID(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'name')
+    )
+    op.create_table('user_document_sections',
+    sa.Column('user_id', UUID(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('section', sa.String(length=50), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'name', 'section')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_document_sections')
+    op.drop_table('user_documents')
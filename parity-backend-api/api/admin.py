@@ -0,0 +1,40 @@
+"""
+API routes for operators: diagnostics that are not for app users.
+
+Every route needs the ``X-Admin-Key`` header to match ``ADMIN_API_KEY``;
+with no key configured the routes respond 404.
+"""
+
+import secrets
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from core import settings
+from core.slow_queries import slow_queries
+
+
+def require_admin_key(x_admin_key: Annotated[Optional[str], Header()] = None):
+    """Dependency that rejects requests without the admin key."""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin key.")
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin_key)])
+
+
+@router.get("/slow-queries")
+def get_slow_queries(limit: int = 50):
+    """Recorded slow statements, highest total time first, with parameters redacted."""
+    return {
+        "threshold_ms": slow_queries.threshold_ms,
+        "queries": slow_queries.entries()[:limit],
+    }
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def clear_slow_queries():
+    """Forget the recorded slow statements."""
+    slow_queries.clear()
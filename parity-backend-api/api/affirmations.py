@@ -2,50 +2,85 @@
 Affirmations API endpoints for sending positive affirmations.
 """
 
-from typing import List
+import base64
+from datetime import datetime
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from sqlalchemy import desc, or_
 
 from schemas.affirmation import (
     AffirmationTemplatePublic,
     AffirmationCreate,
-    AffirmationPublic
+    AffirmationPublic,
+    SentAffirmationPage,
+    ScheduledAffirmationCreate,
+    ScheduledAffirmationPublic
 )
 from models.affirmation import Affirmation
 from models.affirmation_template import AffirmationTemplate
+from models.scheduled_affirmation import ScheduledAffirmation
 from models.user import User
 from core.database import DbDependency
+from core.idempotency import IdempotentRoute
+from core.rate_limit import rate_limit
 from core.security import get_current_user
+from core.cache import etag_matches
+from core.compression import encoded_not_modified, encoded_response
+from core.responses import json_response
+from services.stats import bump_user_stats
+from services.delivery import enqueue_delivery, notify_dispatcher
+from services.scheduler import notify_scheduler, to_utc_naive
+from services.templates import template_cache
 
-router = APIRouter(prefix="/affirmations", tags=["Affirmations"])
+router = APIRouter(prefix="/affirmations", tags=["Affirmations"], route_class=IdempotentRoute)
 
 
 @router.get("/templates", response_model=List[AffirmationTemplatePublic])
 async def get_affirmation_templates(
+    request: Request,
     db: DbDependency,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    category: Optional[str] = None
 ):
-    """Get all affirmation templates."""
-    templates = db.query(AffirmationTemplate).filter(AffirmationTemplate.is_default == True).all()
-    return [AffirmationTemplatePublic.model_validate(template) for template in templates]
+    """Get the default affirmation templates, optionally for one category.
 
+    Served pre-serialized and pre-compressed from the template cache with
+    an ETag, so clients can revalidate with If-None-Match and get a 304.
+    """
+    templates = template_cache.get(db).lookup(category)
+    headers = {"ETag": templates.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), templates.etag):
+        return encoded_not_modified(request, templates.encoded, headers=headers)
+    return encoded_response(request, templates.body, templates.encoded, headers=headers)
 
-@router.post("/send", response_model=AffirmationPublic, status_code=status.HTTP_201_CREATED)
-async def send_affirmation(
-    affirmation: AffirmationCreate,
-    db: DbDependency,
-    current_user: User = Depends(get_current_user)
-):
-    """Send an affirmation."""
-    if affirmation.template_id:
+
+def check_template_exists(db, template_id: Optional[UUID]):
+    """Raise 404 if a template ID is given but unknown."""
+    if template_id:
         template = db.query(AffirmationTemplate).filter(
-            AffirmationTemplate.id == affirmation.template_id
+            AffirmationTemplate.id == template_id
         ).first()
         if not template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Affirmation template not found."
             )
+
+
+@router.post("/send", response_model=AffirmationPublic, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limit("affirmation_write"))])
+async def send_affirmation(
+    affirmation: AffirmationCreate,
+    db: DbDependency,
+    current_user: User = Depends(get_current_user)
+):
+    """Send an affirmation.
+
+    Off-app channels are only queued here; the delivery dispatcher sends
+    them in the background.
+    """
+    check_template_exists(db, affirmation.template_id)
     
     new_affirmation = Affirmation(
         user_id=current_user.id,
@@ -56,17 +91,134 @@ async def send_affirmation(
     )
     
     db.add(new_affirmation)
+    enqueue_delivery(db, new_affirmation)
+    bump_user_stats(db, current_user.id, affirmations_sent=1)
     db.commit()
     db.refresh(new_affirmation)
+    notify_dispatcher()
     
     return AffirmationPublic.model_validate(new_affirmation)
 
 
-@router.get("/sent", response_model=List[AffirmationPublic])
+def encode_cursor(created_at: datetime, affirmation_id: UUID) -> str:
+    """Encode a keyset position as an opaque URL-safe cursor."""
+    raw = f"{created_at.isoformat()}|{affirmation_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode a cursor produced by ``encode_cursor``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, affirmation_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(affirmation_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor."
+        )
+
+
+@router.get("/sent", response_model=SentAffirmationPage)
 async def get_sent_affirmations(
+    db: DbDependency,
+    current_user: User = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_recipient: bool = False
+):
+    """Get a page of the user's sent affirmations, newest first.
+
+    Pages are keyed on ``(created_at, id)`` so deep pages cost the same as
+    the first one; pass ``next_cursor`` back as ``cursor`` to continue.
+    """
+    columns = [
+        Affirmation.id,
+        Affirmation.content,
+        Affirmation.sent_via,
+        Affirmation.created_at,
+    ]
+    if include_recipient:
+        columns.append(Affirmation.recipient_info)
+
+    query = db.query(*columns).filter(Affirmation.user_id == current_user.id)
+    if cursor:
+        created_at, affirmation_id = decode_cursor(cursor)
+        # The redundant ``<=`` bound lets the planner seek the index range
+        query = query.filter(
+            Affirmation.created_at <= created_at,
+            or_(Affirmation.created_at < created_at, Affirmation.id < affirmation_id)
+        )
+
+    rows = query.order_by(
+        desc(Affirmation.created_at), desc(Affirmation.id)
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return json_response(SentAffirmationPage, {"items": rows, "next_cursor": next_cursor})
+
+
+@router.post("/schedule", response_model=ScheduledAffirmationPublic, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limit("affirmation_write"))])
+async def schedule_affirmation(
+    affirmation: ScheduledAffirmationCreate,
+    db: DbDependency,
+    current_user: User = Depends(get_current_user)
+):
+    """Schedule a one-off or recurring (daily/weekly) affirmation."""
+    check_template_exists(db, affirmation.template_id)
+    
+    scheduled = ScheduledAffirmation(
+        user_id=current_user.id,
+        content=affirmation.content,
+        template_id=affirmation.template_id,
+        sent_via=affirmation.sent_via,
+        recipient_info=affirmation.recipient_info,
+        scheduled_at=to_utc_naive(affirmation.scheduled_at),
+        recurrence=affirmation.recurrence
+    )
+    
+    db.add(scheduled)
+    db.commit()
+    db.refresh(scheduled)
+    notify_scheduler(scheduled.id, scheduled.scheduled_at)
+    
+    return ScheduledAffirmationPublic.model_validate(scheduled)
+
+
+@router.get("/scheduled", response_model=List[ScheduledAffirmationPublic])
+async def get_scheduled_affirmations(
+    db: DbDependency,
+    current_user: User = Depends(get_current_user)
+):
+    """Get the user's upcoming scheduled affirmations."""
+    schedules = db.query(ScheduledAffirmation).filter(
+        ScheduledAffirmation.user_id == current_user.id,
+        ScheduledAffirmation.scheduled_at.isnot(None)
+    ).order_by(ScheduledAffirmation.scheduled_at).all()
+    return json_response(List[ScheduledAffirmationPublic], schedules)
+
+
+@router.delete("/scheduled/{schedule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_scheduled_affirmation(
+    schedule_id: UUID,
     db: DbDependency,
     current_user: User = Depends(get_current_user)
 ):
-    """Get user's sent affirmations."""
-    affirmations = db.query(Affirmation).filter(Affirmation.user_id == current_user.id).all()
-    return [AffirmationPublic.model_validate(affirmation) for affirmation in affirmations]
+    """Cancel a scheduled affirmation."""
+    schedule = db.query(ScheduledAffirmation).filter(
+        ScheduledAffirmation.id == schedule_id,
+        ScheduledAffirmation.user_id == current_user.id
+    ).first()
+    if not schedule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scheduled affirmation not found."
+        )
+    
+    schedule.scheduled_at = None
+    db.commit()
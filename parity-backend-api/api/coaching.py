@@ -13,6 +13,9 @@ from models.user_progress import UserProgress
 from models.user import User
 from core.database import DbDependency
 from core.security import get_current_user
+from core.responses import json_response, json_rows_response
+from services.stats import bump_user_stats
+from services.read_models import coaching_modules
 
 router = APIRouter(prefix="/coaching", tags=["AI Coaching"])
 
@@ -23,8 +26,7 @@ async def get_modules(
     current_user: User = Depends(get_current_user)
 ):
     """Get all available coaching modules."""
-    modules = db.query(Module).order_by(Module.order).all()
-    return [ModulePublic.model_validate(module) for module in modules]
+    return json_rows_response(coaching_modules(db))
 
 
 @router.get("/modules/{module_id}", response_model=ModulePublic)
@@ -50,7 +52,7 @@ async def get_user_progress(
 ):
     """Get current user's progress on all modules."""
     progress = db.query(UserProgress).filter(UserProgress.user_id == current_user.id).all()
-    return [UserProgressPublic.model_validate(p) for p in progress]
+    return json_response(List[UserProgressPublic], progress)
 
 
 @router.post("/modules/{module_id}/progress", response_model=UserProgressPublic)
@@ -81,6 +83,12 @@ async def update_module_progress(
             completed=False
         )
         db.add(progress)
+        started = 1
+    else:
+        started = 0
+    
+    previous_percentage = progress.progress_percentage
+    previously_completed = progress.completed
     
     progress.progress_percentage = progress_update.progress_percentage
     progress.completed = progress_update.completed
@@ -88,6 +96,13 @@ async def update_module_progress(
     if progress_update.completed and not progress.completed_at:
         progress.completed_at = datetime.utcnow()
     
+    bump_user_stats(
+        db,
+        current_user.id,
+        progress_count=started,
+        progress_total=progress_update.progress_percentage - previous_percentage,
+        modules_completed=int(progress_update.completed) - int(previously_completed)
+    )
     db.commit()
     db.refresh(progress)
     
@@ -6,7 +6,8 @@ from fastapi import APIRouter, HTTPException, status
 
 from core import DbDependency, CurrentUserDependency
 from models.user import User
-from schemas.user import PartnerLink, UserPublic
+from schemas.user import PartnerLink, UserPublic, PartnerDashboard
+from services.partner_dashboard import load_dashboard_slices
 
 router = APIRouter(prefix="/partner", tags=["Partner Management"])
 
@@ -56,6 +57,28 @@ def link_with_partner(partner_data: PartnerLink, current_user: CurrentUserDepend
     return {"message": f"Successfully linked with user {target_partner.email}."}
 
 
+@router.get("/dashboard", response_model=PartnerDashboard)
+def get_partner_dashboard(current_user: CurrentUserDependency, db: DbDependency):
+    """
+    Returns both partners' coaching progress and recent affirmations.
+    Both users are loaded together, one query per table, and cached until either writes.
+    """
+    if not current_user.partner_id:
+        raise HTTPException(status_code=404, detail="You are not linked with a partner.")
+
+    slices = load_dashboard_slices(db, [current_user.id, current_user.partner_id])
+
+    def member(user_id):
+        data = slices[user_id]
+        return {
+            "user_id": user_id,
+            "progress": data.progress,
+            "recent_affirmations": data.recent_affirmations,
+        }
+
+    return {"me": member(current_user.id), "partner": member(current_user.partner_id)}
+
+
 @router.get("/me", response_model=UserPublic)
 def read_users_me(current_user: CurrentUserDependency):
     """
@@ -5,7 +5,6 @@ Social feed API endpoints for anonymous posts, likes, comments, and caring gestu
 from typing import List
 from uuid import UUID
 from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy import desc
 
 from schemas.social import (
     PostCreate,
@@ -21,12 +20,18 @@ from models.comment import Comment
 from models.caring_gesture import CaringGesture
 from models.user import User
 from core.database import DbDependency, get_db
+from core.idempotency import IdempotentRoute
+from core.rate_limit import rate_limit
 from core.security import get_current_user
+from core.responses import json_rows_response
+from services.stats import bump_user_stats
+from services.read_models import feed_posts, post_comments, post_caring_gestures
 
-router = APIRouter(prefix="/social", tags=["Social Feed"])
+router = APIRouter(prefix="/social", tags=["Social Feed"], route_class=IdempotentRoute)
 
 
-@router.post("/posts", response_model=PostPublic, status_code=status.HTTP_201_CREATED)
+@router.post("/posts", response_model=PostPublic, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limit("social_write", by="anonymous_id"))])
 async def create_post(
     post: PostCreate,
     db: DbDependency,
@@ -39,6 +44,7 @@ async def create_post(
     )
     
     db.add(new_post)
+    bump_user_stats(db, current_user.id, posts_count=1)
     db.commit()
     db.refresh(new_post)
     
@@ -53,11 +59,11 @@ async def get_posts(
     offset: int = 0
 ):
     """Get paginated feed of anonymous posts."""
-    posts = db.query(Post).order_by(desc(Post.created_at)).limit(limit).offset(offset).all()
-    return [PostPublic.model_validate(post) for post in posts]
+    return json_rows_response(feed_posts(db, limit, offset))
 
 
-@router.post("/posts/{post_id}/like", status_code=status.HTTP_200_OK)
+@router.post("/posts/{post_id}/like", status_code=status.HTTP_200_OK,
+             dependencies=[Depends(rate_limit("like", by="anonymous_id"))])
 async def toggle_like(
     post_id: UUID,
     db: DbDependency,
@@ -94,7 +100,8 @@ async def toggle_like(
     return {"message": message, "like_count": post.like_count}
 
 
-@router.post("/posts/{post_id}/comments", response_model=CommentPublic, status_code=status.HTTP_201_CREATED)
+@router.post("/posts/{post_id}/comments", response_model=CommentPublic, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limit("social_write", by="anonymous_id"))])
 async def create_comment(
     post_id: UUID,
     comment: CommentCreate,
@@ -117,6 +124,7 @@ async def create_comment(
     
     db.add(new_comment)
     post.comment_count += 1
+    bump_user_stats(db, current_user.id)
     db.commit()
     db.refresh(new_comment)
     
@@ -130,11 +138,11 @@ async def get_comments(
     current_user: User = Depends(get_current_user)
 ):
     """Get comments for a post."""
-    comments = db.query(Comment).filter(Comment.post_id == post_id).order_by(Comment.created_at).all()
-    return [CommentPublic.model_validate(comment) for comment in comments]
+    return json_rows_response(post_comments(db, post_id))
 
 
-@router.post("/posts/{post_id}/gestures", response_model=CaringGesturePublic, status_code=status.HTTP_201_CREATED)
+@router.post("/posts/{post_id}/gestures", response_model=CaringGesturePublic, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limit("social_write", by="anonymous_id"))])
 async def send_caring_gesture(
     post_id: UUID,
     gesture: CaringGestureCreate,
@@ -157,6 +165,7 @@ async def send_caring_gesture(
     
     db.add(new_gesture)
     post.caring_gesture_count += 1
+    bump_user_stats(db, current_user.id)
     db.commit()
     db.refresh(new_gesture)
     
@@ -170,5 +179,4 @@ async def get_caring_gestures(
     current_user: User = Depends(get_current_user)
 ):
     """Get caring gestures for a post."""
-    gestures = db.query(CaringGesture).filter(CaringGesture.post_id == post_id).order_by(CaringGesture.created_at).all()
-    return [CaringGesturePublic.model_validate(gesture) for gesture in gestures]
+    return json_rows_response(post_caring_gestures(db, post_id))
@@ -4,25 +4,42 @@ API routes for user registration and authentication.
 
 from datetime import datetime, timedelta
 from typing import Annotated, Dict, Any, Optional
+import hashlib
+import logging
 import secrets
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
 
 from core import settings, verify_password, get_password_hash, create_access_token
 from core.security import get_current_user
-from core.database import get_db, DbDependency
+from core.rate_limit import enforce, rate_limit
+from core.ttl_store import create_ttl_store
+from core.database import get_db, DbDependency, SessionLocal, insert_ignoring_conflicts
 from models.user import User
-from schemas.user import UserCreate, UserPublic
+from schemas.user import UserCreate, UserPublic, UserStatsPublic
 from schemas.auth import Token
+from core.cache import etag_matches
+from services.email import build_message, get_email_sender
+from services.stats import get_user_stats
+from services.user_documents import (
+    SETTINGS,
+    PROFILE,
+    DOCUMENT_SECTIONS,
+    VersionConflict,
+    load_document,
+    write_document,
+    render_settings,
+    render_profile,
+    document_etag,
+    parse_if_match
+)
 import uuid
 from datetime import datetime, timezone
 
 router = APIRouter(prefix="/users", tags=["Users & Authentication"])
+logger = logging.getLogger("parity.auth")
 
 
 # Data models for settings and profile
@@ -65,49 +82,61 @@ def get_user_by_email(db, email: str):
     return db.query(User).filter(User.email == email).first()
 
 
-def create_user(db, user: UserCreate) -> User:
-    """Creates a new user in the database."""
+def create_user(db, user: UserCreate) -> Optional[uuid.UUID]:
+    """
+    Creates a new user with a single INSERT.
+    Returns None if the email is already registered.
+    """
     hashed_password = get_password_hash(user.password)
-    db_user = User(email=user.email, hashed_password=hashed_password)
-    db.add(db_user)
+    user_id = uuid.uuid4()
+    stmt = insert_ignoring_conflicts(db.get_bind(), User.__table__, ["email"]).values(
+        id=user_id,
+        email=user.email,
+        hashed_password=hashed_password
+    )
+    if not db.execute(stmt).rowcount:
+        db.rollback()
+        return None
     db.commit()
-    db.refresh(db_user)
-    return db_user
+    return user_id
 
 
-@router.post("/register", response_model=UserPublic, status_code=status.HTTP_201_CREATED)
+@router.post("/register", response_model=UserPublic, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limit("auth", by="ip"))])
 def register_user(user: UserCreate, db: DbDependency):
     """
-    Register a new user with database storage
+    Register a new user with database storage.
+    The unique email index decides races, so concurrent sign-ups get a 400, not a 500.
     """
-    existing_user = get_user_by_email(db, user.email)
-    if existing_user:
+    user_id = create_user(db, user)
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    db_user = create_user(db, user)
-    
-    return UserPublic(
-        id=str(db_user.id),
-        email=db_user.email,
-        partner_id=str(db_user.partner_id) if db_user.partner_id else None
-    )
+    return UserPublic(id=user_id, email=user.email, partner_id=None)
+
+
+def login_account_key(email: str) -> str:
+    """Rate-limit key for login attempts on one account, without the address itself."""
+    return "email:" + hashlib.sha256(email.strip().lower().encode()).hexdigest()
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(rate_limit("login", by="ip"))])
 def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: DbDependency
+    db: DbDependency,
+    response: Response,
 ):
     """
     Login user with database authentication
     """
-    print(f"Login attempt received: email={form_data.username}, password_length={len(form_data.password) if form_data.password else 0}")
-    
+    # Per account as well as per IP, so rotating addresses does not help
+    enforce("login_account", login_account_key(form_data.username), response)
     user = get_user_by_email(db, form_data.username)
     if not user:
+        logger.info("login failed", extra={"reason": "unknown_email"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -115,6 +144,7 @@ def login_for_access_token(
         )
     
     if not verify_password(form_data.password, user.hashed_password):
+        logger.info("login failed", extra={"reason": "bad_password", "user_id": str(user.id)})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -122,8 +152,7 @@ def login_for_access_token(
         )
     
     access_token = create_access_token(data={"user_id": str(user.id)})
-    
-    print(f"Login successful for: {form_data.username}")
+    logger.info("login succeeded", extra={"user_id": str(user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -137,205 +166,248 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
     )
 
 
+@router.get("/me/stats", response_model=UserStatsPublic)
+def get_current_user_stats(db: DbDependency, current_user: User = Depends(get_current_user)):
+    """Get the current user's relationship analytics counters."""
+    return get_user_stats(db, current_user.id)
+
+
+def save_document(db, user_id, name: str, changes: Dict[str, Any], if_match: Optional[str], replace: bool = False):
+    """Validate section changes and write them, honouring If-Match."""
+    changes = {section: value for section, value in changes.items() if section != "stats"}
+    unknown = set(changes) - set(DOCUMENT_SECTIONS[name])
+    if unknown or any(value is not None and not isinstance(value, dict) for value in changes.values()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown or invalid {name} sections: {', '.join(sorted(unknown)) or 'values must be objects'}"
+        )
+    try:
+        expected_version = parse_if_match(if_match)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Malformed If-Match header."
+        )
+    try:
+        return write_document(db, user_id, name, changes, expected_version=expected_version, replace=replace)
+    except VersionConflict:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"The {name} were changed by another request. Reload and try again."
+        )
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client's cached copy is still current."""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+
 @router.put("/settings", response_model=Dict[str, Any])
 def update_user_settings(
     settings_update: SettingsUpdate, 
-    current_user = Depends(get_current_user)
+    response: Response,
+    db: DbDependency,
+    current_user = Depends(get_current_user),
+    if_match: Annotated[Optional[str], Header()] = None
 ):
-    """Update user settings."""
-    # In a real implementation, you would store this in the database
-    # For now, we'll just return the settings as received
+    """Replace user settings."""
+    document = save_document(db, current_user.id, SETTINGS, settings_update.settings.model_dump(), if_match, replace=True)
+    response.headers["ETag"] = document_etag(document.version)
     return {
         "success": True,
         "message": "Settings updated successfully",
-        "settings": settings_update.settings.dict()
+        "settings": render_settings(document)
     }
 
 
+@router.patch("/settings", response_model=UserSettings)
+def patch_user_settings(
+    patch: Dict[str, Any],
+    response: Response,
+    db: DbDependency,
+    current_user = Depends(get_current_user),
+    if_match: Annotated[Optional[str], Header()] = None
+):
+    """
+    Update user settings with a JSON merge patch (RFC 7386).
+    Only the sections named in the patch are rewritten; null removes a key.
+    """
+    document = save_document(db, current_user.id, SETTINGS, patch, if_match)
+    response.headers["ETag"] = document_etag(document.version)
+    return render_settings(document)
+
+
 @router.get("/settings", response_model=UserSettings)
 def get_user_settings(
+    request: Request,
+    response: Response,
+    db: DbDependency,
     current_user = Depends(get_current_user)
 ):
     """Get user settings."""
-    # In a real implementation, you would fetch this from the database
-    # For now, return default settings
-    return UserSettings(
-        notifications={
-            "pushNotifications": True,
-            "emailNotifications": False,
-            "partnerUpdates": True,
-            "weeklyInsights": True,
-            "soundEnabled": True
-        },
-        privacy={
-            "shareProgress": True,
-            "publicProfile": False,
-            "dataCollection": True,
-            "analyticsOptIn": False
-        },
-        preferences={
-            "darkMode": False,
-            "language": "English",
-            "hapticFeedback": True
-        },
-        security={
-            "biometricAuth": False,
-            "autoLock": False,
-            "twoFactorAuth": False
-        },
-        data={
-            "autoBackup": True,
-            "backupFrequency": "weekly",
-            "dataRetention": "1year"
-        },
-        accessibility={
-            "screenReader": False,
-            "highContrast": False,
-            "largeText": False
-        }
-    )
+    document = load_document(db, current_user.id, SETTINGS)
+    etag = document_etag(document.version)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return render_settings(document)
 
 
 @router.put("/profile", response_model=Dict[str, Any])
 def update_user_profile(
     profile_update: ProfileUpdate, 
-    current_user = Depends(get_current_user)
+    response: Response,
+    db: DbDependency,
+    current_user = Depends(get_current_user),
+    if_match: Annotated[Optional[str], Header()] = None
 ):
-    """Update user profile."""
-    # In a real implementation, you would store this in the database
-    # For now, we'll just return the profile as received
+    """Replace the user profile. The derived stats section is ignored."""
+    document = save_document(db, current_user.id, PROFILE, profile_update.profile.model_dump(), if_match, replace=True)
+    profile = render_profile(document, current_user, get_user_stats(db, current_user.id))
+    response.headers["ETag"] = document_etag(document.version, profile["stats"])
     return {
         "success": True,
         "message": "Profile updated successfully",
-        "profile": profile_update.profile.dict()
+        "profile": profile
     }
 
 
+@router.patch("/profile", response_model=UserProfile)
+def patch_user_profile(
+    patch: Dict[str, Any],
+    response: Response,
+    db: DbDependency,
+    current_user = Depends(get_current_user),
+    if_match: Annotated[Optional[str], Header()] = None
+):
+    """
+    Update the user profile with a JSON merge patch (RFC 7386).
+    Only the sections named in the patch are rewritten; null removes a key.
+    """
+    document = save_document(db, current_user.id, PROFILE, patch, if_match)
+    profile = render_profile(document, current_user, get_user_stats(db, current_user.id))
+    response.headers["ETag"] = document_etag(document.version, profile["stats"])
+    return profile
+
+
 @router.get("/profile", response_model=UserProfile)
 def get_user_profile(
+    request: Request,
+    response: Response,
+    db: DbDependency,
     current_user = Depends(get_current_user)
 ):
     """Get user profile."""
-    # In a real implementation, you would fetch this from the database
-    # For now, return default profile
-    return UserProfile(
-        personal={
-            "name": current_user.email.split('@')[0].title(),
-            "email": current_user.email,
-            "avatar": "👤",
-            "bio": "Supporting healthy relationships",
-            "location": "",
-            "joinDate": current_user.created_at.isoformat() if hasattr(current_user, 'created_at') and current_user.created_at else "2024-01-01T00:00:00Z"
-        },
-        relationship={
-            "status": "single",
-            "partnerId": None,
-            "relationshipStartDate": None,
-            "communicationGoals": [],
-            "relationshipType": "romantic"
-        },
-        stats={
-            "conversationsAnalyzed": 0,
-            "improvementScore": 0,
-            "streakDays": 0,
-            "partnersConnected": 0,
-            "badgesEarned": 0,
-            "totalPoints": 0
-        },
-        preferences={
-            "favoriteTopics": [],
-            "learningStyle": "visual",
-            "communicationLevel": "beginner",
-            "goals": [],
-            "interests": []
-        },
-        social={
-            "followers": 0,
-            "following": 0,
-            "posts": 0,
-            "reputation": 0,
-            "level": 1,
-            "isVerified": False,
-            "privacyLevel": "private"
-        }
-    )
+    document = load_document(db, current_user.id, PROFILE)
+    profile = render_profile(document, current_user, get_user_stats(db, current_user.id))
+    etag = document_etag(document.version, profile["stats"])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return profile
 
 
-# Password reset token storage (in production, use Redis or database)
-password_reset_tokens = {}
+# Password reset tokens, stored by SHA-256 digest so a leaked store cannot be replayed
+password_reset_tokens = create_ttl_store("password_reset", max_entries=settings.PASSWORD_RESET_MAX_TOKENS)
 
 
-def send_password_reset_email(email: str, reset_token: str):
-    """Send password reset email to user."""
-    try:
-        # In production, use proper email service like SendGrid, AWS SES, etc.
-        # For now, we'll just log the token (in production, send actual email)
-        print(f"Password reset token for {email}: {reset_token}")
-        print(f"Reset link: https://parity-app.com/reset-password?token={reset_token}")
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
-
-
-@router.post("/forgot-password", status_code=status.HTTP_200_OK)
-def forgot_password(request: ForgotPasswordRequest):
+def hash_reset_token(token: str) -> str:
+    """Digest under which a reset token is stored."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def send_password_reset_email(email: str, reset_token: str) -> bool:
     """
-    Initiate password reset process by sending reset email.
+    Queue the password reset email for the background sender.
+    Returns False if the send queue is full.
     """
-    # For testing, always return success message
+    reset_link = f"https://parity-app.com/reset-password?token={reset_token}"
+    message = build_message(
+        email,
+        "Reset your Parity password",
+        "We received a request to reset your Parity password.\n\n"
+        f"Open this link within {settings.PASSWORD_RESET_TOKEN_TTL_MINUTES} minutes to choose a new one:\n"
+        f"{reset_link}\n\n"
+        "If you didn't ask for this, you can ignore this email."
+    )
+    return get_email_sender().send(message)
+
+
+def start_password_reset(email: str) -> None:
+    """Store a reset token and queue the email if the address is registered.
+
+    Runs after the response is sent, so known and unknown addresses take
+    the same time to answer.
+    """
+    db = SessionLocal()
+    try:
+        user = get_user_by_email(db, email)
+    finally:
+        db.close()
+    if not user:
+        return
+
     # Generate secure reset token
     reset_token = secrets.token_urlsafe(32)
-    
-    # Store token with expiration (1 hour)
-    password_reset_tokens[reset_token] = {
-        "user_id": "mock-user-id",
-        "email": request.email,
-        "expires_at": datetime.utcnow() + timedelta(hours=1)
-    }
-    
-    # Send reset email
-    email_sent = send_password_reset_email(request.email, reset_token)
-    
-    if email_sent:
-        return {"message": "If an account with that email exists, a password reset link has been sent."}
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to send reset email. Please try again later."
-        )
+    password_reset_tokens.set(
+        hash_reset_token(reset_token),
+        {"user_id": str(user.id), "email": user.email},
+        ttl=settings.PASSWORD_RESET_TOKEN_TTL_MINUTES * 60
+    )
+
+    # Queue the reset email; delivery happens in the background
+    if not send_password_reset_email(user.email, reset_token):
+        password_reset_tokens.delete(hash_reset_token(reset_token))
+        logger.warning("password reset email dropped", extra={"user_id": str(user.id), "reason": "queue_full"})
+
+
+@router.post("/forgot-password", status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("auth", by="ip"))])
+def forgot_password(request: ForgotPasswordRequest, background_tasks: BackgroundTasks):
+    """
+    Initiate password reset process by sending reset email.
 
+    The lookup, token and email all happen after the response, which is
+    the same whether or not the address is registered.
+    """
+    background_tasks.add_task(start_password_reset, request.email)
+    return {"message": "If an account with that email exists, a password reset link has been sent."}
 
-@router.post("/reset-password", status_code=status.HTTP_200_OK)
-def reset_password(request: ResetPasswordRequest):
+
+@router.post("/reset-password", status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("auth", by="ip"))])
+def reset_password(request: ResetPasswordRequest, db: DbDependency):
     """
     Reset user password using valid reset token.
     """
-    # Check if token exists and is valid
-    if request.token not in password_reset_tokens:
+    # Validate new password before consuming the token
+    if len(request.new_password) < 8:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid or expired reset token."
+            detail="Password must be at least 8 characters long."
         )
     
-    token_data = password_reset_tokens[request.token]
-    
-    # Check if token has expired
-    if datetime.utcnow() > token_data["expires_at"]:
-        del password_reset_tokens[request.token]
+    # Tokens are single use: pop removes it atomically, across all workers
+    token_data = password_reset_tokens.pop(hash_reset_token(request.token))
+    if token_data is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Reset token has expired. Please request a new one."
+            detail="Invalid or expired reset token."
         )
     
-    # Validate new password
-    if len(request.new_password) < 8:
+    user = db.query(User).filter(User.id == uuid.UUID(token_data["user_id"])).first()
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Password must be at least 8 characters long."
+            detail="Invalid or expired reset token."
         )
     
-    # Remove used token
-    del password_reset_tokens[request.token]
+    user.hashed_password = get_password_hash(request.new_password)
+    db.commit()
     
     return {"message": "Password has been successfully reset. You can now log in with your new password."}
@@ -0,0 +1,6 @@
+"""
+Benchmarks for the Parity API.
+
+Run each module from the backend directory, e.g.
+``python -m bench.affirmations_history``.
+"""
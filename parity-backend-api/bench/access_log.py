@@ -0,0 +1,140 @@
+"""
+Benchmark the overhead of the structured access log.
+
+First times ``GET /users/me/stats`` (token check plus two queries) through
+the same routers as ``main.app``, calling the ASGI app directly so network
+and client costs don't dilute the result. Then times
+``AccessLogMiddleware`` around a no-op app, which isolates its cost from
+run-to-run noise in the full request. The cost is compared with the
+request time at the configured ``ACCESS_LOG_SAMPLE_RATE`` and when
+logging every request. Process CPU time is measured, so the writer
+thread's formatting counts too; records are written to /dev/null.
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from fastapi import FastAPI
+
+from api import users_router, partners_router
+from api.social import router as social_router
+from api.coaching import router as coaching_router
+from api.affirmations import router as affirmations_router
+from core.config import settings
+from core.access_log import AccessLogMiddleware, configure_logging, dropped_records, shutdown_logging
+from core.database import Base, SessionLocal, engine
+from core.security import create_access_token, get_password_hash
+from models.user import User
+
+# Target from the request: logging must cost less than this share of request time
+MAX_OVERHEAD = 0.02
+
+
+def build_app(sample_rate=None) -> FastAPI:
+    app = FastAPI()
+    for router in (users_router, partners_router, social_router, coaching_router, affirmations_router):
+        app.include_router(router)
+    if sample_rate is not None:
+        app.add_middleware(AccessLogMiddleware, sample_rate=sample_rate)
+    return app
+
+
+async def call(app, scope) -> int:
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(dict(scope), receive, send)
+    return status
+
+
+async def noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def time_requests(app, scope, count: int) -> float:
+    """Mean CPU seconds per request over ``count`` sequential requests.
+
+    Process CPU time includes the log writer thread, so formatting and
+    writing are counted even though they happen off the request path.
+    """
+    started = time.process_time()
+    for _ in range(count):
+        status = await call(app, scope)
+    assert status == 200, status
+    return (time.process_time() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user = User(email="bench-access-log@example.com", hashed_password=get_password_hash("benchmark"))
+    db.add(user)
+    db.commit()
+    token = create_access_token({"user_id": str(user.id)})
+    db.close()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/users/me/stats", "raw_path": b"/users/me/stats",
+        "root_path": "", "query_string": b"", "server": ("bench", 80), "client": ("127.0.0.1", 1),
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+    configure_logging(open(os.devnull, "w"))
+    rates = {f"sampled ({settings.ACCESS_LOG_SAMPLE_RATE:.0%})": settings.ACCESS_LOG_SAMPLE_RATE, "every request": 1.0}
+
+    async def best_of(app, count):
+        # The fastest round is the one least disturbed by the rest of the machine
+        results = []
+        for _ in range(args.rounds):
+            gc.collect()
+            results.append(await time_requests(app, scope, count))
+        return min(results)
+
+    async def run():
+        app = build_app()
+        await time_requests(app, scope, 200)  # warm up
+        request_time = await best_of(app, args.requests)
+        bare = await best_of(noop_app, args.requests * 20)
+        costs = {
+            name: await best_of(AccessLogMiddleware(noop_app, sample_rate=rate), args.requests * 20) - bare
+            for name, rate in rates.items()
+        }
+        return request_time, costs
+
+    try:
+        request_time, costs = asyncio.run(run())
+    finally:
+        shutdown_logging()
+
+    print(f"{'request':<16} {request_time * 1e6:9.1f} us")
+    failed = False
+    for name, cost in costs.items():
+        overhead = cost / request_time
+        failed = failed or overhead > MAX_OVERHEAD
+        print(f"{name:<16} {cost * 1e6:9.1f} us  {overhead * 100:5.2f}% of request time")
+    print(f"dropped log records: {dropped_records()}")
+    print("FAIL" if failed else "OK", f"(limit {MAX_OVERHEAD * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark the sent-affirmations history for a single heavy user.
+
+Compares loading the full history (the previous behaviour) with keyset
+pages from the ``(user_id, created_at)`` index, on a throwaway SQLite
+database unless ``DATABASE_URL`` is set.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from sqlalchemy import desc, or_
+
+from core.database import Base, SessionLocal, engine
+from core.security import get_password_hash
+from models.user import User
+from models.affirmation import Affirmation
+from models.affirmation_template import AffirmationTemplate  # noqa: F401 - FK target
+
+
+def seed(db, count: int) -> uuid.UUID:
+    """Insert one user with ``count`` affirmations in batches."""
+    user = User(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", hashed_password=get_password_hash("benchmark"))
+    db.add(user)
+    db.commit()
+
+    start = datetime.utcnow() - timedelta(seconds=count)
+    table = Affirmation.__table__
+    batch = []
+    for i in range(count):
+        batch.append({
+            "id": uuid.uuid4(),
+            "user_id": user.id,
+            "content": f"Affirmation number {i}",
+            "template_id": None,
+            "sent_via": "in-app",
+            "recipient_info": {"name": "Partner", "phone": "+15550000000", "note": "x" * 200},
+            "created_at": start + timedelta(seconds=i),
+        })
+        if len(batch) == 5000:
+            db.execute(table.insert(), batch)
+            batch.clear()
+    if batch:
+        db.execute(table.insert(), batch)
+    db.commit()
+    return user.id
+
+
+def full_history(db, user_id):
+    return db.query(Affirmation).filter(Affirmation.user_id == user_id).all()
+
+
+def keyset_page(db, user_id, limit, after=None):
+    query = db.query(
+        Affirmation.id, Affirmation.content, Affirmation.sent_via, Affirmation.created_at
+    ).filter(Affirmation.user_id == user_id)
+    if after:
+        created_at, affirmation_id = after
+        # The redundant ``<=`` bound lets the planner seek the index range
+        query = query.filter(
+            Affirmation.created_at <= created_at,
+            or_(Affirmation.created_at < created_at, Affirmation.id < affirmation_id)
+        )
+    return query.order_by(desc(Affirmation.created_at), desc(Affirmation.id)).limit(limit + 1).all()
+
+
+def timed(label, fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<36} {best * 1000:10.2f} ms  ({len(result)} rows)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        print(f"Seeding {args.rows} affirmations for one user...")
+        user_id = seed(db, args.rows)
+
+        timed("full history (ORM, all columns)", lambda: full_history(db, user_id), 1)
+        db.expunge_all()
+        first = timed("keyset first page", lambda: keyset_page(db, user_id, args.limit), args.repeat)
+
+        # Walk to the middle of the history, then time a deep page
+        row = first[args.limit - 1]
+        for _ in range(args.rows // (2 * args.limit)):
+            page = keyset_page(db, user_id, args.limit, (row.created_at, row.id))
+            row = page[args.limit - 1]
+        timed("keyset page at 50% depth", lambda: keyset_page(db, user_id, args.limit, (row.created_at, row.id)), args.repeat)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark response compression: CPU time against bytes saved.
+
+Builds representative JSON bodies with the response schemas (a 20- and a
+200-item feed page, a post's comments, the affirmation template list and a
+validation error) and compresses each with gzip and brotli at several
+levels. For every codec it reports the compressed size, the share saved
+and the CPU time per body, plus microseconds spent per kilobyte saved.
+The last table runs each body through ``CompressionMiddleware`` with the
+configured levels, against the same app without it.
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+from core.compression import ENCODINGS, CompressionMiddleware, brotli, compress
+from core.config import settings
+from schemas.affirmation import AffirmationTemplatePublic
+from schemas.social import CommentPublic, PostPublic
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 6, 11)
+
+
+def payloads():
+    start = datetime(2026, 1, 1)
+    posts = [
+        PostPublic(
+            id=uuid.uuid4(),
+            content=f"Post number {i}: " + "feeling grateful today " * (2 + i % 9),
+            anonymous_user_id=f"{i % 97:016x}",
+            created_at=start + timedelta(seconds=i * 37),
+            like_count=i % 13,
+            comment_count=i % 7,
+            caring_gesture_count=i % 5,
+        )
+        for i in range(200)
+    ]
+    post_id = uuid.uuid4()
+    comments = [
+        CommentPublic(
+            id=uuid.uuid4(),
+            post_id=post_id,
+            content=f"Sending you strength, comment {i}",
+            anonymous_user_id=f"{i % 31:016x}",
+            created_at=start + timedelta(minutes=i),
+        )
+        for i in range(50)
+    ]
+    categories = ("gratitude", "encouragement", "love", "support", "apology")
+    templates = [
+        AffirmationTemplatePublic(
+            id=uuid.uuid4(),
+            title=f"{category.title()} {i}",
+            content=f"I appreciate how you {category} me every day, especially when {i} things go wrong.",
+            category=category,
+        )
+        for category in categories
+        for i in range(8)
+    ]
+    error = b'{"detail":[{"type":"missing","loc":["body","content"],"msg":"Field required","input":null}]}'
+
+    return [
+        ("feed, 20 posts", TypeAdapter(List[PostPublic]).dump_json(posts[:20])),
+        ("feed, 200 posts", TypeAdapter(List[PostPublic]).dump_json(posts)),
+        ("50 comments", TypeAdapter(List[CommentPublic]).dump_json(comments)),
+        ("40 templates", TypeAdapter(List[AffirmationTemplatePublic]).dump_json(templates)),
+        ("validation error", error),
+    ]
+
+
+def best_cpu(fn, count: int, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        started = time.process_time()
+        for _ in range(count):
+            fn()
+        best = min(best, (time.process_time() - started) / count)
+    return best
+
+
+def codecs():
+    for level in GZIP_LEVELS:
+        yield f"gzip-{level}", "gzip", level
+    if brotli is not None:
+        for quality in BROTLI_QUALITIES:
+            yield f"br-{quality}", "br", quality
+
+
+def app_returning(body: bytes):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+async def call(app, accept_encoding: bytes) -> int:
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding)]}
+    await app(scope, receive, send)
+    return size
+
+
+async def best_call_cpu(app, accept_encoding: bytes, count: int, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        started = time.process_time()
+        for _ in range(count):
+            await call(app, accept_encoding)
+        best = min(best, (time.process_time() - started) / count)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50, help="compressions per timing round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("brotli is not installed; gzip only\n")
+
+    bodies = payloads()
+    for label, body in bodies:
+        print(f"{label}: {len(body):,} bytes")
+        for name, encoding, level in codecs():
+            compressed = compress(encoding, body, level)
+            saved = len(body) - len(compressed)
+            cpu = best_cpu(lambda: compress(encoding, body, level), args.repeat, args.rounds)
+            per_kb = f"{cpu * 1e6 / (saved / 1024):7.1f} us/KB saved" if saved > 0 else "     no saving"
+            print(f"  {name:<8} {len(compressed):>8,} bytes  {saved / len(body):6.1%} saved  "
+                  f"{cpu * 1e6:8.1f} us  {per_kb}")
+        print()
+
+    accept = ", ".join(ENCODINGS).encode()
+    print(f"CompressionMiddleware (Accept-Encoding: {accept.decode()}, min size {settings.COMPRESSION_MIN_SIZE}, "
+          f"gzip {settings.COMPRESSION_GZIP_LEVEL}, br {settings.COMPRESSION_BROTLI_QUALITY})")
+
+    async def run():
+        for label, body in bodies:
+            plain = app_returning(body)
+            compressed = CompressionMiddleware(plain)
+            sent = await call(compressed, accept)
+
+            plain_cpu = await best_call_cpu(plain, accept, args.repeat, args.rounds)
+            compressed_cpu = await best_call_cpu(compressed, accept, args.repeat, args.rounds)
+            print(f"  {label:<18} {len(body):>8,} -> {sent:>8,} bytes  "
+                  f"+{(compressed_cpu - plain_cpu) * 1e6:8.1f} us per response")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
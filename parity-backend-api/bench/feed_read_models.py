@@ -0,0 +1,115 @@
+"""
+Benchmark rendering the feed from ORM instances versus the read models.
+
+"orm" is the previous path: ``db.query(Post)`` hydrates full instances,
+which are validated into ``PostPublic`` and encoded. "read model" runs the
+Core select from ``services.read_models`` and encodes its partitions with
+``json_rows_response``. Reports CPU time and peak traced memory for 20,
+200 and 2,000 rows.
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from sqlalchemy import desc
+
+from core.database import Base, SessionLocal, engine
+from core.responses import json_rows_response, json_response
+from models.post import Post
+from schemas.social import PostPublic
+from services.read_models import feed_posts
+
+ROW_COUNTS = (20, 200, 2000)
+
+
+def seed(count: int) -> None:
+    start = datetime.utcnow() - timedelta(seconds=count)
+    db = SessionLocal()
+    db.execute(Post.__table__.insert(), [
+        {
+            "id": uuid.uuid4(),
+            "content": f"Post number {i}: " + "feeling grateful today " * 10,
+            "anonymous_user_id": f"{i % 97:016x}",
+            "created_at": start + timedelta(seconds=i),
+            "like_count": i % 13,
+            "comment_count": i % 7,
+            "caring_gesture_count": i % 5,
+            "is_moderated": False,
+        }
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+
+
+def render_orm(limit: int) -> bytes:
+    db = SessionLocal()
+    try:
+        posts = db.query(Post).order_by(desc(Post.created_at)).limit(limit).all()
+        return json_response(List[PostPublic], posts).body
+    finally:
+        db.close()
+
+
+def render_read_model(limit: int) -> bytes:
+    db = SessionLocal()
+    try:
+        return json_rows_response(feed_posts(db, limit, 0)).body
+    finally:
+        db.close()
+
+
+def cpu_time(fn, limit: int, repeat: int, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        started = time.process_time()
+        for _ in range(repeat):
+            fn(limit)
+        best = min(best, (time.process_time() - started) / repeat)
+    return best
+
+
+def peak_memory(fn, limit: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(limit)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    seed(max(ROW_COUNTS))
+    for limit in ROW_COUNTS:
+        assert render_orm(limit) == render_read_model(limit), "responses differ"
+        repeat = max(5, 4000 // limit)
+        orm_cpu = cpu_time(render_orm, limit, repeat, args.rounds)
+        read_cpu = cpu_time(render_read_model, limit, repeat, args.rounds)
+        orm_mem = peak_memory(render_orm, limit)
+        read_mem = peak_memory(render_read_model, limit)
+        print(
+            f"{limit:>5} rows  cpu orm {orm_cpu * 1000:7.2f} ms  read model {read_cpu * 1000:7.2f} ms "
+            f"({orm_cpu / read_cpu:3.1f}x)   peak mem orm {orm_mem / 1024:8.0f} KiB  "
+            f"read model {read_mem / 1024:8.0f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
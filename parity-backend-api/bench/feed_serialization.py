@@ -0,0 +1,137 @@
+"""
+Benchmark feed page serialization before and after the fast JSON path.
+
+"before" is the previous endpoint shape: ``PostPublic.model_validate`` per
+row, then FastAPI validates the list against ``response_model`` and
+encodes it with ``JSONResponse``. "after" returns
+``json_response(List[PostPublic], rows)``. Both serve 20- and 200-item
+pages through the ASGI app, once from rows already in memory (the
+serialization cost alone) and once including the feed query.
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from sqlalchemy import desc
+
+from core.database import Base, SessionLocal, engine
+from core.responses import json_response
+from models.post import Post
+from schemas.social import PostPublic
+
+PAGE_SIZES = (20, 200)
+
+
+def seed(count: int) -> None:
+    start = datetime.utcnow() - timedelta(seconds=count)
+    db = SessionLocal()
+    db.add_all(
+        Post(
+            content=f"Post number {i}: " + "feeling grateful today " * 10,
+            anonymous_user_id=f"{i % 97:016x}",
+            created_at=start + timedelta(seconds=i),
+            like_count=i % 13,
+            comment_count=i % 7,
+            caring_gesture_count=i % 5,
+        )
+        for i in range(count)
+    )
+    db.commit()
+    db.close()
+
+
+def load_page(limit: int) -> List[Post]:
+    db = SessionLocal()
+    try:
+        return db.query(Post).order_by(desc(Post.created_at)).limit(limit).all()
+    finally:
+        db.close()
+
+
+def build_app(preloaded) -> FastAPI:
+    app = FastAPI()
+
+    def rows(limit: int, query: bool):
+        return load_page(limit) if query else preloaded[limit]
+
+    @app.get("/before", response_model=List[PostPublic], response_class=JSONResponse)
+    def before(limit: int, query: bool = False):
+        return [PostPublic.model_validate(post) for post in rows(limit, query)]
+
+    @app.get("/after", response_model=List[PostPublic])
+    def after(limit: int, query: bool = False):
+        return json_response(List[PostPublic], rows(limit, query))
+
+    return app
+
+
+async def call(app, path: str, query_string: str) -> bytes:
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query_string.encode(), "headers": [], "server": ("bench", 80), "client": ("127.0.0.1", 1),
+    }
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+async def best_time(app, path, query_string, count, rounds) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        started = time.perf_counter()
+        for _ in range(count):
+            await call(app, path, query_string)
+        best = min(best, (time.perf_counter() - started) / count)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    seed(max(PAGE_SIZES))
+    app = build_app({size: load_page(size) for size in PAGE_SIZES})
+
+    async def run():
+        for size in PAGE_SIZES:
+            for query in (False, True):
+                query_string = f"limit={size}&query={str(query).lower()}"
+                before_body = await call(app, "/before", query_string)
+                after_body = await call(app, "/after", query_string)
+                assert before_body.replace(b" ", b"") == after_body.replace(b" ", b""), "responses differ"
+
+                before = await best_time(app, "/before", query_string, args.requests, args.rounds)
+                after = await best_time(app, "/after", query_string, args.requests, args.rounds)
+                label = f"{size:>3} posts{' + query' if query else ''}"
+                print(f"{label:<18} before {before * 1e6:9.1f} us   after {after * 1e6:9.1f} us   "
+                      f"{before / after:4.1f}x")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Report how long importing the app takes, from ``python -X importtime``.
+
+Imports ``main`` in fresh interpreters and keeps the fastest run. Prints
+the total, the slowest top-level packages by cumulative time and the
+modules with the most self time. With ``--max-ms`` the script exits with
+status 1 when the total exceeds the budget. ``tests/test_import_time.py``
+holds ``import main`` to ``BUDGET_MS``.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, NamedTuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget for ``import main`` under ``-X importtime``, which inflates it a
+# little: 1.0-1.5 s on a single shared vCPU, plus headroom for noise.
+# Lower it when an import gets cheaper, so the savings are kept
+BUDGET_MS = 2000.0
+
+
+class ImportEntry(NamedTuple):
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse(report: str) -> List[ImportEntry]:
+    """Entries of a ``-X importtime`` report, in the order printed."""
+    entries = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append(ImportEntry(module, depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure(module: str) -> List[ImportEntry]:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse(result.stderr)
+
+
+def total_us(entries: List[ImportEntry]) -> int:
+    """Time spent in the top-level imports of one run."""
+    return sum(entry.cumulative_us for entry in entries if entry.depth == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, help="fail if the import takes longer than this")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals = [total_us(run) for run in runs]
+    entries = runs[totals.index(min(totals))]
+    total_ms = min(totals) / 1000
+
+    # Top-level packages, each counted once at its shallowest import
+    packages: Dict[str, int] = {}
+    for entry in entries:
+        package = entry.module.split(".")[0]
+        if entry.module == package:
+            packages[package] = max(packages.get(package, 0), entry.cumulative_us)
+
+    print(f"import {args.module}: {total_ms:.1f} ms (best of {args.runs})\n")
+    print("Slowest packages (cumulative):")
+    for package, cumulative_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {package}")
+    print("\nMost self time:")
+    for entry in sorted(entries, key=lambda entry: -entry.self_us)[:args.top]:
+        print(f"  {entry.self_us / 1000:8.1f} ms  {entry.module}")
+
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"\nFAIL: {total_ms:.1f} ms exceeds the {args.max_ms:.1f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""
+End-to-end HTTP load test with a realistic traffic mix.
+
+Virtual users replay a weighted mix of the app's main flows: logging in,
+scrolling the feed, toggling likes, commenting, reading coaching modules
+and updating module progress. Each virtual user loops without think time
+(a closed loop), so ``--concurrency`` sets the load. Requests go through
+an ``httpx.AsyncClient`` whose keep-alive pool holds one connection per
+virtual user.
+
+By default the app runs in-process: ``main.app`` is served through
+``httpx.ASGITransport`` with its lifespan, against a throwaway SQLite
+database unless ``DATABASE_URL`` is set, and with rate limiting off.
+``--url`` targets a running server instead; raise its ``RATE_LIMITS``
+first, since every virtual user shares one client IP and the mix posts
+far more than a person would.
+
+Setup (registering ``--users`` users, logging them in and creating
+``--posts`` posts to act on) is not measured, nor is the first
+``--warmup`` seconds of traffic. The report gives, per route and overall,
+requests per second, p50/p95/p99 latency and the error rate (responses
+of 400 and above, and transport errors). ``--json`` writes the same
+results with the commit and settings, and ``--compare`` prints the
+change from a previous ``--json`` file.
+
+Usage:
+    python -m bench.load --duration 30 --concurrency 32 --json load.json
+    python -m bench.load --url http://localhost:8000 --compare load.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack
+from typing import Dict, List, Optional
+
+import httpx
+
+# Operation -> (method, route, default weight)
+OPERATIONS = {
+    "login": ("POST", "/users/login", 1),
+    "feed": ("GET", "/social/posts", 40),
+    "like": ("POST", "/social/posts/{post_id}/like", 15),
+    "comment": ("POST", "/social/posts/{post_id}/comments", 5),
+    "module": ("GET", "/coaching/modules/{module_id}", 15),
+    "progress": ("POST", "/coaching/modules/{module_id}/progress", 5),
+}
+PAGE_SIZE = 20
+# Chance that a feed read starts again from the top rather than scrolling on
+FEED_RESTART = 0.3
+PASSWORD = "load-test-password"
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, int]:
+    """Parse ``"feed=40,like=15,..."``; operations left out keep their default weight."""
+    mix = {name: weight for name, (_, _, weight) in OPERATIONS.items()}
+    for item in filter(None, (spec or "").split(",")):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS or not weight.isdigit():
+            raise SystemExit(f"Invalid mix entry {item!r}; operations are {', '.join(OPERATIONS)}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise SystemExit("The mix must give at least one operation a weight")
+    return mix
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    """Latencies and status codes per operation, once recording has started."""
+
+    def __init__(self):
+        self.recording = False
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, name: str, seconds: float, status: str) -> None:
+        if self.recording:
+            self.latencies[name].append(seconds)
+            self.statuses[name][status] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for name in sorted(self.latencies, key=list(OPERATIONS).index):
+            routes[name] = self._stats(self.latencies[name], self.statuses[name], elapsed)
+            routes[name] = {"method": OPERATIONS[name][0], "route": OPERATIONS[name][1], **routes[name]}
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        statuses = sum(self.statuses.values(), Counter())
+        return {"total": self._stats(everything, statuses, elapsed), "routes": routes}
+
+    @staticmethod
+    def _stats(latencies: List[float], statuses: Counter, elapsed: float) -> dict:
+        ordered = sorted(latencies)
+        errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400)
+        return {
+            "requests": len(ordered),
+            "rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            "errors": errors,
+            "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+            "status": dict(sorted(statuses.items())),
+        }
+
+
+class VirtualUser:
+    """One logged-in user stepping through the mix."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random,
+                 email: str, token: str, post_ids: List[str], module_ids: List[str]):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.email = email
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.post_ids = post_ids
+        self.module_ids = module_ids
+        self.offset = 0
+
+    async def request(self, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            self.recorder.add(name, time.perf_counter() - started, type(exc).__name__)
+            return None
+        self.recorder.add(name, time.perf_counter() - started, str(response.status_code))
+        return response
+
+    async def login(self):
+        response = await self.request("login", "POST", "/users/login",
+                                      data={"username": self.email, "password": PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def feed(self):
+        if self.rng.random() < FEED_RESTART:
+            self.offset = 0
+        response = await self.request("feed", "GET", "/social/posts", headers=self.headers,
+                                      params={"limit": PAGE_SIZE, "offset": self.offset})
+        if response is None or response.status_code != 200:
+            return
+        page = response.json()
+        self.offset = self.offset + PAGE_SIZE if len(page) == PAGE_SIZE else 0
+        if page:
+            # Act on what was scrolled past, like a person would
+            self.post_ids.append(self.rng.choice(page)["id"])
+            del self.post_ids[:-1000]
+
+    async def like(self):
+        post_id = self.rng.choice(self.post_ids)
+        await self.request("like", "POST", f"/social/posts/{post_id}/like", headers=self.headers)
+
+    async def comment(self):
+        post_id = self.rng.choice(self.post_ids)
+        await self.request("comment", "POST", f"/social/posts/{post_id}/comments", headers=self.headers,
+                           json={"content": f"Thinking of you {self.rng.randrange(10 ** 6)}"})
+
+    async def module(self):
+        module_id = self.rng.choice(self.module_ids)
+        await self.request("module", "GET", f"/coaching/modules/{module_id}", headers=self.headers)
+
+    async def progress(self):
+        module_id = self.rng.choice(self.module_ids)
+        percentage = self.rng.choice((10, 25, 50, 75, 100))
+        await self.request("progress", "POST", f"/coaching/modules/{module_id}/progress", headers=self.headers,
+                           json={"progress_percentage": percentage, "completed": percentage == 100})
+
+    async def run(self, mix: Dict[str, int], stop_at: float):
+        names, weights = list(mix), list(mix.values())
+        while time.monotonic() < stop_at:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = await client.get("/ready")
+        if response.status_code == 200:
+            return
+        if time.monotonic() > deadline:
+            raise SystemExit(f"/ready still answers {response.status_code} after {timeout:.0f}s")
+        await asyncio.sleep(0.2)
+
+
+async def set_up(client: httpx.AsyncClient, args, rng: random.Random):
+    """Create the users and posts the mix acts on; returns (users, post IDs, module IDs)."""
+    await wait_until_ready(client)
+    run_id = uuid.uuid4().hex[:8]
+    users = []
+    for i in range(args.users):
+        email = f"load-{run_id}-{i}@example.com"
+        response = await client.post("/users/register", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+        response = await client.post("/users/login", data={"username": email, "password": PASSWORD})
+        response.raise_for_status()
+        users.append((email, response.json()["access_token"]))
+
+    post_ids = []
+    for i in range(args.posts):
+        _, token = users[i % len(users)]
+        response = await client.post("/social/posts", headers={"Authorization": f"Bearer {token}"},
+                                     json={"content": f"Load test post {i}: " + "grateful today " * rng.randrange(1, 12)})
+        response.raise_for_status()
+        post_ids.append(response.json()["id"])
+
+    response = await client.get("/coaching/modules", headers={"Authorization": f"Bearer {users[0][1]}"})
+    response.raise_for_status()
+    module_ids = [module["id"] for module in response.json()]
+    return users, post_ids, module_ids
+
+
+async def run(args, mix: Dict[str, int]) -> dict:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with AsyncExitStack() as stack:
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+        else:
+            from main import app
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                       limits=limits, timeout=args.timeout)
+        await stack.enter_async_context(client)
+
+        users, post_ids, module_ids = await set_up(client, args, rng)
+        if not module_ids and (mix["module"] or mix["progress"]):
+            print("No coaching modules (run seed_data.py); leaving module reads and progress out of the mix")
+            mix = {**mix, "module": 0, "progress": 0}
+
+        recorder = Recorder()
+        stop_at = time.monotonic() + args.warmup + args.duration
+        virtual_users = [
+            VirtualUser(client, recorder, random.Random(rng.random()), *users[i % len(users)], post_ids, module_ids)
+            for i in range(args.concurrency)
+        ]
+        tasks = [asyncio.create_task(user.run(mix, stop_at)) for user in virtual_users]
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        started = time.monotonic()
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+
+    return {
+        "commit": git_commit(),
+        "target": args.url or "asgi",
+        "config": {
+            "duration": args.duration, "warmup": args.warmup, "concurrency": args.concurrency,
+            "users": args.users, "posts": args.posts, "seed": args.seed, "mix": mix,
+        },
+        "elapsed": round(elapsed, 2),
+        **recorder.summary(elapsed),
+    }
+
+
+def print_report(results: dict):
+    print(f"{results['target']} at {results['commit'] or 'unknown commit'}, "
+          f"{results['config']['concurrency']} virtual users for {results['elapsed']:.1f}s")
+    print(f"{'route':<10} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, stats in [*results["routes"].items(), ("total", results["total"])]:
+        print(f"{name:<10} {stats['requests']:>9} {stats['rps']:>8.1f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['error_rate']:>7.2%}")
+    failures = {status: count for status, count in results["total"]["status"].items()
+                if not status.isdigit() or int(status) >= 400}
+    if failures:
+        print("errors by status:", ", ".join(f"{status} x{count}" for status, count in failures.items()))
+
+
+def print_comparison(baseline: dict, results: dict):
+    print(f"\nchange from {baseline['target']} at {baseline['commit'] or 'unknown commit'}")
+    print(f"{'route':<10} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>9}")
+    rows = [(name, baseline["routes"].get(name), stats) for name, stats in results["routes"].items()]
+    for name, before, after in [*rows, ("total", baseline["total"], results["total"])]:
+        if not before:
+            continue
+        changes = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            changes.append(f"{(after[key] / before[key] - 1) * 100:+8.1f}%" if before[key] else f"{'n/a':>9}")
+        changes.append(f"{(after['error_rate'] - before['error_rate']) * 100:+8.2f}pp")
+        print(f"{name:<10} " + " ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server (default: the app in-process)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of measured traffic")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of unmeasured traffic first")
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual users")
+    parser.add_argument("--users", type=int, default=8, help="Accounts the virtual users share")
+    parser.add_argument("--posts", type=int, default=100, help="Posts created before the run")
+    parser.add_argument("--mix", help="Operation weights, e.g. feed=40,like=15 (operations: "
+                                      + ", ".join(f"{name}={weight}" for name, (_, _, weight) in OPERATIONS.items()) + ")")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the traffic mix")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results file from an earlier run to compare with")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    if not args.url:
+        # Every virtual user shares one client address
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+        if "DATABASE_URL" not in os.environ:
+            os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+            import main as _  # registers every model on Base
+            import models.cache_version, models.rate_limit_bucket  # noqa: F401 - imported lazily by the app
+            from core.database import Base, SessionLocal, engine
+            from seed_data import seed_coaching_modules
+
+            Base.metadata.create_all(engine)
+            with SessionLocal() as db:
+                seed_coaching_modules(db)
+
+    results = asyncio.run(run(args, mix))
+    print_report(results)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"\nwrote {args.json_path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
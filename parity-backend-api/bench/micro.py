@@ -0,0 +1,333 @@
+"""
+Micro-benchmarks for the hot functions, with a stored baseline and a
+regression gate.
+
+Covers authentication (``verify_password``, ``create_access_token``,
+``get_current_user``), the ``UUID`` TypeDecorator's bind and result
+processors on SQLite and PostgreSQL, ``User.anonymous_id``,
+``PostPublic`` validation, and the handler of each read endpoint run
+against a seeded database, each with a fresh session as in a request.
+The database is a throwaway SQLite file filled by ``generate_data``
+unless ``DATABASE_URL`` points at one that ``generate_data.py`` already
+filled.
+
+Each benchmark is calibrated to a number of calls per round that takes
+at least ``--min-round-ms``, then timed for ``--rounds`` rounds with the
+collector off. The fastest round is the one least disturbed by the rest
+of the machine, so comparisons use the per-call minimum.
+
+``--save`` stores the results as the baseline. ``--compare`` runs the
+benchmarks again and exits non-zero if any is more than ``--tolerance``
+slower than its baseline; the default of 25% allows for the noise of a
+shared machine, so tighten it on a quiet one. Baselines are only
+comparable on the machine that recorded them, so they are not checked
+in.
+
+Usage:
+    python -m bench.micro --save
+    python -m bench.micro --compare --tolerance 0.1
+    python -m bench.micro -k feed -k uuid
+"""
+
+import argparse
+import contextlib
+import gc
+import inspect
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+SEEDED = "DATABASE_URL" in os.environ
+if not SEEDED:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from starlette.requests import Request
+from starlette.responses import Response
+
+import main as _  # registers every model on Base
+import models.cache_version, models.rate_limit_bucket  # noqa: F401 - imported lazily by the app
+import generate_data
+from api.affirmations import get_affirmation_templates, get_scheduled_affirmations, get_sent_affirmations
+from api.coaching import get_module, get_modules, get_user_progress
+from api.partners import get_partner_dashboard
+from api.social import get_caring_gestures, get_comments, get_posts
+from api.users import get_current_user_stats, get_user_by_email, get_user_profile, get_user_settings
+from core.database import Base, SessionLocal, engine
+from core.security import create_access_token, get_current_user, get_password_hash, verify_password
+from core.slow_queries import slow_queries
+from models.module import Module
+from models.post import Post
+from models.user import User
+from models.user_stats import UserStats
+from schemas.social import PostPublic
+from services.partner_dashboard import dashboard_cache
+
+BASELINE = os.path.join(".benchmarks", "micro.json")
+SEED_ARGS = ["--users", "2000", "--posts", "20000"]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    fn: Callable[[], object]
+
+
+class Result(NamedTuple):
+    min_us: float
+    median_us: float
+    calls: int
+    rounds: int
+
+
+def run_handler(coroutine):
+    """Result of an async endpoint handler that never suspends, without an event loop.
+
+    The read handlers only await nothing, so a single ``send`` runs them to
+    completion; this keeps loop scheduling out of the measurement.
+    """
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("handler suspended; benchmark it through an event loop")
+
+
+def request(path: str) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": path, "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+    })
+
+
+def seed_database() -> None:
+    """Fill the throwaway database with a small ``generate_data`` dataset."""
+    Base.metadata.create_all(engine)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_data.generate(generate_data.build_parser().parse_args(
+            SEED_ARGS + ["--database-url", os.environ["DATABASE_URL"]]
+        ))
+
+
+def pick_fixtures():
+    """The user, partner and post the endpoint benchmarks act on: the busiest ones."""
+    with SessionLocal() as db:
+        user = db.scalars(
+            select(User).join(UserStats, UserStats.user_id == User.id)
+            .where(User.partner_id.isnot(None))
+            .order_by(UserStats.affirmations_sent.desc(), User.email).limit(1)
+        ).one()
+        post_id = db.scalar(select(Post.id).order_by(Post.comment_count.desc(), Post.id).limit(1))
+        module_id = db.scalar(select(Module.id).order_by(Module.title).limit(1))
+        db.expunge(user)
+    return user, post_id, module_id
+
+
+def benchmarks() -> List[Benchmark]:
+    user, post_id, module_id = pick_fixtures()
+    token = create_access_token({"user_id": str(user.id)})
+    password_hash = get_password_hash("benchmark-password")
+
+    uuid_type = User.__table__.c.id.type
+    value = uuid.uuid4()
+    processors = {}
+    for name, dialect in (("sqlite", sqlite.dialect()), ("postgresql", postgresql.dialect())):
+        bind = uuid_type.bind_processor(dialect) or (lambda v: v)
+        result = uuid_type.result_processor(dialect, None) or (lambda v: v)
+        stored = bind(value)
+        processors[name] = (bind, result, stored)
+
+    post = Post(
+        id=uuid.uuid4(), content="Feeling grateful today. " * 4, anonymous_user_id="0123456789abcdef",
+        created_at=datetime(2026, 1, 1), like_count=3, comment_count=2, caring_gesture_count=1,
+    )
+    post_dicts = [
+        {**PostPublic.model_validate(post).model_dump(), "id": str(uuid.uuid4()), "created_at": "2026-01-01T00:00:00"}
+        for _ in range(20)
+    ]
+    post_list = TypeAdapter(List[PostPublic])
+
+    def endpoint(handler, **kwargs):
+        """Call a handler as a request would: fresh session, current user loaded by id."""
+        is_async = inspect.iscoroutinefunction(handler)
+
+        def call():
+            with SessionLocal() as db:
+                current_user = db.get(User, user.id)
+                outcome = handler(db=db, current_user=current_user, **kwargs)
+                return run_handler(outcome) if is_async else outcome
+        return call
+
+    def partner_dashboard_uncached():
+        dashboard_cache.invalidate()
+        return endpoint(get_partner_dashboard)()
+
+    def current_user():
+        with SessionLocal() as db:
+            return get_current_user(token, db)
+
+    def login_lookup():
+        with SessionLocal() as db:
+            return get_user_by_email(db, user.email)
+
+    return [
+        Benchmark("security.verify_password", lambda: verify_password("benchmark-password", password_hash)),
+        Benchmark("security.create_access_token", lambda: create_access_token({"user_id": str(user.id)})),
+        Benchmark("security.get_current_user", current_user),
+        *[
+            bench
+            for name, (bind, result, stored) in processors.items()
+            for bench in (
+                Benchmark(f"uuid.bind[{name}]", lambda bind=bind: bind(value)),
+                Benchmark(f"uuid.result[{name}]", lambda result=result, stored=stored: result(stored)),
+            )
+        ],
+        Benchmark("user.anonymous_id", lambda: user.anonymous_id),
+        Benchmark("schema.PostPublic[orm]", lambda: PostPublic.model_validate(post)),
+        Benchmark("schema.PostPublic[20 dicts]", lambda: post_list.validate_python(post_dicts)),
+        Benchmark("users.login_lookup", login_lookup),
+        Benchmark("users.stats", endpoint(get_current_user_stats)),
+        Benchmark("users.settings", endpoint(get_user_settings, request=request("/users/settings"), response=Response())),
+        Benchmark("users.profile", endpoint(get_user_profile, request=request("/users/profile"), response=Response())),
+        Benchmark("social.feed[first page]", endpoint(get_posts, limit=20, offset=0)),
+        Benchmark("social.feed[offset 2000]", endpoint(get_posts, limit=20, offset=2000)),
+        Benchmark("social.comments", endpoint(get_comments, post_id=post_id)),
+        Benchmark("social.gestures", endpoint(get_caring_gestures, post_id=post_id)),
+        Benchmark("coaching.modules", endpoint(get_modules)),
+        Benchmark("coaching.module", endpoint(get_module, module_id=module_id)),
+        Benchmark("coaching.progress", endpoint(get_user_progress)),
+        Benchmark("affirmations.templates",
+                  endpoint(get_affirmation_templates, request=request("/affirmations/templates"), category=None)),
+        Benchmark("affirmations.sent", endpoint(get_sent_affirmations, limit=20, cursor=None, include_recipient=False)),
+        Benchmark("affirmations.scheduled", endpoint(get_scheduled_affirmations)),
+        Benchmark("partners.dashboard[cached]", endpoint(get_partner_dashboard)),
+        Benchmark("partners.dashboard[uncached]", partner_dashboard_uncached),
+    ]
+
+
+def measure(fn: Callable[[], object], rounds: int, min_round: float) -> Result:
+    """Per-call times over ``rounds`` rounds of at least ``min_round`` seconds each."""
+    fn()  # warm caches and lazy imports
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        if time.perf_counter() - started >= min_round:
+            break
+        calls *= 2
+
+    times = []
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for _ in range(calls):
+                fn()
+            times.append((time.perf_counter() - started) / calls)
+        finally:
+            gc.enable()
+    return Result(min(times) * 1e6, statistics.median(times) * 1e6, calls, rounds)
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "node": platform.node(),
+        "database": engine.dialect.name,
+    }
+
+
+def compare(baseline: dict, results: Dict[str, Result], tolerance: float) -> List[str]:
+    """Print each benchmark against the baseline; returns the names that regressed."""
+    if baseline.get("environment") != environment():
+        print(f"warning: baseline recorded on {baseline.get('environment')}, now {environment()}")
+    print(f"\n{'benchmark':<32} {'baseline us':>12} {'now us':>12} {'change':>9}")
+    regressed = []
+    for name, result in results.items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            print(f"{name:<32} {'':>12} {result.min_us:>12.2f} {'new':>9}")
+            continue
+        change = result.min_us / before["min_us"] - 1
+        verdict = ""
+        if change > tolerance:
+            verdict = "  REGRESSED"
+            regressed.append(name)
+        print(f"{name:<32} {before['min_us']:>12.2f} {result.min_us:>12.2f} {change:>+8.1%}{verdict}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", dest="patterns", action="append", default=[],
+                        help="Only run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--min-round-ms", type=float, default=20.0, help="Minimum duration of one round")
+    parser.add_argument("--baseline", default=BASELINE, help=f"Baseline file (default: {BASELINE})")
+    parser.add_argument("--save", action="store_true", help="Store the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Fail if a benchmark regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown before --compare fails, as a fraction (default: 0.25)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            parser.error(f"no baseline at {args.baseline}; record one with --save")
+
+    # Seeding and the slower endpoint calls would otherwise fill the slow-query log
+    slow_queries.threshold_ms = float("inf")
+    if not SEEDED:
+        print("Seeding a throwaway database...")
+        seed_database()
+
+    selected = [bench for bench in benchmarks() if not args.patterns or any(p in bench.name for p in args.patterns)]
+    results: Dict[str, Result] = {}
+    print(f"{'benchmark':<32} {'min us':>12} {'median us':>12} {'calls':>14}")
+    for bench in selected:
+        result = results[bench.name] = measure(bench.fn, args.rounds, args.min_round_ms / 1000)
+        print(f"{bench.name:<32} {result.min_us:>12.2f} {result.median_us:>12.2f} "
+              f"{f'{result.rounds}x{result.calls}':>14}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        stored = {}
+        if args.patterns and os.path.exists(args.baseline):
+            # Keep the benchmarks that were not run this time
+            with open(args.baseline) as f:
+                stored = json.load(f)["benchmarks"]
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "created": datetime.utcnow().isoformat(timespec="seconds"),
+                "environment": environment(),
+                "benchmarks": {**stored, **{name: result._asdict() for name, result in results.items()}},
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved baseline to {args.baseline}")
+
+    if baseline is not None:
+        regressed = compare(baseline, results, args.tolerance)
+        if regressed:
+            print(f"\nFAIL: {len(regressed)} benchmark(s) more than {args.tolerance:.0%} slower than the baseline")
+            sys.exit(1)
+        print(f"\nOK (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
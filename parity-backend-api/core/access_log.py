@@ -0,0 +1,227 @@
+"""
+Structured JSON logging with a background writer.
+
+Application loggers under ``parity`` hand records to a bounded
+``QueueHandler``, so a request only appends to a queue. A writer thread
+drains the queue in batches, formats each record as one JSON line and
+writes them to stdout. When the queue is full, records are dropped and
+counted rather than blocking the request.
+
+``AccessLogMiddleware`` writes one ``parity.access`` entry per request. It
+records the method, route template, status, latency and database time.
+Successful responses are sampled at ``ACCESS_LOG_SAMPLE_RATE``. Errors
+(status >= 400) and requests slower than ``ACCESS_LOG_SLOW_MS`` are always
+logged.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from .config import settings
+from .metrics import CallbackCounter, registry
+from .request_stats import RequestStats, install_request_stats, request_stats, route_template
+
+access_logger = logging.getLogger("parity.access")
+
+# Attributes every LogRecord has; anything else came from ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a single JSON object, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks and defers formatting to the listener."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that wakes up periodically and writes in batches.
+
+    Waking for every record makes the writer thread compete with request
+    threads for the GIL on each request; draining the queue every
+    ``interval`` seconds keeps that to one wakeup per batch.
+    """
+
+    def __init__(self, log_queue: queue.Queue, stream, interval: float = 0.2):
+        super().__init__(log_queue)
+        self.stream = stream
+        self.interval = interval
+        self.formatter = JsonFormatter()
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._monitor, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def flush(self) -> None:
+        lines = []
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                lines.append(json.dumps({"level": "error", "msg": "unformattable log record"}))
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+
+    def _monitor(self) -> None:
+        while not self._stopping.wait(self.interval):
+            self.flush()
+        self.flush()
+
+
+_listener: Optional[BatchingQueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(stream=None) -> None:
+    """Route the ``parity`` loggers through the queue and start the writer."""
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    _listener = BatchingQueueListener(_handler.queue, stream or sys.stdout)
+
+    logger = logging.getLogger("parity")
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.addHandler(_handler)
+    logger.propagate = False
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener, _handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger("parity").removeHandler(_handler)
+    _listener = _handler = None
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+registry.register(CallbackCounter(
+    "parity_log_records_dropped_total", "Log records dropped because the queue was full.",
+    lambda: [((), dropped_records())]))
+
+
+class AccessLogMiddleware:
+    """ASGI middleware that records one access log entry per request.
+
+    It also installs the ``RequestStats`` that the database listeners fill
+    in. ``random`` is injectable so sampling can be made deterministic.
+    """
+
+    def __init__(
+        self,
+        app,
+        sample_rate: Optional[float] = None,
+        slow_ms: Optional[float] = None,
+        logger: logging.Logger = access_logger,
+        random: Callable[[], float] = random.random,
+    ):
+        self.app = app
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_ms = settings.ACCESS_LOG_SLOW_MS if slow_ms is None else slow_ms
+        self.logger = logger
+        self.random = random
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = install_request_stats()
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if token is not None:
+                request_stats.reset(token)
+            self.record(scope, status_code, (time.perf_counter() - started) * 1000, stats)
+
+    def record(self, scope, status_code: int, duration_ms: float, stats: RequestStats) -> None:
+        slow = duration_ms >= self.slow_ms
+        if status_code < 400 and not slow:
+            if self.random() >= self.sample_rate:
+                return
+            sample_rate = self.sample_rate
+        else:
+            sample_rate = 1.0
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
+        route = route_template(scope)
+        # Build the record directly; Logger.info would walk the stack for the caller
+        record = self.logger.makeRecord(self.logger.name, logging.INFO, __file__, 0, "request", None, None, extra={
+            "method": scope["method"],
+            "route": route,
+            "path": None if route else scope["path"],
+            "status": status_code,
+            "duration_ms": round(duration_ms, 2),
+            "db_ms": round(stats.db_ms, 2),
+            "db_queries": stats.queries,
+            "slow": slow,
+            "sample_rate": sample_rate,
+        })
+        self.logger.handle(record)
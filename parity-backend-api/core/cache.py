@@ -0,0 +1,164 @@
+"""
+Process-local caches, plus HTTP validator helpers.
+
+``LRUCache`` is a bounded per-key cache for per-user data. Each
+``VersionedCache`` is tied to a named row in ``cache_versions``.
+Writers call ``bump_cache_version`` in the transaction that changes the
+data; every worker notices the new version within ``check_interval``
+seconds (immediately in the writing process) and reloads.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+
+T = TypeVar("T")
+
+# All caches by name, for invalidation and hit/miss reporting
+caches: Dict[str, Any] = {}
+
+
+def get_cache_version(db, name: str) -> int:
+    """Read the current version of a named cache (0 if never bumped)."""
+    from models.cache_version import CacheVersion
+
+    version = db.execute(select(CacheVersion.version).where(CacheVersion.name == name)).scalar()
+    return version or 0
+
+
+def bump_cache_version(db, name: str) -> None:
+    """Invalidate a named cache everywhere; call before committing the change."""
+    from models.cache_version import CacheVersion
+
+    result = db.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == name)
+        .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        try:
+            with db.begin_nested():
+                db.add(CacheVersion(name=name, version=1))
+        except IntegrityError:
+            db.execute(
+                update(CacheVersion)
+                .where(CacheVersion.name == name)
+                .values(version=CacheVersion.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+    cache = caches.get(name)
+    if cache is not None:
+        # Reload only once the new data is visible to other sessions
+        event.listen(db, "after_commit", lambda session: cache.invalidate(), once=True)
+
+
+class VersionedCache(Generic[T]):
+    """A single value built by ``loader(db)`` and reused until its version changes."""
+
+    def __init__(self, name: str, loader: Callable[..., T], check_interval: float = 30.0):
+        self.name = name
+        self.loader = loader
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._value: Optional[T] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        caches[name] = self
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+
+    def get(self, db) -> T:
+        now = time.monotonic()
+        value = self._value
+        if value is not None and now - self._checked_at < self.check_interval:
+            self.hits += 1
+            return value
+
+        with self._lock:
+            if self._value is not None and now - self._checked_at < self.check_interval:
+                self.hits += 1
+                return self._value
+            version = get_cache_version(db, self.name)
+            if self._value is None or version != self._version:
+                self._value = self.loader(db)
+                self._version = version
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._checked_at = now
+            return self._value
+
+
+_ANY_VERSION = object()
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with a fixed number of entries."""
+
+    def __init__(self, name: str, max_entries: int = 10000):
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Any = _ANY_VERSION) -> Optional[Any]:
+        """Return the cached value, or None.
+
+        If ``version`` is given, an entry whose ``version`` attribute
+        differs counts as a miss.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None or (version is not _ANY_VERSION and value.version != version):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a serialized response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the given ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -0,0 +1,238 @@
+"""
+Negotiated gzip and brotli response compression.
+
+``CompressionMiddleware`` compresses complete, compressible responses of
+at least ``COMPRESSION_MIN_SIZE`` bytes with the best encoding the client
+accepts. It leaves alone:
+
+- responses without a body to compress (HEAD, 1xx, 204, 206, 304);
+- streaming responses, i.e. any whose first body message has more to come;
+- responses that already carry a ``Content-Encoding``. Cached endpoints
+  compress their bodies once with ``precompress`` and pick a variant per
+  request with ``encoded_response`` (``encoded_not_modified`` for their
+  304s), so they are never recompressed.
+
+Brotli is optional; without the ``brotli`` package only gzip is offered.
+"""
+
+import zlib
+from functools import lru_cache
+from typing import Dict, Mapping, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Server preference, best first; wins ties between equal q-values
+ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+# Bodies this large are compressed off the event loop; both codecs release the GIL
+OFFLOAD_SIZE = 128 * 1024
+
+_NO_BODY_STATUSES = {204, 206, 304}
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: Optional[str], available: Tuple[str, ...] = ENCODINGS) -> Optional[str]:
+    """The encoding in ``available`` the client prefers, or None for identity."""
+    if not accept_encoding:
+        return None
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(encoding: str, body: bytes, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=level, mode=brotli.MODE_TEXT)
+    return zlib.compress(body, level, wbits=31)
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith("+json")
+
+
+def weak_etag(etag: str) -> str:
+    """Each encoding is a different byte sequence, so a strong ETag no longer holds."""
+    return etag if etag.startswith("W/") else "W/" + etag
+
+
+def precompress(body: bytes) -> Dict[str, bytes]:
+    """Every supported encoding of a cached body, at the highest levels.
+
+    Worth the CPU only for bodies compressed once and served many times.
+    Encodings that do not make the body smaller are left out.
+    """
+    if len(body) < settings.COMPRESSION_MIN_SIZE:
+        return {}
+    variants = {"gzip": compress("gzip", body, 9)}
+    if brotli is not None:
+        variants["br"] = compress("br", body, 11)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+def encoded_response(
+    request: Request,
+    body: bytes,
+    variants: Mapping[str, bytes],
+    media_type: str = "application/json",
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """Serve ``body`` or one of its ``precompress`` variants."""
+    encoding, headers = _variant_headers(request, variants, headers)
+    if encoding is None:
+        return Response(content=body, media_type=media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(content=variants[encoding], media_type=media_type, headers=headers)
+
+
+def encoded_not_modified(
+    request: Request,
+    variants: Mapping[str, bytes],
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """The 304 for a body ``encoded_response`` would serve.
+
+    A 304 must carry the ETag the 200 would have, which is the weak form
+    whenever the request would get a compressed variant.
+    """
+    _, headers = _variant_headers(request, variants, headers)
+    return Response(status_code=304, headers=headers)
+
+
+def _variant_headers(
+    request: Request,
+    variants: Mapping[str, bytes],
+    headers: Optional[Mapping[str, str]],
+) -> Tuple[Optional[str], Dict[str, str]]:
+    """The negotiated encoding, if any, and the headers that go with it."""
+    headers = dict(headers or {})
+    encoding = None
+    if variants:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate(
+            request.headers.get("accept-encoding"), tuple(e for e in ENCODINGS if e in variants))
+    if encoding is not None and "ETag" in headers:
+        headers["ETag"] = weak_etag(headers["ETag"])
+    return encoding, headers
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses complete responses.
+
+    The body is compressed only if it comes in a single message and ends up
+    smaller; otherwise the response passes through unchanged.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None,
+    ):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.levels = {
+            "gzip": settings.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level,
+            "br": settings.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                if self.eligible(message["status"], Headers(raw=message.get("headers", []))):
+                    start = message
+                else:
+                    passthrough = True
+                    await send(message)
+                return
+
+            body = message.get("body", b"")
+            passthrough = True
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+
+            level = self.levels[encoding]
+            if len(body) >= OFFLOAD_SIZE:
+                compressed = await run_in_threadpool(compress, encoding, body, level)
+            else:
+                compressed = compress(encoding, body, level)
+            if len(compressed) >= len(body):
+                await send(start)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag:
+                headers["ETag"] = weak_etag(etag)
+            await send({**start, "headers": headers.raw})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def eligible(self, status_code: int, headers: Headers) -> bool:
+        if status_code < 200 or status_code in _NO_BODY_STATUSES:
+            return False
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+            return False
+        if not is_compressible(headers.get("content-type", "")):
+            return False
+        length = headers.get("content-length")
+        return length is None or not length.isdigit() or int(length) >= self.minimum_size
@@ -3,6 +3,8 @@ Configuration settings for the Parity API.
 """
 
 import os
+from typing import Dict
+
 from pydantic_settings import BaseSettings
 
 
@@ -12,6 +14,124 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # "database" shares TTL data (reset tokens etc.) across workers; "memory" is per process
+    TTL_STORE_BACKEND: str = "database"
+    PASSWORD_RESET_TOKEN_TTL_MINUTES: int = 60
+    PASSWORD_RESET_MAX_TOKENS: int = 100000
+
+    # Token buckets per policy, "<count>/<second|minute|hour|day>"; "database"
+    # shares them across workers, "memory" is per process
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "database"
+    RATE_LIMITS: Dict[str, str] = {
+        "auth": "10/minute",
+        "login": "20/minute",
+        "login_account": "10/minute",
+        "like": "60/minute",
+        "social_write": "20/minute",
+        "affirmation_write": "30/minute",
+    }
+
+    # Idempotency-Key responses are replayed for IDEMPOTENCY_TTL_SECONDS; a claim
+    # by a request that never finishes expires after IDEMPOTENCY_LOCK_SECONDS;
+    # duplicates wait up to IDEMPOTENCY_WAIT_SECONDS for the first to finish
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: float = 30.0
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+
+    # JSON logs; successful requests are sampled, errors and slow ones always logged
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000
+    ACCESS_LOG_SAMPLE_RATE: float = 0.1
+    ACCESS_LOG_SLOW_MS: float = 500.0
+
+    # Adds X-DB-Query-Count / X-DB-Time-Ms response headers
+    DEBUG: bool = False
+    # Warn when one statement runs more than this many times in a request
+    N_PLUS_ONE_THRESHOLD: int = 10
+
+    # Statements slower than this are kept for GET /admin/slow-queries,
+    # with EXPLAIN plans for a sampled share
+    SLOW_QUERY_MS: float = 200.0
+    SLOW_QUERY_LOG_SIZE: int = 100
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+
+    # Shared key for the /admin endpoints (X-Admin-Key); empty disables them
+    ADMIN_API_KEY: str = ""
+
+    # Prometheus metrics at /metrics
+    METRICS_ENABLED: bool = True
+
+    # gzip/brotli for JSON and text responses of at least COMPRESSION_MIN_SIZE bytes
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Warm-up before /ready reports ready: mappers, response adapters, pool
+    # connections (up to the pool size), static caches, bcrypt/JWT
+    WARMUP_ENABLED: bool = True
+    WARMUP_POOL_CONNECTIONS: int = 5
+
+    # serve.py: workers (0 = one per CPU), restart after max requests
+    # (+ random jitter), seconds to drain on shutdown
+    SERVER_WORKERS: int = 0
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    # Proxies whose X-Forwarded-For/-Proto are trusted as the client address;
+    # comma-separated IPs or "*" (gunicorn and uvicorn read the same variable)
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+
+    # Concurrent requests per route class and worker; up to LOAD_SHED_QUEUE_SIZE
+    # more wait LOAD_SHED_QUEUE_TIMEOUT_MS before a 503 with Retry-After
+    LOAD_SHED_ENABLED: bool = True
+    LOAD_SHED_LIMITS: Dict[str, int] = {"auth": 4, "feed": 32, "writes": 16, "reads": 32}
+    LOAD_SHED_QUEUE_SIZE: int = 16
+    LOAD_SHED_QUEUE_TIMEOUT_MS: float = 250.0
+    # Per-request deadline, also applied to its SQL statements; 0 disables
+    REQUEST_TIMEOUT_SECONDS: float = 10.0
+
+    # Per-worker cache of user settings/profile documents
+    USER_DOCUMENT_CACHE_SIZE: int = 10000
+    # Per-worker cache of each user's slice of the partner dashboard
+    PARTNER_DASHBOARD_CACHE_SIZE: int = 10000
+
+    # Outbound affirmation delivery; serve.py runs the dispatcher (and the
+    # scheduler below) in one process of its own instead of in each worker
+    DELIVERY_DISPATCHER_ENABLED: bool = True
+    DELIVERY_OUTBOX_DIR: str = "./outbox"
+    DELIVERY_BATCH_SIZE: int = 50
+    DELIVERY_CONCURRENCY: int = 4
+    DELIVERY_MAX_ATTEMPTS: int = 6
+    DELIVERY_POLL_SECONDS: float = 2.0
+
+    # Scheduled affirmations
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_WINDOW_SECONDS: int = 300
+    SCHEDULER_MAX_LOADED: int = 10000
+    SCHEDULER_BATCH_SIZE: int = 500
+    # Longest delay before a schedule created by another process is seen
+    SCHEDULER_POLL_SECONDS: int = 5
+
+    # SMTP relay; with an empty host, affirmation email goes to the outbox
+    # directory and account email is only logged (recipient and subject, at
+    # DEBUG), its body printed to stdout just with EMAIL_CONSOLE_BODIES
+    SMTP_HOST: str = ""
+    SMTP_PORT: int = 25
+    SMTP_FROM: str = "no-reply@parity-app.com"
+    SMTP_USERNAME: str = ""
+    SMTP_PASSWORD: str = ""
+    SMTP_STARTTLS: bool = False
+
+    # Background sender for account email (password resets)
+    EMAIL_CONNECTIONS: int = 2
+    EMAIL_MAX_IN_FLIGHT: int = 1000
+    EMAIL_BATCH_SIZE: int = 20
+    # Development only: bodies include password reset tokens
+    EMAIL_CONSOLE_BODIES: bool = False
+
     class Config:
         env_file = ".env"
 
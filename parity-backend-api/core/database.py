@@ -10,6 +10,10 @@ from fastapi import Depends
 import uuid as uuid_pkg
 
 from .config import settings
+from .deadlines import enforce_deadlines
+from .metrics import instrument_pool
+from .request_stats import track_queries
+from .slow_queries import slow_queries
 
 
 class UUID(TypeDecorator):
@@ -56,10 +60,36 @@ class UUID(TypeDecorator):
 
 # Database setup
 engine = create_engine(settings.DATABASE_URL)
+track_queries(engine)
+instrument_pool(engine)
+slow_queries.attach(engine)
+enforce_deadlines(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def dialect_insert(bind, table):
+    """The PostgreSQL or SQLite ``insert``, which supports ON CONFLICT."""
+    if bind.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif bind.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT is not supported for {bind.dialect.name}")
+    return insert(table)
+
+
+def insert_ignoring_conflicts(bind, table, index_elements):
+    """INSERT ... ON CONFLICT DO NOTHING for PostgreSQL and SQLite.
+
+    Rows that would violate the unique index on ``index_elements`` are
+    skipped by the database instead of raising. For a single row the
+    rowcount tells the caller whether it was inserted; executemany may
+    report -1, so count bulk inserts with RETURNING instead.
+    """
+    return dialect_insert(bind, table).on_conflict_do_nothing(index_elements=index_elements)
+
+
 def get_db():
     """Database session dependency."""
     db = SessionLocal()
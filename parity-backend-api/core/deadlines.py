@@ -0,0 +1,86 @@
+"""
+Per-request deadlines enforced on the database.
+
+``LoadSheddingMiddleware`` sets ``request_deadline`` (a ``time.monotonic``
+timestamp) for each request; sync endpoints see it through the copied
+context like ``request_stats``. ``enforce_deadlines`` makes the engine
+honour it, so a request whose client has given up stops using the
+database:
+
+- a statement is not sent at all once the deadline has passed;
+- on PostgreSQL each transaction starts with ``SET LOCAL
+  statement_timeout`` set to the time left;
+- on SQLite a progress handler interrupts a running statement once the
+  deadline passes.
+
+Database errors caused by the deadline surface as ``DeadlineExceeded``,
+which the app turns into a 504.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# SQLite VM instructions between deadline checks
+SQLITE_CHECK_INTERVAL = 10000
+
+
+class DeadlineExceeded(Exception):
+    """The current request ran past its deadline."""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline; None without one."""
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def _interrupt_if_expired() -> int:
+    return 1 if expired() else 0
+
+
+def _connect(dbapi_connection, connection_record):
+    dbapi_connection.set_progress_handler(_interrupt_if_expired, SQLITE_CHECK_INTERVAL)
+
+
+def _begin(conn):
+    left = remaining()
+    if left is None:
+        return
+    if left <= 0:
+        raise DeadlineExceeded("request deadline passed before the transaction began")
+    # Raw cursor, like the slow-query EXPLAIN, so this is not counted as a query
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}")
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if expired():
+        raise DeadlineExceeded("request deadline passed")
+
+
+def _handle_error(context):
+    if expired() and not isinstance(context.original_exception, DeadlineExceeded):
+        return DeadlineExceeded(f"request deadline passed: {context.original_exception.__class__.__name__}")
+
+
+def enforce_deadlines(engine) -> None:
+    """Attach the deadline checks to an engine."""
+    if engine.dialect.name == "postgresql":
+        event.listen(engine, "begin", _begin)
+    elif engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _connect)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,160 @@
+"""
+``Idempotency-Key`` support for POST endpoints.
+
+Routers created with ``route_class=IdempotentRoute`` honour the header on
+their POST routes. The first request with a given key claims it in the
+``idempotency`` TTL store, runs and stores its response. A retry with the
+same key and the same request gets the stored response back with
+``Idempotent-Replayed: true``, without running the endpoint again. A
+duplicate that arrives while the first is still running waits for it,
+up to ``IDEMPOTENCY_WAIT_SECONDS``, and then replays its response (or
+gets a 409 if it is still running).
+
+Keys are scoped to the user in the bearer token. Reusing a key for a
+different request (method, path, query or body) is a 422. Responses are
+kept for ``IDEMPOTENCY_TTL_SECONDS``. Exceptions and 5xx responses are
+not stored, so the client can retry those. With the database backend,
+all workers share the keys; the memory backend holds at most
+``IDEMPOTENCY_MAX_ENTRIES``.
+"""
+
+import asyncio
+import base64
+import hashlib
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+
+from .config import settings
+from .security import token_user_id
+from .ttl_store import MemoryTTLStore, create_ttl_store
+
+HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+# Larger responses are not stored; the endpoints using keys return small bodies
+MAX_STORED_BODY = 64 * 1024
+POLL_SECONDS = 0.05
+
+idempotency_store = create_ttl_store("idempotency", max_entries=settings.IDEMPOTENCY_MAX_ENTRIES)
+
+# Store key -> event set when this worker's in-flight request finishes
+_in_flight: Dict[str, asyncio.Event] = {}
+
+
+async def _store(method: Callable, *args) -> Any:
+    """Call a store method, off the event loop unless it is in memory."""
+    if isinstance(idempotency_store, MemoryTTLStore):
+        return method(*args)
+    return await run_in_threadpool(method, *args)
+
+
+def _error(status_code: int, detail: str) -> Response:
+    return ORJSONResponse({"detail": detail}, status_code=status_code)
+
+
+def _replay(entry: dict) -> Response:
+    response = Response(content=base64.b64decode(entry["body"]), status_code=entry["status"])
+    response.raw_headers = [
+        (name.encode("latin-1"), value.encode("latin-1")) for name, value in entry["headers"]
+    ] + [(b"content-length", str(len(response.body)).encode()), (b"idempotent-replayed", b"true")]
+    return response
+
+
+def _stored(fingerprint: str, response: Response) -> Optional[dict]:
+    body = getattr(response, "body", None)
+    if body is None or len(body) > MAX_STORED_BODY or response.status_code >= 500:
+        return None
+    return {
+        "state": "done",
+        "fingerprint": fingerprint,
+        "status": response.status_code,
+        "headers": [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in response.raw_headers if name != b"content-length"
+        ],
+        "body": base64.b64encode(body).decode("ascii"),
+    }
+
+
+async def _wait_for(store_key: str, deadline: float) -> None:
+    """Sleep until the in-flight request may have finished or ``deadline`` passes."""
+    event = _in_flight.get(store_key)
+    timeout = max(0.0, deadline - time.monotonic())
+    if event is None:
+        # Running on another worker; poll the store
+        await asyncio.sleep(min(POLL_SECONDS, timeout))
+        return
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def idempotent_call(request: Request, handler: Callable) -> Response:
+    """Run ``handler`` at most once per user and ``Idempotency-Key``."""
+    key = request.headers.get(HEADER)
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    user_id = token_user_id(token) if key is not None and scheme.lower() == "bearer" else None
+    if user_id is None:
+        # No key, or unauthenticated; the endpoint rejects the latter itself
+        return await handler(request)
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return _error(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters.")
+
+    store_key = hashlib.sha256(f"{user_id}\0{key}".encode()).hexdigest()
+    body = await request.body()
+    fingerprint = hashlib.sha256(
+        b"\0".join([request.method.encode(), request.url.path.encode(), request.url.query.encode(), body])
+    ).hexdigest()
+
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    pending = {"state": "pending", "fingerprint": fingerprint}
+    while True:
+        entry = await _store(idempotency_store.get, store_key)
+        if entry is None:
+            if await _store(idempotency_store.add, store_key, pending, settings.IDEMPOTENCY_LOCK_SECONDS):
+                break
+            continue
+        if entry["fingerprint"] != fingerprint:
+            return _error(422, "Idempotency-Key was already used for a different request.")
+        if entry["state"] == "done":
+            return _replay(entry)
+        if time.monotonic() >= deadline:
+            return _error(409, "A request with this Idempotency-Key is still in progress.")
+        await _wait_for(store_key, deadline)
+
+    done = _in_flight[store_key] = asyncio.Event()
+    try:
+        try:
+            response = await handler(request)
+        except BaseException:
+            await _store(idempotency_store.delete, store_key)
+            raise
+        stored = _stored(fingerprint, response)
+        if stored is None:
+            await _store(idempotency_store.delete, store_key)
+        else:
+            await _store(idempotency_store.set, store_key, stored, settings.IDEMPOTENCY_TTL_SECONDS)
+    finally:
+        # Wake local duplicates once the outcome is in the store
+        done.set()
+        _in_flight.pop(store_key, None)
+    return response
+
+
+class IdempotentRoute(APIRoute):
+    """Route class that applies ``idempotent_call`` to POST routes."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if "POST" not in self.methods:
+            return handler
+
+        async def idempotent_handler(request: Request) -> Response:
+            return await idempotent_call(request, handler)
+
+        return idempotent_handler
@@ -0,0 +1,190 @@
+"""
+Concurrency limits per route class with fast rejection.
+
+Each request is put in a class by method and path: ``auth`` (login,
+registration, password reset; bcrypt-bound), ``feed`` (reads under
+``/social``), ``writes`` (any other non-GET) and ``reads`` (everything
+else). Each class runs at most ``LOAD_SHED_LIMITS[class]`` requests at
+once per worker. Up to ``LOAD_SHED_QUEUE_SIZE`` more wait, for at most
+``LOAD_SHED_QUEUE_TIMEOUT_MS``. Anything beyond that gets an immediate
+503 with ``Retry-After``. The client can then retry elsewhere instead of
+piling onto a worker that is already behind, usually because the
+database is slow.
+
+The middleware also sets each request's deadline, ``REQUEST_TIMEOUT_SECONDS``
+after it arrived, which ``core.deadlines`` applies to its SQL. Time spent
+queued counts against it. With ``LOAD_SHED_ENABLED`` off the middleware is
+installed with no limits and only sets deadlines.
+
+Health, readiness, metrics and docs are never limited.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Mapping, Optional
+
+from .config import settings
+from .deadlines import request_deadline
+from .metrics import Counter, Gauge, registry
+
+AUTH_PATHS = {"/users/login", "/users/register", "/users/forgot-password", "/users/reset-password"}
+EXEMPT_PATHS = {"/health", "/ready", "/metrics", "/docs", "/redoc", "/openapi.json"}
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+MAX_RETRY_AFTER = 30
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """The limit class of a request, or None if it is not limited."""
+    if path in EXEMPT_PATHS:
+        return None
+    if path in AUTH_PATHS:
+        return "auth"
+    if method not in READ_METHODS:
+        return "writes"
+    if path.startswith("/social/"):
+        return "feed"
+    return "reads"
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` holders, with a bounded FIFO of waiters.
+
+    Only used from the event loop, so it needs no lock. Keeps a moving
+    average of how long each holder keeps its slot, for ``retry_after``.
+    """
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.average_seconds = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Take a slot; returns None on success, else why the request was shed."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=max(timeout, 0))
+        except BaseException:
+            # Cancelled (client gone) just after being handed a slot
+            if waiter.done() and not waiter.cancelled():
+                self._hand_over()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+                self._waiters.remove(waiter)
+        # On success _hand_over() has already counted the slot for us
+        return "queue_timeout" if waiter.cancelled() else None
+
+    def release(self, held_seconds: float) -> None:
+        self.average_seconds += 0.2 * (held_seconds - self.average_seconds)
+        self._hand_over()
+
+    def _hand_over(self) -> None:
+        """Pass a slot to the oldest waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue would have drained, from 1 to 30."""
+        drain = (self.waiting + 1) * self.average_seconds / max(self.limit, 1)
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(drain)))
+
+
+# Route class -> limiter, for the metrics below
+limiters: Dict[str, ConcurrencyLimiter] = {}
+
+requests_shed = registry.register(Counter(
+    "parity_http_requests_shed_total", "Requests rejected with 503 by the concurrency limits.",
+    ("class", "reason")))
+registry.register(Gauge(
+    "parity_concurrency_active", "Requests holding a concurrency slot.",
+    lambda: [((name,), limiter.active) for name, limiter in sorted(limiters.items())], ("class",)))
+registry.register(Gauge(
+    "parity_concurrency_waiting", "Requests queued for a concurrency slot.",
+    lambda: [((name,), limiter.waiting) for name, limiter in sorted(limiters.items())], ("class",)))
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware that applies the per-class limits and sets deadlines."""
+
+    def __init__(
+        self,
+        app,
+        limits: Optional[Mapping[str, int]] = None,
+        queue_size: Optional[int] = None,
+        queue_timeout_ms: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.app = app
+        limits = settings.LOAD_SHED_LIMITS if limits is None else limits
+        queue_size = settings.LOAD_SHED_QUEUE_SIZE if queue_size is None else queue_size
+        queue_timeout_ms = settings.LOAD_SHED_QUEUE_TIMEOUT_MS if queue_timeout_ms is None else queue_timeout_ms
+        self.timeout = settings.REQUEST_TIMEOUT_SECONDS if timeout is None else timeout
+        self.limiters = {
+            name: ConcurrencyLimiter(limit, queue_size, queue_timeout_ms / 1000)
+            for name, limit in limits.items()
+        }
+        limiters.update(self.limiters)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters.get(name)
+        token = request_deadline.set(time.monotonic() + self.timeout) if self.timeout > 0 else None
+        try:
+            if limiter is None:
+                await self.app(scope, receive, send)
+                return
+
+            reason = await limiter.acquire(self.timeout if self.timeout > 0 else None)
+            if reason is not None:
+                requests_shed.inc((name, reason))
+                await self.reject(send, limiter.retry_after())
+                return
+
+            started = time.monotonic()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                limiter.release(time.monotonic() - started)
+        finally:
+            if token is not None:
+                request_deadline.reset(token)
+
+    async def reject(self, send, retry_after: int) -> None:
+        body = b'{"detail":"Server is busy, please retry later."}'
+        await send({"type": "http.response.start", "status": 503, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,316 @@
+"""
+Process metrics in the Prometheus text format.
+
+Counters and histograms keep one shard of values per thread, so recording
+an observation takes no lock: each thread only writes its own dict, and a
+scrape merges the shards. A lock is taken only the first time a thread
+records to a metric. Gauges are read from callbacks at scrape time.
+
+``MetricsMiddleware`` records per-route request counts, latency and query
+counts. ``instrument_pool`` adds connection pool metrics for an engine.
+The cache gauges read the hit/miss counters every cache in
+``core.cache.caches`` already keeps.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event
+
+from .request_stats import install_request_stats, request_stats, route_template
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """Base class: a named metric with fixed label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        """The exposition lines for the current values."""
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class _ShardedMetric(Metric):
+    """Keeps one ``{labels: values}`` dict per recording thread."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, object]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[LabelValues, object]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: Dict[LabelValues, object] = {}
+            with self._lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def _snapshot(self) -> List[Dict[LabelValues, object]]:
+        with self._lock:
+            return [dict(shard) for shard in self._shards]
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, labels: LabelValues = (), amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self):
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(_ShardedMetric):
+    """Histogram with fixed buckets.
+
+    Each shard holds, per label set, the count for each bucket (plus one for
+    values above the last bucket) followed by the sum of observations.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            counts = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self):
+        merged: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshot():
+            for labels, counts in shard.items():
+                total = merged.setdefault(labels, [0] * len(counts))
+                for i, value in enumerate(list(counts)):
+                    total[i] += value
+
+        for labels, counts in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Gauge(Metric):
+    """Gauge whose values come from ``collect`` at scrape time.
+
+    ``collect`` returns ``(label values, value)`` pairs.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, collect: Callable[[], Iterable[Tuple[LabelValues, float]]], labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class CallbackCounter(Gauge):
+    """Counter read from existing counters at scrape time."""
+
+    kind = "counter"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Requests currently being handled; the route is read when scraping
+_active_requests: Dict[int, dict] = {}
+
+
+def _in_flight():
+    counts: Dict[LabelValues, int] = {}
+    for scope in list(_active_requests.values()):
+        route = (route_template(scope) or "unrouted",)
+        counts[route] = counts.get(route, 0) + 1
+    return sorted(counts.items())
+
+
+http_requests = registry.register(Counter(
+    "parity_http_requests_total", "HTTP requests handled.", ("route", "method", "status")))
+http_request_duration = registry.register(Histogram(
+    "parity_http_request_duration_seconds", "HTTP request latency.", ("route", "method")))
+http_request_queries = registry.register(Histogram(
+    "parity_http_request_db_queries", "Database queries issued per HTTP request.", ("route", "method"),
+    buckets=QUERY_COUNT_BUCKETS))
+http_requests_in_flight = registry.register(Gauge(
+    "parity_http_requests_in_flight", "HTTP requests being handled.", _in_flight, ("route",)))
+
+
+def _cache_values(attribute: str):
+    def collect():
+        from .cache import caches
+
+        return [((name,), getattr(cache, attribute)) for name, cache in sorted(caches.items())]
+    return collect
+
+
+registry.register(CallbackCounter("parity_cache_hits_total", "Cache hits.", _cache_values("hits"), ("cache",)))
+registry.register(CallbackCounter("parity_cache_misses_total", "Cache misses.", _cache_values("misses"), ("cache",)))
+
+
+class MetricsMiddleware:
+    """ASGI middleware that records request metrics per route template.
+
+    Requests that match no route are labelled ``unmatched`` so arbitrary
+    paths cannot grow the label set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = install_request_stats()
+        status_code = 500
+        key = id(scope)
+        _active_requests[key] = scope
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _active_requests.pop(key, None)
+            if token is not None:
+                request_stats.reset(token)
+            route = route_template(scope) or "unmatched"
+            method = scope["method"]
+            http_requests.inc((route, method, str(status_code)))
+            http_request_duration.observe(elapsed, (route, method))
+            http_request_queries.observe(stats.queries, (route, method))
+
+
+def instrument_pool(engine, name: str = "default") -> None:
+    """Export pool size, checked-out and overflow gauges and checkout time.
+
+    Checkout time is how long ``pool.connect()`` took, which includes
+    waiting for a free connection when the pool is exhausted. The gauges
+    read ``engine.pool`` when collected, and the timing is reapplied
+    whenever ``engine.dispose()`` replaces the pool (as each forked
+    worker does), so neither reports on a discarded pool.
+    """
+    checkout = registry.register(Histogram(
+        "parity_db_pool_checkout_seconds", "Time to check a connection out of the pool.", ("pool",),
+        buckets=CHECKOUT_BUCKETS))
+    labels = (name,)
+
+    def time_checkouts(pool):
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                checkout.observe(time.perf_counter() - started, labels)
+
+        pool.connect = timed_connect
+
+    time_checkouts(engine.pool)
+    event.listen(engine, "engine_disposed", lambda disposed: time_checkouts(disposed.pool))
+
+    def pool_value(method: str):
+        def collect():
+            value = getattr(engine.pool, method, None)
+            return [(labels, value())] if callable(value) else []
+        return collect
+
+    registry.register(Gauge("parity_db_pool_size", "Configured pool size.", pool_value("size"), ("pool",)))
+    registry.register(Gauge(
+        "parity_db_pool_checked_out", "Connections checked out.", pool_value("checkedout"), ("pool",)))
+    registry.register(Gauge(
+        "parity_db_pool_overflow", "Connections open beyond the pool size.", pool_value("overflow"), ("pool",)))
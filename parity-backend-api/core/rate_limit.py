@@ -0,0 +1,266 @@
+"""
+Token-bucket rate limiting for writes and authentication.
+
+A policy such as ``"30/minute"`` is a bucket of 30 tokens that refills at
+30 per minute, so it allows bursts of up to 30 and a sustained 30 a
+minute. Policies are named in ``RATE_LIMITS``; routes opt in with a
+dependency that picks the policy and what to key the bucket by::
+
+    @router.post("/posts/{post_id}/like", dependencies=[Depends(rate_limit("like", by="anonymous_id"))])
+
+``by`` is ``"user"``, ``"anonymous_id"`` or ``"ip"``. Allowed responses
+carry ``RateLimit-Limit``, ``RateLimit-Remaining``, ``RateLimit-Reset``
+and ``RateLimit-Policy``. Rejected requests get a 429 with the same
+headers plus ``Retry-After``, before the endpoint does any work. The
+headers are only added when the endpoint does not return a ``Response``
+itself, which none of the limited ones do.
+
+``RATE_LIMIT_BACKEND=memory`` keeps buckets in the process. It costs
+O(1) per check and each check evicts a few idle buckets.
+``RATE_LIMIT_BACKEND=database`` shares them across workers through the
+``rate_limit_buckets`` table, with one upsert per check.
+
+``by="ip"`` keys on ``request.client``. Behind a reverse proxy that is
+the proxy's address unless the server trusts it to forward the real one:
+``serve.py`` passes ``FORWARDED_ALLOW_IPS`` to the workers, and a bare
+``uvicorn`` needs ``--forwarded-allow-ips``. Otherwise every client
+shares the proxy's bucket.
+"""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import case, delete, select
+
+from .config import settings
+from .database import dialect_insert
+from .security import get_current_user
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+
+class Policy(NamedTuple):
+    name: str
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second."""
+        return self.capacity / self.period
+
+
+def parse_policy(name: str, spec: str) -> Policy:
+    """Parse ``"<count>/<second|minute|hour|day>"``."""
+    count, _, period = spec.partition("/")
+    if period not in PERIODS or not count.strip().isdigit() or int(count) < 1:
+        raise ValueError(f"Invalid rate limit for {name!r}: {spec!r}")
+    return Policy(name, int(count), PERIODS[period])
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    policy: Policy
+    # Tokens left after this request
+    remaining: float
+    # Seconds until the bucket is full again
+    reset: float
+    # Seconds until the next token; 0 when allowed
+    retry_after: float
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.policy.capacity),
+            "RateLimit-Remaining": str(int(self.remaining)),
+            "RateLimit-Reset": str(math.ceil(self.reset)),
+            "RateLimit-Policy": f"{self.policy.capacity};w={int(self.policy.period)}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def _decide(policy: Policy, tokens: float, allowed: bool) -> Decision:
+    """Decision for a bucket holding ``tokens`` after the request was counted."""
+    return Decision(
+        allowed=allowed,
+        policy=policy,
+        remaining=tokens,
+        reset=(policy.capacity - tokens) / policy.rate,
+        retry_after=0.0 if allowed else (1 - tokens) / policy.rate,
+    )
+
+
+class RateLimiter(ABC):
+    """Interface shared by the rate limiter backends."""
+
+    @abstractmethod
+    def hit(self, policy: Policy, key: str) -> Decision:
+        """Take one token from the bucket for ``key`` if there is one."""
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Token buckets in a dict ordered by last use.
+
+    A bucket left alone long enough to refill completely is the same as no
+    bucket, so each check drops up to ``evict_per_hit`` such buckets from
+    the least recently used end. Eviction is lossless and O(1) per check.
+    """
+
+    def __init__(self, evict_per_hit: int = 2, clock: Callable[[], float] = time.monotonic):
+        self.evict_per_hit = evict_per_hit
+        self.clock = clock
+        # key -> [tokens, refilled_at, full_at]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def hit(self, policy, key):
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(policy.capacity)
+            else:
+                tokens = min(policy.capacity, bucket[0] + (now - bucket[1]) * policy.rate)
+                self._buckets.move_to_end(key)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = [tokens, now, now + (policy.capacity - tokens) / policy.rate]
+            self._evict(now)
+        return _decide(policy, tokens, allowed)
+
+    def _evict(self, now: float) -> None:
+        for _ in range(self.evict_per_hit):
+            if not self._buckets:
+                return
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[2] > now:
+                return
+            del self._buckets[key]
+
+
+class DatabaseRateLimiter(RateLimiter):
+    """Token buckets in the shared ``rate_limit_buckets`` table.
+
+    Each check is one ``INSERT ... ON CONFLICT DO UPDATE ... WHERE`` that
+    refills the bucket and takes a token only if one is available. A
+    returned row means allowed, so concurrent workers cannot both take
+    the last token. A refused request reads the bucket once more for the
+    headers. Every ``purge_every`` checks, buckets untouched for longer
+    than the longest policy period (so certainly full) are deleted.
+    """
+
+    def __init__(self, engine=None, purge_every: int = 1000, clock: Callable[[], float] = time.time):
+        from models.rate_limit_bucket import RateLimitBucket
+        from .database import engine as default_engine
+
+        self.engine = engine or default_engine
+        self.purge_every = purge_every
+        self.clock = clock
+        self.table = RateLimitBucket.__table__
+        self._hits = 0
+        self._lock = threading.Lock()
+
+    def hit(self, policy, key):
+        now = self.clock()
+        table = self.table
+        refilled = table.c.tokens + (now - table.c.refilled_at) * policy.rate
+        refilled = case((refilled > policy.capacity, float(policy.capacity)), else_=refilled)
+
+        statement = dialect_insert(self.engine, table).values(
+            key=key, tokens=policy.capacity - 1.0, refilled_at=now
+        ).on_conflict_do_update(
+            index_elements=["key"],
+            set_={"tokens": refilled - 1, "refilled_at": now},
+            where=refilled >= 1,
+        ).returning(table.c.tokens)
+
+        with self.engine.begin() as conn:
+            tokens = conn.execute(statement).scalar()
+            allowed = tokens is not None
+            if not allowed:
+                row = conn.execute(select(table.c.tokens, table.c.refilled_at).where(table.c.key == key)).first()
+                tokens = min(policy.capacity, row.tokens + (now - row.refilled_at) * policy.rate) if row else 0.0
+        self._after_hit(now)
+        return _decide(policy, tokens, allowed)
+
+    def _after_hit(self, now: float) -> None:
+        with self._lock:
+            self._hits += 1
+            due = self._hits % self.purge_every == 0
+        if due:
+            self.purge_idle(now)
+
+    def purge_idle(self, now: Optional[float] = None) -> int:
+        """Delete buckets that have had time to refill completely."""
+        idle_for = max(policy.period for policy in policies().values())
+        cutoff = (now or self.clock()) - idle_for
+        with self.engine.begin() as conn:
+            return conn.execute(delete(self.table).where(self.table.c.refilled_at < cutoff)).rowcount
+
+
+_policies: Optional[Dict[str, Policy]] = None
+_limiter: Optional[RateLimiter] = None
+
+
+def policies() -> Dict[str, Policy]:
+    global _policies
+    if _policies is None:
+        _policies = {name: parse_policy(name, spec) for name, spec in settings.RATE_LIMITS.items()}
+    return _policies
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter for ``RATE_LIMIT_BACKEND``."""
+    global _limiter
+    if _limiter is None:
+        if settings.RATE_LIMIT_BACKEND == "memory":
+            _limiter = MemoryRateLimiter()
+        elif settings.RATE_LIMIT_BACKEND == "database":
+            _limiter = DatabaseRateLimiter()
+        else:
+            raise ValueError(f"Unknown rate limit backend: {settings.RATE_LIMIT_BACKEND}")
+    return _limiter
+
+
+def enforce(policy_name: str, key: str, response: Response) -> None:
+    """Count a request against a policy; raise 429 if it is over the limit."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    policy = policies()[policy_name]
+    decision = get_rate_limiter().hit(policy, f"{policy.name}:{key}")
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please slow down.",
+            headers=decision.headers(),
+        )
+    response.headers.update(decision.headers())
+
+
+def rate_limit(policy_name: str, by: str = "user") -> Callable:
+    """Dependency applying the named policy per user, anonymous ID or client IP."""
+    if policy_name not in settings.RATE_LIMITS:
+        raise ValueError(f"Unknown rate limit policy: {policy_name}")
+
+    if by == "ip":
+        def limit_by_ip(request: Request, response: Response) -> None:
+            enforce(policy_name, f"ip:{request.client.host if request.client else 'unknown'}", response)
+        return limit_by_ip
+
+    if by not in ("user", "anonymous_id"):
+        raise ValueError(f"Unknown rate limit key: {by}")
+
+    def limit_by_user(response: Response, current_user=Depends(get_current_user)) -> None:
+        key = f"anon:{current_user.anonymous_id}" if by == "anonymous_id" else f"user:{current_user.id}"
+        enforce(policy_name, key, response)
+    return limit_by_user
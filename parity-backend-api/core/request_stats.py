@@ -0,0 +1,213 @@
+"""
+Per-request database statistics, route lookup and N+1 detection.
+
+Middleware sets a fresh ``RequestStats`` in the ``request_stats`` context
+variable for each request. Engine event listeners add each statement and
+the time spent on it. Sync endpoints run in a thread pool with a copy of
+the request context, so they update the same object. Work outside a
+request (background workers, CLIs) has no stats and is not recorded.
+
+``QueryCounterMiddleware`` warns when one statement repeats more than
+``N_PLUS_ONE_THRESHOLD`` times in a request, the usual sign of a query per
+row. In ``DEBUG`` it also reports the counts in response headers.
+``assert_max_queries`` pins a query budget in tests; ``tests/conftest.py``
+exposes it as a fixture of the same name.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from .config import settings
+
+logger = logging.getLogger("parity.db")
+
+
+class RequestStats:
+    """Database work done while handling one request."""
+
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # Statement text -> executions; SQLAlchemy reuses the compiled text
+        self.statements: Dict[str, int] = {}
+
+    @property
+    def db_ms(self) -> float:
+        return self.db_seconds * 1000
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Normalized statements executed more than ``threshold`` times."""
+        counts: Dict[str, int] = {}
+        for statement, count in self.statements.items():
+            key = normalize_statement(statement)
+            counts[key] = counts.get(key, 0) + count
+        return sorted(
+            ((statement, count) for statement, count in counts.items() if count > threshold),
+            key=lambda item: -item[1],
+        )
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def install_request_stats() -> Tuple[RequestStats, Optional[Token]]:
+    """Return the current request's stats, creating them if none are set.
+
+    The token is None when an outer middleware already installed the stats,
+    in which case that middleware resets the variable.
+    """
+    stats = request_stats.get()
+    if stats is not None:
+        return stats, None
+    stats = RequestStats()
+    return stats, request_stats.set(stats)
+
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:\?|%\([^)]*\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)", re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapse whitespace and IN lists so equivalent statements compare equal."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _IN_LIST.sub("IN (...)", statement)
+
+
+# Endpoint function -> path template, filled from the app's routes on first use
+_route_templates: Dict[Callable, str] = {}
+
+
+def route_template(scope) -> Optional[str]:
+    """The path template of the matched route, e.g. ``/users/{user_id}``.
+
+    None until routing has happened, or if no route matched.
+    """
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return None
+    template = _route_templates.get(endpoint)
+    if template is None:
+        for route in getattr(scope.get("app"), "routes", ()):
+            if getattr(route, "endpoint", None) is not None:
+                _route_templates.setdefault(route.endpoint, route.path)
+        template = _route_templates.get(endpoint)
+    return template
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if request_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = request_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if started:
+        stats.db_seconds += time.perf_counter() - started.pop()
+    stats.queries += 1
+    stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    if context.connection is None or context.execution_context is None:
+        return
+    started = context.connection.info.get("query_started")
+    if started:
+        elapsed = time.perf_counter() - started.pop()
+        stats = request_stats.get()
+        if stats is not None:
+            stats.db_seconds += elapsed
+
+
+def track_queries(engine) -> None:
+    """Attach the counting and timing listeners to an engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class QueryCounterMiddleware:
+    """ASGI middleware that checks each request for repeated statements.
+
+    With ``debug`` the response carries ``X-DB-Query-Count`` and
+    ``X-DB-Time-Ms``, counted up to the start of the response.
+    """
+
+    def __init__(self, app, threshold: Optional[int] = None, debug: Optional[bool] = None):
+        self.app = app
+        self.threshold = settings.N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self.debug = settings.DEBUG if debug is None else debug
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = install_request_stats()
+
+        async def send_with_counts(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-query-count", str(stats.queries).encode()),
+                    (b"x-db-time-ms", f"{stats.db_ms:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_counts if self.debug else send)
+        finally:
+            if token is not None:
+                request_stats.reset(token)
+            if stats.queries > self.threshold:
+                for statement, count in stats.repeated(self.threshold):
+                    logger.warning("repeated query", extra={
+                        "route": route_template(scope),
+                        "method": scope["method"],
+                        "count": count,
+                        "statement": statement[:500],
+                    })
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine=None) -> Iterator[List[str]]:
+    """Fail if the enclosed block runs more than ``limit`` statements.
+
+    Counts every statement on the engine, from any thread, so it works
+    around ``TestClient`` calls::
+
+        with assert_max_queries(3):
+            client.get("/social/posts", headers=auth)
+
+    Yields the list of executed statements.
+    """
+    if engine is None:
+        from .database import engine
+
+    executed: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield executed
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+
+    if len(executed) > limit:
+        repeated = RequestStats()
+        for statement in executed:
+            repeated.statements[statement] = repeated.statements.get(statement, 0) + 1
+        details = "\n".join(f"  {count}x {statement}" for statement, count in repeated.repeated(0))
+        raise AssertionError(f"{len(executed)} queries, expected at most {limit}:\n{details}")
@@ -0,0 +1,56 @@
+"""
+Fast JSON responses.
+
+``ORJSONResponse`` is the app's default response class, so plain dict
+responses are encoded with orjson instead of the stdlib ``json``.
+
+List endpoints return ``json_response(List[Model], rows)`` instead. The
+ORM rows are validated once through a cached ``TypeAdapter`` and
+serialized straight to bytes by pydantic-core. FastAPI skips its own
+``response_model`` validation and encoding when an endpoint returns a
+``Response``. Routes keep ``response_model`` for the OpenAPI schema.
+
+``json_rows_response`` encodes trusted rows from ``services.read_models``
+directly with orjson, without building models at all.
+"""
+
+from functools import lru_cache
+from typing import Any, Iterable, Sequence
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.engine import Row
+
+__all__ = ["ORJSONResponse", "json_rows_response", "json_response", "type_adapter"]
+
+
+@lru_cache(maxsize=None)
+def type_adapter(response_type: Any) -> TypeAdapter:
+    """Shared adapter per type; building one compiles its schema."""
+    return TypeAdapter(response_type)
+
+
+def json_response(response_type: Any, value: Any, status_code: int = 200) -> Response:
+    """Validate ``value`` (ORM objects allowed) as ``response_type`` and encode it."""
+    adapter = type_adapter(response_type)
+    body = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+
+def json_rows_response(partitions: Iterable[Sequence[Row]], status_code: int = 200) -> Response:
+    """Encode partitions of result rows as one JSON array of objects.
+
+    Rows are not validated: the read model's column labels and types must
+    already match the response model, so the output is the same as
+    ``json_response`` would produce.
+    """
+    parts = []
+    for rows in partitions:
+        if rows:
+            keys = rows[0]._fields
+            # Strip each partition's brackets and join the items
+            parts.append(orjson.dumps([dict(zip(keys, row)) for row in rows])[1:-1])
+    return Response(content=b"[" + b",".join(parts) + b"]", status_code=status_code, media_type="application/json")
@@ -45,6 +45,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def token_user_id(token: str) -> Optional[str]:
+    """The ``user_id`` claim of a valid token, or None; does not load the user."""
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("user_id")
+    except JWTError:
+        return None
+
+
 def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     db: DbDependency
@@ -0,0 +1,192 @@
+"""
+Slow-query recorder with EXPLAIN plan capture.
+
+Statements slower than ``SLOW_QUERY_MS`` are aggregated by normalized text
+into a bounded buffer of the most recently seen statements. Each entry
+keeps the count, total and max time, and a redacted example of its
+parameters. For a sampled share of slow executions the recorder also runs
+``EXPLAIN`` (PostgreSQL) or ``EXPLAIN QUERY PLAN`` (SQLite) on the same
+connection with the same parameters and stores the plan. On PostgreSQL
+the EXPLAIN runs inside a savepoint so a failure cannot abort the
+caller's transaction.
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event
+
+from .config import settings
+from .request_stats import normalize_statement
+
+logger = logging.getLogger("parity.db")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def redact_statement(statement: str) -> str:
+    """Replace inline literals, which may hold user data, with ``?``."""
+    return _NUMBER_LITERAL.sub("?", _STRING_LITERAL.sub("?", normalize_statement(statement)))
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Keep the shape of the parameters but only the type of each value."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class SlowQuery:
+    """Aggregate of the slow executions of one normalized statement."""
+
+    __slots__ = ("statement", "count", "total_ms", "max_ms", "last_seen", "parameters", "plan")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen: Optional[datetime] = None
+        self.parameters: Any = None
+        self.plan: Optional[List[str]] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "statement": self.statement,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_seen": self.last_seen,
+            "parameters": self.parameters,
+            "plan": self.plan,
+        }
+
+
+class SlowQueryRecorder:
+    """Engine listener that records slow statements.
+
+    Keeps at most ``max_entries`` statements; when full, the one seen least
+    recently is dropped. ``random`` is injectable so plan sampling can be
+    made deterministic.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 200.0,
+        max_entries: int = 100,
+        explain_sample_rate: float = 0.1,
+        random: Callable[[], float] = random.random,
+    ):
+        self.threshold_ms = threshold_ms
+        self.max_entries = max_entries
+        self.explain_sample_rate = explain_sample_rate
+        self.random = random
+        self._entries: "OrderedDict[str, SlowQuery]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def attach(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("slow_query_started")
+        if not started:
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+
+        plan = None
+        if not executemany and self.random() < self.explain_sample_rate:
+            plan = self.explain(conn, statement, parameters)
+        self.record(statement, parameters, elapsed_ms, plan)
+
+    def _handle_error(self, context):
+        # A failed statement never reaches after_cursor_execute; drop its start time
+        if context.connection is None or context.execution_context is None:
+            return
+        started = context.connection.info.get("slow_query_started")
+        if started:
+            started.pop()
+
+    def record(self, statement: str, parameters: Any, elapsed_ms: float, plan: Optional[List[str]] = None) -> None:
+        key = redact_statement(statement)
+        with self._lock:
+            entry = self._entries.pop(key, None) or SlowQuery(key)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            entry.count += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.last_seen = datetime.utcnow()
+            entry.parameters = redact_parameters(parameters)
+            if plan is not None:
+                entry.plan = plan
+        logger.warning("slow query", extra={"duration_ms": round(elapsed_ms, 2), "statement": key[:500]})
+
+    def explain(self, conn, statement: str, parameters: Any) -> Optional[List[str]]:
+        """Plan for a statement, run on the raw DBAPI connection.
+
+        Going through the DBAPI cursor keeps the EXPLAIN out of the engine
+        events, so it is neither counted nor recorded itself.
+        """
+        dialect = conn.dialect.name
+        if dialect == "postgresql":
+            prefix = "EXPLAIN "
+        elif dialect == "sqlite":
+            prefix = "EXPLAIN QUERY PLAN "
+        else:
+            return None
+
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            if dialect == "postgresql":
+                cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+            except Exception as e:
+                if dialect == "postgresql":
+                    cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                return [f"EXPLAIN failed: {e.__class__.__name__}"]
+            if dialect == "postgresql":
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        finally:
+            cursor.close()
+
+        if dialect == "sqlite":
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [row[0] for row in rows]
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Recorded statements, highest total time first."""
+        with self._lock:
+            entries = [entry.as_dict() for entry in self._entries.values()]
+        return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_queries = SlowQueryRecorder(
+    threshold_ms=settings.SLOW_QUERY_MS,
+    max_entries=settings.SLOW_QUERY_LOG_SIZE,
+    explain_sample_rate=settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+)
@@ -0,0 +1,273 @@
+"""
+Key/value stores with per-entry expiry.
+
+``MemoryTTLStore`` is a size-bounded dict swept by a timing wheel, for a
+single process. ``DatabaseTTLStore`` keeps entries in the ``ttl_entries``
+table so every worker sees the same data, with an index on ``expires_at``
+for batched purges. Use ``create_ttl_store`` to get the configured backend.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import select, delete, and_
+from sqlalchemy.exc import IntegrityError
+
+from .config import settings
+
+
+class TTLStore(ABC):
+    """Interface shared by the TTL store backends.
+
+    Keys are strings of at most 128 characters; values must be
+    JSON-serializable for the database backend.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the live value for a key, or None."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for ``ttl`` seconds, replacing any existing one."""
+
+    @abstractmethod
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Store a value only if the key is absent or expired."""
+
+    @abstractmethod
+    def pop(self, key: str) -> Optional[Any]:
+        """Atomically remove a key and return its live value, or None."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Drop expired entries; returns how many were removed."""
+
+
+class MemoryTTLStore(TTLStore):
+    """In-process TTL store with a size bound and timing-wheel expiry.
+
+    Each entry sits in the wheel slot for its expiry tick. Every operation
+    advances the wheel to the current tick and drops whatever expired in
+    the slots it passed, so sweeping costs O(expired) rather than a scan.
+    When ``max_entries`` is reached the oldest insertion is evicted.
+    """
+
+    def __init__(self, max_entries: int = 100_000, tick: float = 1.0, slots: int = 3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.tick = tick
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._wheel: list[Set[str]] = [set() for _ in range(slots)]
+        self._cursor = int(clock() // tick)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _slot(self, expires_at: float) -> Set[str]:
+        # The first tick at which the entry is fully expired
+        return self._wheel[(int(expires_at // self.tick) + 1) % len(self._wheel)]
+
+    def _advance(self, now: float) -> int:
+        current = int(now // self.tick)
+        steps = min(current - self._cursor, len(self._wheel))
+        removed = 0
+        for step in range(steps):
+            slot = self._wheel[(current - step) % len(self._wheel)]
+            for key in [k for k in slot if self._entries[k][1] <= now]:
+                slot.discard(key)
+                del self._entries[key]
+                removed += 1
+        self._cursor = max(self._cursor, current)
+        return removed
+
+    def _remove(self, key: str) -> Optional[tuple]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._slot(entry[1]).discard(key)
+        return entry
+
+    def _insert(self, key: str, value: Any, ttl: float, now: float) -> None:
+        self._remove(key)
+        while len(self._entries) >= self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+        expires_at = now + ttl
+        self._entries[key] = (value, expires_at)
+        self._slot(expires_at).add(key)
+
+    def get(self, key):
+        now = self.clock()
+        with self._lock:
+            self._advance(now)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                return None
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        now = self.clock()
+        with self._lock:
+            self._advance(now)
+            self._insert(key, value, ttl, now)
+
+    def add(self, key, value, ttl):
+        now = self.clock()
+        with self._lock:
+            self._advance(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                return False
+            self._insert(key, value, ttl, now)
+            return True
+
+    def pop(self, key):
+        now = self.clock()
+        with self._lock:
+            self._advance(now)
+            entry = self._remove(key)
+            if entry is None or entry[1] <= now:
+                return None
+            return entry[0]
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def purge_expired(self):
+        with self._lock:
+            return self._advance(self.clock())
+
+
+class DatabaseTTLStore(TTLStore):
+    """TTL store in the shared ``ttl_entries`` table.
+
+    Lookups hit the ``(namespace, key)`` primary key. Expired rows are
+    ignored on read and deleted in batches of ``purge_batch`` every
+    ``purge_every`` writes, using the ``expires_at`` index.
+    """
+
+    def __init__(self, namespace: str, engine=None, purge_every: int = 500, purge_batch: int = 1000, clock=datetime.utcnow):
+        from models.ttl_entry import TTLEntry
+        from .database import engine as default_engine
+
+        self.namespace = namespace
+        self.engine = engine or default_engine
+        self.purge_every = purge_every
+        self.purge_batch = purge_batch
+        self.clock = clock
+        self.table = TTLEntry.__table__
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _match(self, key):
+        return and_(self.table.c.namespace == self.namespace, self.table.c.key == key)
+
+    def _after_write(self) -> None:
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.purge_every == 0
+        if due:
+            self.purge_expired()
+
+    def get(self, key):
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(self.table.c.value).where(self._match(key), self.table.c.expires_at > self.clock())
+            ).scalar()
+
+    def set(self, key, value, ttl):
+        expires_at = self.clock() + timedelta(seconds=ttl)
+        from .database import dialect_insert
+
+        # One upsert, so concurrent sets of a key cannot collide on the primary key
+        statement = dialect_insert(self.engine, self.table).values(
+            namespace=self.namespace, key=key, value=value, expires_at=expires_at
+        ).on_conflict_do_update(
+            index_elements=["namespace", "key"],
+            set_={"value": value, "expires_at": expires_at},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(statement)
+        self._after_write()
+
+    def add(self, key, value, ttl):
+        now = self.clock()
+        row = {"namespace": self.namespace, "key": key, "value": value, "expires_at": now + timedelta(seconds=ttl)}
+        try:
+            with self.engine.begin() as conn:
+                # Clear an expired holder first so it cannot block the insert
+                conn.execute(delete(self.table).where(self._match(key), self.table.c.expires_at <= now))
+                conn.execute(self.table.insert().values(**row))
+        except IntegrityError:
+            return False
+        self._after_write()
+        return True
+
+    def pop(self, key):
+        now = self.clock()
+        with self.engine.begin() as conn:
+            if conn.dialect.delete_returning:
+                row = conn.execute(
+                    delete(self.table).where(self._match(key))
+                    .returning(self.table.c.value, self.table.c.expires_at)
+                ).first()
+            else:
+                row = conn.execute(
+                    select(self.table.c.value, self.table.c.expires_at).where(self._match(key))
+                ).first()
+                if row is not None and not conn.execute(delete(self.table).where(self._match(key))).rowcount:
+                    # Someone else consumed it between the two statements
+                    row = None
+        if row is None or row.expires_at <= now:
+            return None
+        return row.value
+
+    def delete(self, key):
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self._match(key)))
+
+    def purge_expired(self):
+        removed = 0
+        while True:
+            with self.engine.begin() as conn:
+                expired = (
+                    select(self.table.c.key)
+                    .where(self.table.c.namespace == self.namespace, self.table.c.expires_at <= self.clock())
+                    .limit(self.purge_batch)
+                    .scalar_subquery()
+                )
+                count = conn.execute(
+                    delete(self.table).where(self.table.c.namespace == self.namespace, self.table.c.key.in_(expired))
+                ).rowcount
+            removed += count
+            if count < self.purge_batch:
+                return removed
+
+
+stores: Dict[str, TTLStore] = {}
+
+
+def create_ttl_store(namespace: str, backend: Optional[str] = None, max_entries: int = 100_000) -> TTLStore:
+    """Create the TTL store for a namespace using the configured backend.
+
+    ``TTL_STORE_BACKEND=memory`` is only safe with a single worker process.
+    """
+    backend = backend or settings.TTL_STORE_BACKEND
+    if backend == "memory":
+        store = MemoryTTLStore(max_entries=max_entries)
+    elif backend == "database":
+        store = DatabaseTTLStore(namespace)
+    else:
+        raise ValueError(f"Unknown TTL store backend: {backend}")
+    stores[namespace] = store
+    return store
@@ -0,0 +1,370 @@
+"""
+Synthetic dataset generator for performance testing.
+
+Seeds the coaching modules and affirmation templates with ``seed_data``,
+then generates users that share one pre-hashed password, partner pairs,
+posts with skewed likes, comments and caring gestures, module progress,
+sent affirmations, and the ``user_stats`` rows that summarize them.
+Popularity is heavy-tailed: a few users write most posts, and most posts
+get little attention while a few get a lot. The denormalized counters
+(``posts.like_count`` and friends, ``user_stats``) are computed from the
+generated rows, so they match them exactly.
+
+Rows are written in batches: with PostgreSQL ``COPY``, otherwise one
+executemany INSERT per table. The output depends only on the arguments,
+including ``--seed`` and ``--until``, so two runs give identical data
+apart from the module and template IDs that ``seed_data`` assigns.
+
+The target is the database given with ``--database-url``, never the
+app's configured one: every generated user shares a known password. It
+must already be migrated; the defaults write about 9M rows.
+
+Usage:
+    DATABASE_URL=sqlite:///./perf.db alembic upgrade head
+    python generate_data.py --database-url sqlite:///./perf.db
+    python generate_data.py --database-url postgresql://localhost/parity_perf --users 50000 --posts 2000000 --seed 7
+"""
+
+import argparse
+import csv
+import io
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Dict, List
+
+from sqlalchemy import bindparam, create_engine, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+from core.security import get_password_hash
+from models.affirmation import Affirmation
+from models.affirmation_template import AffirmationTemplate
+from models.caring_gesture import CaringGesture
+from models.comment import Comment
+from models.like import Like
+from models.module import Module
+from models.post import Post
+from models.user import User, anonymous_id_for
+from models.user_progress import UserProgress
+from models.user_stats import UserStats
+from seed_data import seed_affirmation_templates, seed_coaching_modules
+
+# Parents before children, so a flush never writes a row before its foreign key target
+TABLES = [
+    User.__table__, Post.__table__, Like.__table__, Comment.__table__, CaringGesture.__table__,
+    UserProgress.__table__, Affirmation.__table__, UserStats.__table__,
+]
+
+GESTURE_TYPES = ("hug", "encouragement", "comfort", "mindfulness")
+SENT_VIA = ("in-app", "sms", "email", "social")
+SENT_VIA_WEIGHTS = (70, 15, 10, 5)
+PROGRESS_STEPS = (10, 25, 50, 75, 100)
+PHRASES = (
+    "Feeling grateful today.", "We had a hard conversation last night.", "Small wins matter.",
+    "Trying to listen more than I talk.", "Date night was exactly what we needed.",
+    "Anyone else struggle with this?", "Sending love to everyone here.", "We are learning to slow down.",
+    "Today was a good day.", "Working on patience.", "Thank you all for the support.",
+    "It gets easier with practice.",
+)
+COMMENTS = (
+    "Sending you strength.", "This really resonates.", "So proud of you both!",
+    "Thank you for sharing.", "You are not alone in this.", "Beautifully said.",
+)
+# Shape of the popularity distributions; lower is more skewed
+AUTHOR_SKEW = 1.2
+ENGAGEMENT_SKEW = 1.5
+MAX_COMMENTS = 500
+
+
+class BatchWriter:
+    """Buffers rows per table and writes every buffer once any is full."""
+
+    def __init__(self, engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.copy = engine.dialect.name == "postgresql"
+        self.buffers: Dict[str, List[tuple]] = {table.name: [] for table in TABLES}
+        self.columns = {table.name: [column.name for column in table.columns] for table in TABLES}
+        self.written = {table.name: 0 for table in TABLES}
+        self.started = time.perf_counter()
+
+    def add(self, table, row: tuple) -> None:
+        buffer = self.buffers[table.name]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        with self.engine.begin() as conn:
+            for table in TABLES:
+                rows = self.buffers[table.name]
+                if not rows:
+                    continue
+                if self.copy:
+                    self._copy(conn, table, rows)
+                else:
+                    columns = self.columns[table.name]
+                    conn.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+                self.written[table.name] += len(rows)
+                rows.clear()
+        total = sum(self.written.values())
+        elapsed = time.perf_counter() - self.started
+        print(f"  ... {total:,} rows in {elapsed:.0f}s ({total / elapsed:,.0f} rows/s)")
+
+    def _copy(self, conn, table, rows: List[tuple]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(value) for value in row])
+        buffer.seek(0)
+        # Raw cursor: COPY streams the CSV, bypassing statement compilation
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(self.columns[table.name])}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+
+def _copy_value(value):
+    """A Python value as a COPY CSV field; None becomes an unquoted empty field, which is NULL."""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+class Generator:
+    """Generates the dataset row by row from one seeded random stream."""
+
+    def __init__(self, args, writer: BatchWriter, module_ids: List[uuid.UUID], templates: List[tuple]):
+        self.args = args
+        self.writer = writer
+        self.rng = random.Random(args.seed)
+        self.module_ids = module_ids
+        self.templates = templates
+        self.until = datetime.combine(args.until, datetime.min.time())
+        self.span = timedelta(days=args.days).total_seconds()
+        self.user_ids: List[uuid.UUID] = []
+        self.anonymous_ids: List[str] = []
+        # user index -> [modules_completed, progress_total, progress_count, posts_count, affirmations_sent, last_active]
+        self.stats: List[list] = []
+
+    def uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def moment(self, after: datetime = None) -> datetime:
+        """A random time in the window, or between ``after`` and its end."""
+        start = after or self.until - timedelta(seconds=self.span)
+        return start + (self.until - start) * self.rng.random()
+
+    def engagement(self, mean: float, cap: int) -> int:
+        """A heavy-tailed count with roughly the given mean: mostly zero, sometimes large."""
+        # paretovariate(a) - 1 has mean 1 / (a - 1)
+        return min(cap, int((self.rng.paretovariate(ENGAGEMENT_SKEW) - 1) * mean * (ENGAGEMENT_SKEW - 1)))
+
+    def active(self, user: int, when: datetime) -> None:
+        stats = self.stats[user]
+        if stats[5] is None or when > stats[5]:
+            stats[5] = when
+
+    def users(self, password_hash: str) -> None:
+        for i in range(self.args.users):
+            user_id = self.uuid()
+            link_code = "%032x" % self.rng.getrandbits(128)
+            created_at = self.moment() - timedelta(seconds=self.span)
+            self.writer.add(User.__table__, (
+                user_id, f"synthetic-{i}@example.com", password_hash, link_code, None, created_at,
+            ))
+            self.user_ids.append(user_id)
+            self.anonymous_ids.append(anonymous_id_for(user_id))
+            self.stats.append([0, 0, 0, 0, 0, None])
+        self.writer.flush()
+
+    def partners(self) -> None:
+        """Pair up ``--partnered`` of the users, both sides pointing at each other."""
+        order = list(range(len(self.user_ids)))
+        self.rng.shuffle(order)
+        paired = int(len(order) * self.args.partnered) // 2 * 2
+        rows = []
+        for a, b in zip(order[0:paired:2], order[1:paired:2]):
+            rows.append({"user": self.user_ids[a], "partner": self.user_ids[b]})
+            rows.append({"user": self.user_ids[b], "partner": self.user_ids[a]})
+        stmt = update(User.__table__).where(User.__table__.c.id == bindparam("user")).values(
+            partner_id=bindparam("partner")
+        )
+        with self.writer.engine.begin() as conn:
+            for start in range(0, len(rows), self.writer.batch_size):
+                conn.execute(stmt, rows[start:start + self.writer.batch_size])
+        print(f"  ... {len(rows) // 2:,} partner pairs")
+
+    def posts(self) -> None:
+        users = range(len(self.user_ids))
+        author_weights = list(accumulate(self.rng.paretovariate(AUTHOR_SKEW) for _ in users))
+        for author in self.rng.choices(users, cum_weights=author_weights, k=self.args.posts):
+            self.post(author)
+
+    def post(self, author: int) -> None:
+        rng, writer = self.rng, self.writer
+        post_id = self.uuid()
+        created_at = self.moment()
+        likers = rng.sample(range(len(self.user_ids)), self.engagement(self.args.likes, len(self.user_ids)))
+        comments = self.engagement(self.args.comments, MAX_COMMENTS)
+        gestures = self.engagement(self.args.gestures, MAX_COMMENTS)
+        content = " ".join(rng.choices(PHRASES, k=rng.randint(1, 6)))
+
+        writer.add(Post.__table__, (
+            post_id, content, self.anonymous_ids[author], created_at, len(likers), comments, gestures, False,
+        ))
+        self.stats[author][3] += 1
+        self.active(author, created_at)
+        for liker in likers:
+            writer.add(Like.__table__, (self.uuid(), post_id, self.anonymous_ids[liker], self.moment(created_at)))
+        for _ in range(comments):
+            commenter = rng.randrange(len(self.user_ids))
+            writer.add(Comment.__table__, (
+                self.uuid(), post_id, rng.choice(COMMENTS), self.anonymous_ids[commenter], self.moment(created_at),
+            ))
+        for _ in range(gestures):
+            giver = rng.randrange(len(self.user_ids))
+            writer.add(CaringGesture.__table__, (
+                self.uuid(), post_id, rng.choice(GESTURE_TYPES), self.anonymous_ids[giver], self.moment(created_at),
+            ))
+
+    def progress(self) -> None:
+        rng = self.rng
+        for user, user_id in enumerate(self.user_ids):
+            stats = self.stats[user]
+            for module_id in rng.sample(self.module_ids, rng.randint(0, len(self.module_ids))):
+                percentage = rng.choice(PROGRESS_STEPS)
+                created_at = self.moment()
+                completed_at = self.moment(created_at) if percentage == 100 else None
+                self.writer.add(UserProgress.__table__, (
+                    self.uuid(), user_id, module_id, percentage == 100, percentage, completed_at, created_at,
+                ))
+                stats[0] += percentage == 100
+                stats[1] += percentage
+                stats[2] += 1
+
+    def affirmations(self) -> None:
+        rng = self.rng
+        for user, user_id in enumerate(self.user_ids):
+            count = self.engagement(self.args.affirmations, int(10 * self.args.affirmations) + 100)
+            for _ in range(count):
+                template_id, content = rng.choice(self.templates)
+                created_at = self.moment()
+                self.writer.add(Affirmation.__table__, (
+                    self.uuid(), user_id, content, template_id,
+                    rng.choices(SENT_VIA, SENT_VIA_WEIGHTS)[0], {}, created_at,
+                ))
+                self.active(user, created_at)
+            self.stats[user][4] += count
+
+    def user_stats(self) -> None:
+        for user_id, stats in zip(self.user_ids, self.stats):
+            last_active = stats[5].date() if stats[5] else None
+            self.writer.add(UserStats.__table__, (
+                user_id, stats[0], stats[1], stats[2], stats[3], stats[4],
+                1 if last_active else 0, last_active, self.until,
+            ))
+
+
+def seed_catalog(engine):
+    """Seed modules and templates; returns their IDs in a stable order."""
+    db = Session(engine)
+    try:
+        seed_coaching_modules(db)
+        seed_affirmation_templates(db)
+        module_ids = list(db.scalars(select(Module.id).order_by(Module.title)))
+        templates = [tuple(row) for row in db.execute(
+            select(AffirmationTemplate.id, AffirmationTemplate.content).order_by(AffirmationTemplate.title)
+        )]
+    finally:
+        db.close()
+    return module_ids, templates
+
+
+def generate(args) -> Dict[str, int]:
+    """Write the whole dataset to ``args.database_url``; returns rows written per table."""
+    # A plain engine: none of the app's query tracking, and never the app's database by default
+    engine = create_engine(args.database_url)
+    try:
+        missing = {table.name for table in TABLES} - set(inspect(engine).get_table_names())
+        if missing:
+            raise RuntimeError(f"{args.database_url} is not migrated (missing {', '.join(sorted(missing))}); "
+                               "run `alembic upgrade head` against it first")
+        return _generate(args, engine)
+    finally:
+        engine.dispose()
+
+
+def _generate(args, engine) -> Dict[str, int]:
+    module_ids, templates = seed_catalog(engine)
+    writer = BatchWriter(engine, args.batch_size)
+    generator = Generator(args, writer, module_ids, templates)
+
+    print(f"Generating {args.users:,} users...")
+    generator.users(get_password_hash(args.password))
+    generator.partners()
+    print(f"Generating {args.posts:,} posts with likes, comments and gestures...")
+    generator.posts()
+    print("Generating progress, affirmations and stats...")
+    generator.progress()
+    generator.affirmations()
+    generator.user_stats()
+    writer.flush()
+
+    # Give the planner statistics for the new table sizes
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return writer.written
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate a large synthetic dataset for performance testing.")
+    parser.add_argument("--database-url", required=True,
+                        help="Database to fill, e.g. sqlite:///./perf.db; migrate it first")
+    parser.add_argument("--users", type=int, default=10_000, help="Users to create")
+    parser.add_argument("--posts", type=int, default=1_000_000, help="Posts to create")
+    parser.add_argument("--likes", type=float, default=4.0, help="Mean likes per post")
+    parser.add_argument("--comments", type=float, default=1.5, help="Mean comments per post")
+    parser.add_argument("--gestures", type=float, default=1.0, help="Mean caring gestures per post")
+    parser.add_argument("--affirmations", type=float, default=20.0, help="Mean affirmations sent per user")
+    parser.add_argument("--partnered", type=float, default=0.6, help="Share of users in a partner pair")
+    parser.add_argument("--days", type=int, default=180, help="Days of activity to spread rows over")
+    parser.add_argument("--until", type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(),
+                        default=datetime(2026, 1, 1).date(), help="End of the activity window (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--password", default="synthetic-password", help="Password of every generated user")
+    parser.add_argument("--batch-size", type=int, default=20_000, help="Rows per table per batch")
+    return parser
+
+
+def main():
+    """Parse arguments and generate the dataset."""
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.users < 1 or not 0 <= args.partnered <= 1:
+        parser.error("--users must be positive and --partnered between 0 and 1")
+
+    started = time.perf_counter()
+    try:
+        written = generate(args)
+    except Exception as e:
+        print(f"\n✗ Error generating data: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+    total = sum(written.values())
+    print(f"\n✓ Generated {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    for table, count in written.items():
+        print(f"  {table:<16} {count:>12,}")
+
+
+if __name__ == "__main__":
+    main()
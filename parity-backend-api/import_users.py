@@ -0,0 +1,146 @@
+"""
+Bulk import of existing users from a CSV or NDJSON file.
+
+Each record needs an ``email`` and either a plaintext ``password`` or an
+existing bcrypt ``hashed_password``. Records are streamed in batches:
+plaintext passwords are hashed in parallel on a process pool, then each
+batch is written with one executemany INSERT that skips emails that are
+already registered.
+
+Usage:
+    python import_users.py users.csv
+    python import_users.py users.ndjson --batch-size 2000 --workers 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from sqlalchemy import func, select
+
+from core.database import engine, insert_ignoring_conflicts
+from core.security import generate_link_code, get_password_hash
+from models.user import User
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+def read_records(path: str, file_format: str) -> Iterator[Dict[str, str]]:
+    """Stream records from a CSV (with header row) or NDJSON file."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        if file_format == "csv":
+            yield from csv.DictReader(fh)
+        else:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batched(records: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def prepare_batch(batch: List[Dict[str, str]], pool: ProcessPoolExecutor, workers: int):
+    """Turn raw records into user rows; returns (rows, number rejected)."""
+    valid, to_hash, rejected = [], [], 0
+    for record in batch:
+        email = (record.get("email") or "").strip()
+        hashed = record.get("hashed_password") or ""
+        password = record.get("password") or ""
+        if not email or "@" not in email:
+            rejected += 1
+        elif hashed:
+            if not hashed.startswith(BCRYPT_PREFIXES):
+                rejected += 1
+            else:
+                valid.append((email, hashed))
+        elif len(password) >= 8:
+            to_hash.append(len(valid))
+            valid.append((email, password))
+        else:
+            rejected += 1
+
+    if to_hash:
+        chunksize = max(1, len(to_hash) // (workers * 4))
+        hashes = pool.map(get_password_hash, [valid[i][1] for i in to_hash], chunksize=chunksize)
+        for i, hashed in zip(to_hash, hashes):
+            valid[i] = (valid[i][0], hashed)
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "email": email,
+            "hashed_password": hashed,
+            "partner_link_code": generate_link_code(),
+            "created_at": now,
+        }
+        for email, hashed in valid
+    ]
+    return rows, rejected
+
+
+def import_users(path: str, file_format: str, batch_size: int, workers: int) -> Dict[str, int]:
+    """Import all records from ``path``; returns counts by outcome."""
+    counts = {"inserted": 0, "duplicates": 0, "rejected": 0}
+    table = User.__table__
+    stmt = insert_ignoring_conflicts(engine, table, ["email"])
+    # executemany rowcount can be -1; RETURNING reports exactly the rows inserted
+    returning = engine.dialect.insert_executemany_returning
+    if returning:
+        stmt = stmt.returning(table.c.id)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in batched(read_records(path, file_format), batch_size):
+            rows, rejected = prepare_batch(batch, pool, workers)
+            counts["rejected"] += rejected
+            if not rows:
+                continue
+            with engine.begin() as conn:
+                if returning:
+                    inserted = len(conn.execute(stmt, rows).all())
+                else:
+                    before = conn.execute(select(func.count()).select_from(table)).scalar()
+                    conn.execute(stmt, rows)
+                    inserted = conn.execute(select(func.count()).select_from(table)).scalar() - before
+            counts["inserted"] += inserted
+            counts["duplicates"] += len(rows) - inserted
+            print(f"  ... {counts['inserted']} inserted, {counts['duplicates']} duplicates, {counts['rejected']} rejected")
+    return counts
+
+
+def main():
+    """Parse arguments and run the import."""
+    parser = argparse.ArgumentParser(description="Bulk import users from CSV or NDJSON.")
+    parser.add_argument("path", help="Input file (.csv, .ndjson or .jsonl)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Input format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Records per INSERT batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Password hashing processes")
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    started = time.perf_counter()
+    try:
+        print(f"Importing users from {args.path}...")
+        counts = import_users(args.path, file_format, args.batch_size, args.workers)
+    except Exception as e:
+        print(f"\n✗ Error importing users: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+    print(
+        f"\n✓ Imported {counts['inserted']} users in {elapsed:.1f}s "
+        f"({counts['duplicates']} already registered, {counts['rejected']} rejected)"
+    )
+
+
+if __name__ == "__main__":
+    main()
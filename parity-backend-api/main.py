@@ -6,21 +6,81 @@ A robust FastAPI backend for managing users, authentication, and partner linking
 This is the main application entry point that brings together all the modules.
 """
 
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-import json
 
 # from core import Base, engine  # Skip database for now
 from api import users_router, partners_router
 from api.social import router as social_router
 from api.coaching import router as coaching_router
 from api.affirmations import router as affirmations_router
+from api.admin import router as admin_router
+from core import settings
+from core.compression import CompressionMiddleware
+from core.deadlines import DeadlineExceeded
+from core.load_shedding import LoadSheddingMiddleware
+from core.access_log import AccessLogMiddleware, configure_logging, shutdown_logging
+from core.request_stats import QueryCounterMiddleware
+from core.responses import ORJSONResponse
+from core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
+from services.delivery import get_dispatcher
+from services.scheduler import get_scheduler
+from services.email import get_email_sender, stop_email_sender
+from services.warmup import is_ready, mark_not_ready, mark_ready, warm_up
+
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the background workers and warm up; stop them in reverse order."""
+    # Again for every lifespan after the first, whose shutdown stopped the writer
+    configure_logging()
+    # Drain the affirmation delivery outbox
+    if settings.DELIVERY_DISPATCHER_ENABLED:
+        get_dispatcher().start()
+    # Open the pooled SMTP connections for account email
+    get_email_sender().start()
+    # Fire scheduled affirmations
+    if settings.SCHEDULER_ENABLED:
+        get_scheduler().start()
+
+    # Runs while the server already answers /health; /ready waits for it
+    warming = None
+    if settings.WARMUP_ENABLED:
+        warming = asyncio.create_task(run_in_threadpool(warm_up, app))
+    else:
+        mark_ready()
+
+    try:
+        yield
+    finally:
+        mark_not_ready()
+        if warming is not None:
+            await warming
+        # The scheduler before the dispatcher it feeds
+        if settings.SCHEDULER_ENABLED:
+            get_scheduler().stop()
+        # Let in-flight delivery batches finish
+        if settings.DELIVERY_DISPATCHER_ENABLED:
+            get_dispatcher().stop()
+        # Send queued account email
+        stop_email_sender()
+        # Write out queued log records
+        shutdown_logging()
+
 
 # Create FastAPI application
 app = FastAPI(
     title="Parity API - User & Relationship Management",
     description="A robust FastAPI backend for managing users, authentication, and partner linking.",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -36,6 +96,10 @@ origins = [
     "http://localhost:8000",  # Backend port
 ]
 
+# Inside CORS so 503s from the concurrency limits still carry CORS headers.
+# Always installed: without limits it still sets each request's deadline.
+app.add_middleware(LoadSheddingMiddleware, limits=None if settings.LOAD_SHED_ENABLED else {})
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,     # Now using explicit list
@@ -44,14 +108,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    print(f"Request: {request.method} {request.url}")
-    
-    response = await call_next(request)
-    print(f"Response status: {response.status_code}")
-    return response
+# Inside the instrumentation so compression time counts towards request latency
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Instrumentation, innermost first; added last so it also times the CORS middleware
+app.add_middleware(QueryCounterMiddleware)
+app.add_middleware(AccessLogMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(DeadlineExceeded)
+def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    """The request ran out of time, usually waiting on the database."""
+    return ORJSONResponse({"detail": "Request timed out."}, status_code=status.HTTP_504_GATEWAY_TIMEOUT)
+
 
 # Include API routers
 app.include_router(users_router)
@@ -59,6 +131,7 @@ app.include_router(partners_router)
 app.include_router(social_router)
 app.include_router(coaching_router)
 app.include_router(affirmations_router)
+app.include_router(admin_router)
 
 # Root endpoints
 @app.get("/", tags=["Root"])
@@ -73,6 +146,22 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready", tags=["Health Check"])
+def readiness_check(response: Response):
+    """Ready once startup warm-up has finished; 503 before that and during shutdown."""
+    if not is_ready():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "warming_up"}
+    return {"status": "ready"}
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["Health Check"], include_in_schema=False)
+    def metrics():
+        """Process metrics in the Prometheus text format."""
+        return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 # Startup event to create database tables
 # @app.on_event("startup")
 # def on_startup():
@@ -82,4 +171,5 @@ def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # The JSON access log replaces uvicorn's synchronous one
+    uvicorn.run(app, host="0.0.0.0", port=8000, access_log=False)
@@ -4,7 +4,7 @@ Affirmation model for positive affirmations feature.
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, JSON, Index
 
 from core.database import Base, UUID
 
@@ -19,3 +19,7 @@ class Affirmation(Base):
     sent_via = Column(String(50), nullable=False)
     recipient_info = Column(JSON, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_affirmations_user_id_created_at', 'user_id', 'created_at'),
+    )
@@ -0,0 +1,30 @@
+"""
+AffirmationDelivery model: the outbox row for an affirmation sent off-app.
+"""
+
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+
+from core.database import Base, UUID
+
+
+class AffirmationDelivery(Base):
+    __tablename__ = "affirmation_deliveries"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    affirmation_id = Column(UUID(as_uuid=True), ForeignKey("affirmations.id", ondelete="CASCADE"), nullable=False)
+    channel = Column(String(50), nullable=False)
+    status = Column(String(20), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    affirmation = relationship("Affirmation")
+
+    __table_args__ = (
+        Index('ix_affirmation_deliveries_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
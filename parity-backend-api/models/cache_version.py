@@ -0,0 +1,16 @@
+"""
+CacheVersion model: shared version counters for process-local caches.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime
+
+from core.database import Base
+
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    name = Column(String(100), primary_key=True)
+    version = Column(Integer, default=1, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -4,7 +4,7 @@ CaringGesture model for social posts.
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 
 from core.database import Base, UUID
 
@@ -17,3 +17,7 @@ class CaringGesture(Base):
     gesture_type = Column(String(50), nullable=False)
     anonymous_user_id = Column(String(64), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_caring_gestures_post_id_created_at', 'post_id', 'created_at'),
+    )
@@ -4,7 +4,7 @@ Post model for anonymous social feed.
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime
+from sqlalchemy import Column, String, Text, Integer, Boolean, DateTime, Index
 
 from core.database import Base, UUID
 
@@ -20,3 +20,7 @@ class Post(Base):
     comment_count = Column(Integer, default=0, nullable=False)
     caring_gesture_count = Column(Integer, default=0, nullable=False)
     is_moderated = Column(Boolean, default=False, nullable=False)
+
+    __table_args__ = (
+        Index('ix_posts_created_at', 'created_at'),
+    )
@@ -0,0 +1,20 @@
+"""
+RateLimitBucket model backing the shared rate limiter.
+"""
+
+from sqlalchemy import Column, Float, Index, String
+
+from core.database import Base
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(128), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    # Unix time of the last refill; plain seconds so both dialects can do the arithmetic
+    refilled_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index('ix_rate_limit_buckets_refilled_at', 'refilled_at'),
+    )
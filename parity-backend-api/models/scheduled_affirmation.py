@@ -0,0 +1,30 @@
+"""
+ScheduledAffirmation model for one-off and recurring affirmations.
+"""
+
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, JSON, Index
+
+from core.database import Base, UUID
+
+
+class ScheduledAffirmation(Base):
+    __tablename__ = "scheduled_affirmations"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    content = Column(Text, nullable=False)
+    template_id = Column(UUID(as_uuid=True), ForeignKey("affirmation_templates.id", ondelete="SET NULL"), nullable=True)
+    sent_via = Column(String(50), nullable=False)
+    recipient_info = Column(JSON, nullable=False)
+    # Next occurrence in UTC; NULL once a one-off has fired or the schedule is cancelled
+    scheduled_at = Column(DateTime, nullable=True)
+    recurrence = Column(String(20), nullable=True)
+    last_sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_scheduled_affirmations_scheduled_at', 'scheduled_at'),
+        Index('ix_scheduled_affirmations_user_id', 'user_id'),
+    )
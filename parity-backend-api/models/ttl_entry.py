@@ -0,0 +1,20 @@
+"""
+TTLEntry model backing the shared database TTL store.
+"""
+
+from sqlalchemy import Column, String, DateTime, JSON, Index
+
+from core.database import Base
+
+
+class TTLEntry(Base):
+    __tablename__ = "ttl_entries"
+
+    namespace = Column(String(50), primary_key=True)
+    key = Column(String(128), primary_key=True)
+    value = Column(JSON, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_ttl_entries_expires_at', 'expires_at'),
+    )
@@ -12,6 +12,11 @@ from core.database import Base, UUID
 from core.security import generate_link_code
 
 
+def anonymous_id_for(user_id) -> str:
+    """Derive the anonymous social ID for a user ID."""
+    return hashlib.sha256(str(user_id).encode()).hexdigest()[:16]
+
+
 class User(Base):
     """User model for storing user account information."""
     
@@ -36,4 +41,4 @@ class User(Base):
     @property
     def anonymous_id(self) -> str:
         """Generate a consistent anonymous ID for social posts."""
-        return hashlib.sha256(str(self.id).encode()).hexdigest()[:16]
+        return anonymous_id_for(self.id)
@@ -0,0 +1,29 @@
+"""
+UserDocument models for persisted per-user settings and profile.
+
+A document ("settings" or "profile") is a version row plus one row per
+top-level section, so a PATCH rewrites only the sections it touches.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, JSON
+
+from core.database import Base, UUID
+
+
+class UserDocument(Base):
+    __tablename__ = "user_documents"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, default=1, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class UserDocumentSection(Base):
+    __tablename__ = "user_document_sections"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String(50), primary_key=True)
+    section = Column(String(50), primary_key=True)
+    data = Column(JSON, nullable=False)
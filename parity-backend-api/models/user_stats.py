@@ -0,0 +1,29 @@
+"""
+UserStats model holding the materialized per-user analytics counters.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey
+
+from core.database import Base, UUID
+
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    modules_completed = Column(Integer, default=0, nullable=False)
+    progress_total = Column(Integer, default=0, nullable=False)
+    progress_count = Column(Integer, default=0, nullable=False)
+    posts_count = Column(Integer, default=0, nullable=False)
+    affirmations_sent = Column(Integer, default=0, nullable=False)
+    streak_days = Column(Integer, default=0, nullable=False)
+    last_active_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    @property
+    def average_progress(self) -> float:
+        """Average progress percentage across all started modules."""
+        if not self.progress_count:
+            return 0.0
+        return round(self.progress_total / self.progress_count, 1)
@@ -2,7 +2,7 @@
 Pydantic schemas for data validation and serialization.
 """
 
-from .user import UserBase, UserCreate, UserPublic, PartnerLink
+from .user import UserBase, UserCreate, UserPublic, PartnerLink, UserStatsPublic
 from .auth import Token, TokenData
 
 __all__ = [
@@ -10,6 +10,7 @@ __all__ = [
     "UserCreate", 
     "UserPublic",
     "PartnerLink",
+    "UserStatsPublic",
     "Token",
     "TokenData"
 ]
@@ -4,7 +4,7 @@ Pydantic schemas for affirmations feature.
 
 from datetime import datetime
 from uuid import UUID
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
 
 
@@ -33,3 +33,29 @@ class AffirmationPublic(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ScheduledAffirmationCreate(AffirmationCreate):
+    scheduled_at: datetime
+    recurrence: Optional[str] = Field(default=None, pattern="^(daily|weekly)$")
+
+
+class ScheduledAffirmationPublic(BaseModel):
+    id: UUID
+    content: str
+    sent_via: str
+    scheduled_at: Optional[datetime]
+    recurrence: Optional[str]
+    last_sent_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class SentAffirmation(AffirmationPublic):
+    recipient_info: Optional[Dict[str, Any]] = None
+
+
+class SentAffirmationPage(BaseModel):
+    items: List[SentAffirmation]
+    next_cursor: Optional[str] = None
@@ -3,9 +3,12 @@ Pydantic schemas for user-related data validation and serialization.
 """
 
 import uuid
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr, Field
 
+from .affirmation import AffirmationPublic
+from .coaching import UserProgressPublic
+
 
 class UserBase(BaseModel):
     """Base user schema with common fields."""
@@ -29,3 +32,25 @@ class UserPublic(UserBase):
 class PartnerLink(BaseModel):
     """Schema for partner link code."""
     partner_link_code: str
+
+
+class UserStatsPublic(BaseModel):
+    """Schema for the materialized per-user analytics counters."""
+    modules_completed: int
+    average_progress: float
+    posts: int
+    affirmations_sent: int
+    streak_days: int
+
+
+class PartnerDashboardMember(BaseModel):
+    """One partner's half of the joint dashboard."""
+    user_id: uuid.UUID
+    progress: List[UserProgressPublic]
+    recent_affirmations: List[AffirmationPublic]
+
+
+class PartnerDashboard(BaseModel):
+    """Schema for the joint partner dashboard."""
+    me: PartnerDashboardMember
+    partner: PartnerDashboardMember
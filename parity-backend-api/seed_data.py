@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from core.database import SessionLocal
 from models.module import Module
 from models.affirmation_template import AffirmationTemplate
+from services.templates import invalidate_templates
 
 
 def seed_coaching_modules(db: Session):
@@ -166,6 +167,7 @@ def seed_affirmation_templates(db: Session):
         }
     ]
     
+    added = False
     for template_data in templates_data:
         existing = db.query(AffirmationTemplate).filter(
             AffirmationTemplate.title == template_data["title"]
@@ -173,7 +175,10 @@ def seed_affirmation_templates(db: Session):
         if not existing:
             template = AffirmationTemplate(**template_data)
             db.add(template)
+            added = True
     
+    if added:
+        invalidate_templates(db)
     db.commit()
     print(f"✓ Seeded {len(templates_data)} affirmation templates")
 
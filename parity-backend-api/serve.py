@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Production launcher: gunicorn managing uvicorn workers.
+
+- Runs ``SERVER_WORKERS`` worker processes, one per CPU by default.
+- Preloads the app in the master before forking, so the imported code,
+  configured mappers and compiled response adapters are shared
+  copy-on-write. ``gc.freeze()`` keeps the collector from touching, and
+  so copying, those pages in the workers.
+- Restarts each worker after ``SERVER_MAX_REQUESTS`` requests, plus up to
+  ``SERVER_MAX_REQUESTS_JITTER`` so workers do not all restart together,
+  to bound memory growth.
+- Runs the delivery dispatcher and the affirmation scheduler, when
+  ``DELIVERY_DISPATCHER_ENABLED`` and ``SCHEDULER_ENABLED`` are set, once
+  each in a child process of the master (``python -m services.delivery``
+  and ``python -m services.scheduler``), and turns both off in the
+  workers, so N workers do not run N copies. Schedules created by the
+  workers are picked up within ``SCHEDULER_POLL_SECONDS``.
+- On SIGTERM, workers stop accepting connections, finish in-flight
+  requests and run the app's lifespan shutdown, which drains the email
+  sender and the log queue. Workers still running after
+  ``SERVER_GRACEFUL_TIMEOUT`` seconds are killed. The background services
+  then get the same time to finish their current pass.
+- Takes the client address from ``X-Forwarded-For`` only for connections
+  from ``FORWARDED_ALLOW_IPS``, so per-IP rate limits see real clients
+  behind a reverse proxy.
+
+Usage:
+    python serve.py
+    python serve.py --workers 8 --bind 0.0.0.0:8000 --max-requests 5000
+"""
+
+import argparse
+import gc
+import os
+import signal
+import subprocess
+import sys
+
+from gunicorn.app.base import BaseApplication
+from sqlalchemy.orm import configure_mappers
+from uvicorn.workers import UvicornWorker
+
+from core.config import settings
+
+
+class ParityWorker(UvicornWorker):
+    # The JSON access log replaces uvicorn's synchronous one
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "access_log": False}
+
+
+# Setting that enables a background service -> module run as its process
+BACKGROUND_SERVICES = {
+    "DELIVERY_DISPATCHER_ENABLED": "services.delivery",
+    "SCHEDULER_ENABLED": "services.scheduler",
+}
+
+
+def post_fork(server, worker):
+    """Give the worker its own log writer thread and connection pool."""
+    from core.access_log import configure_logging
+    from core.database import engine
+
+    # Connections opened by the master must not be shared; close=False
+    # leaves them to the master instead of closing its sockets
+    engine.dispose(close=False)
+    configure_logging()
+    # The master runs these once for all workers
+    for name in BACKGROUND_SERVICES:
+        setattr(settings, name, False)
+
+
+def when_ready(server):
+    """Start each enabled background service in its own process."""
+    server.background = []
+    for name, module in BACKGROUND_SERVICES.items():
+        if getattr(settings, name):
+            # Own session, so a Ctrl+C in the terminal reaches only the master
+            process = subprocess.Popen([sys.executable, "-m", module], start_new_session=True)
+            server.log.info("Started %s (pid: %s)", module, process.pid)
+            server.background.append(process)
+
+
+def on_exit(server):
+    """Stop the background services, as Ctrl+C would."""
+    processes = getattr(server, "background", [])
+    for process in processes:
+        process.send_signal(signal.SIGINT)
+    for process in processes:
+        try:
+            process.wait(server.cfg.graceful_timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+class ParityServer(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+        from services.warmup import build_response_adapters
+
+        # The parts of warm-up that need no database or threads
+        configure_mappers()
+        build_response_adapters(app)
+        if self.cfg.preload_app:
+            from core.access_log import shutdown_logging
+
+            # Threads do not survive fork; post_fork starts a writer per worker
+            shutdown_logging()
+            gc.freeze()
+        return app
+
+
+def main():
+    """Parse arguments and run the server."""
+    parser = argparse.ArgumentParser(description="Run the API with gunicorn and uvicorn workers.")
+    parser.add_argument("--bind", default="0.0.0.0:8000", help="Address to listen on")
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS or os.cpu_count() or 1,
+                        help="Worker processes (default: SERVER_WORKERS, else the CPU count)")
+    parser.add_argument("--max-requests", type=int, default=settings.SERVER_MAX_REQUESTS,
+                        help="Restart a worker after this many requests; 0 disables")
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.SERVER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT,
+                        help="Seconds to drain a worker on shutdown or restart")
+    parser.add_argument("--forwarded-allow-ips", default=settings.FORWARDED_ALLOW_IPS,
+                        help="Proxies trusted to set the client address via X-Forwarded-For")
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="Import the app in each worker instead of once in the master")
+    args = parser.parse_args()
+
+    ParityServer({
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "serve.ParityWorker",
+        "preload_app": args.preload,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter if args.max_requests else 0,
+        "graceful_timeout": args.graceful_timeout,
+        "forwarded_allow_ips": args.forwarded_allow_ips,
+        "post_fork": post_fork,
+        "when_ready": when_ready,
+        "on_exit": on_exit,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
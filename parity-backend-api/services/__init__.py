@@ -0,0 +1,3 @@
+"""
+Domain services shared by the API routers and background jobs.
+"""
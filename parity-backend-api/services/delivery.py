@@ -0,0 +1,424 @@
+"""
+Outbound affirmation delivery.
+
+``send_affirmation`` only writes an ``affirmation_deliveries`` outbox row in
+the same transaction as the affirmation. ``DeliveryDispatcher`` claims due
+rows in bulk, groups them by channel and hands batches to pluggable
+transports, retrying failures with exponential backoff.
+"""
+
+import json
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import uuid
+
+from sqlalchemy import select, update, bindparam
+
+from core.config import settings
+from core.database import SessionLocal
+from models.affirmation import Affirmation
+from models.affirmation_delivery import AffirmationDelivery
+from services.email import build_message, close_connection, reuse_or_connect, smtp_connection_factory
+
+logger = logging.getLogger("parity.delivery")
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# Channels that leave the app; "in-app" affirmations need no delivery
+OUTBOUND_CHANNELS = ("sms", "email", "social")
+
+
+@dataclass
+class OutboundMessage:
+    """A claimed delivery handed to a transport."""
+    delivery_id: uuid.UUID
+    channel: str
+    content: str
+    recipient: dict
+    attempts: int
+
+
+class Transport(ABC):
+    """Base class for delivery transports.
+
+    ``send_batch`` returns one entry per message: ``None`` on success or an
+    error string. Raising marks the whole batch as failed.
+    """
+
+    @abstractmethod
+    def send_batch(self, messages: List[OutboundMessage]) -> List[Optional[str]]:
+        """Send a batch of messages of one channel."""
+
+    def close(self) -> None:
+        """Release connections held between batches."""
+
+
+class FileTransport(Transport):
+    """Appends messages as JSON lines to ``<directory>/<channel>.ndjson``.
+
+    Stands in for SMS and social providers locally and in tests.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages):
+        os.makedirs(self.directory, exist_ok=True)
+        lines = "".join(
+            json.dumps({
+                "delivery_id": str(message.delivery_id),
+                "channel": message.channel,
+                "content": message.content,
+                "recipient": message.recipient,
+            }) + "\n"
+            for message in messages
+        )
+        with self._lock:
+            with open(os.path.join(self.directory, f"{messages[0].channel}.ndjson"), "a") as fh:
+                fh.write(lines)
+        return [None] * len(messages)
+
+
+class SMTPTransport(Transport):
+    """Sends emails over persistent SMTP connections.
+
+    Connections come from ``services.email``'s factory, so STARTTLS and
+    login follow the ``SMTP_*`` settings, and are kept between batches, one
+    per batch in flight. Every message gets its own outcome: a dropped
+    connection is reopened and the message retried once, and any other
+    error fails only that message, so messages already sent in the batch
+    are never sent again.
+    """
+
+    def __init__(self, connection_factory: Optional[Callable[[], object]] = None,
+                 subject: str = "A note from your partner"):
+        self.connection_factory = connection_factory or smtp_connection_factory()
+        self.subject = subject
+        # (connection, last used) pairs not currently lent to a batch
+        self._idle: List[Tuple[object, float]] = []
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages):
+        with self._lock:
+            connection, last_used = self._idle.pop() if self._idle else (None, 0.0)
+        results = []
+        try:
+            for message in messages:
+                to_address = message.recipient.get("email")
+                if not to_address:
+                    results.append("Recipient has no email address.")
+                    continue
+                email = build_message(to_address, self.subject, message.content)
+                error = None
+                for attempt in range(2):
+                    try:
+                        connection = reuse_or_connect(connection, last_used, self.connection_factory)
+                        connection.send_message(email)
+                        last_used = time.monotonic()
+                        error = None
+                        break
+                    except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+                        # Drop the broken connection; the retry reconnects
+                        connection = close_connection(connection)
+                        error = str(e) or type(e).__name__
+                    except smtplib.SMTPException as e:
+                        # Rejected by the server; retrying will not help
+                        error = str(e)
+                        break
+                results.append(error)
+        finally:
+            if connection is not None:
+                with self._lock:
+                    self._idle.append((connection, last_used))
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            close_connection(connection)
+
+
+def default_transports() -> Dict[str, Transport]:
+    """Build the transports configured in settings."""
+    file_transport = FileTransport(settings.DELIVERY_OUTBOX_DIR)
+    transports = {channel: file_transport for channel in OUTBOUND_CHANNELS}
+    if settings.SMTP_HOST:
+        transports["email"] = SMTPTransport()
+    return transports
+
+
+def enqueue_delivery(db, affirmation: Affirmation) -> None:
+    """Add the outbox row for an affirmation without committing."""
+    if affirmation.sent_via in OUTBOUND_CHANNELS:
+        db.add(AffirmationDelivery(affirmation=affirmation, channel=affirmation.sent_via))
+
+
+class DeliveryDispatcher:
+    """Background worker that drains the delivery outbox.
+
+    Each pass claims up to ``claim_size`` due rows with one UPDATE per batch,
+    sends them per channel in ``batch_size`` chunks on a per-channel pool of
+    ``concurrency`` threads, then records the outcomes with executemany.
+    Only rows the claiming UPDATE itself moved to ``sending`` are sent, so
+    dispatchers in several workers never send the same row twice.
+    Claimed rows carry a lease in ``next_attempt_at`` so rows left behind by
+    a crashed worker are picked up again.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        transports: Optional[Dict[str, Transport]] = None,
+        batch_size: int = 50,
+        concurrency: int = 4,
+        max_attempts: int = 6,
+        poll_seconds: float = 2.0,
+        base_backoff: float = 5.0,
+        max_backoff: float = 3600.0,
+        lease_seconds: float = 300.0,
+        clock=datetime.utcnow,
+    ):
+        self.session_factory = session_factory
+        self.transports = transports if transports is not None else default_transports()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.claim_size = batch_size * concurrency * len(OUTBOUND_CHANNELS)
+        self.clock = clock
+        self._pools = self._build_pools()
+        self._pools_closed = False
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _build_pools(self) -> Dict[str, ThreadPoolExecutor]:
+        return {
+            channel: ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"delivery-{channel}")
+            for channel in self.transports
+        }
+
+    def notify(self) -> None:
+        """Wake the dispatcher early, e.g. right after an enqueue."""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the worker thread; a stopped dispatcher can be started again."""
+        if self._thread is None:
+            self._stopping.clear()
+            if self._pools_closed:
+                self._pools = self._build_pools()
+                self._pools_closed = False
+            self._thread = threading.Thread(target=self._run, name="delivery-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop after the current pass and wait for in-flight batches."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+        self._pools_closed = True
+        for transport in set(self.transports.values()):
+            transport.close()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception("delivery dispatcher error")
+                processed = 0
+            if processed < self.claim_size:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def backoff(self, attempts: int) -> timedelta:
+        """Exponential backoff with jitter for the given attempt count."""
+        delay = min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    def claim(self, db) -> List[OutboundMessage]:
+        """Lease a batch of due deliveries to this worker."""
+        now = self.clock()
+        query = (
+            select(
+                AffirmationDelivery.id,
+                AffirmationDelivery.channel,
+                AffirmationDelivery.attempts,
+                Affirmation.content,
+                Affirmation.recipient_info,
+            )
+            .join(Affirmation, Affirmation.id == AffirmationDelivery.affirmation_id)
+            .where(
+                AffirmationDelivery.status.in_((PENDING, SENDING)),
+                AffirmationDelivery.next_attempt_at <= now,
+            )
+            .order_by(AffirmationDelivery.next_attempt_at)
+            .limit(self.claim_size)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update(of=AffirmationDelivery, skip_locked=True)
+        rows = db.execute(query).all()
+        if not rows:
+            db.rollback()
+            return []
+
+        # Re-check that each row is still due: without row locks (SQLite)
+        # another worker may have claimed it since the SELECT, and only the
+        # rows this UPDATE changed belong to this worker
+        won = set(db.execute(
+            update(AffirmationDelivery)
+            .where(
+                AffirmationDelivery.id.in_([row.id for row in rows]),
+                AffirmationDelivery.status.in_((PENDING, SENDING)),
+                AffirmationDelivery.next_attempt_at <= now,
+            )
+            .values(status=SENDING, next_attempt_at=now + timedelta(seconds=self.lease_seconds))
+            .returning(AffirmationDelivery.id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+        db.commit()
+        return [
+            OutboundMessage(row.id, row.channel, row.content, row.recipient_info or {}, row.attempts)
+            for row in rows
+            if row.id in won
+        ]
+
+    def run_once(self) -> int:
+        """Claim, send and record one round of deliveries."""
+        db = self.session_factory()
+        try:
+            messages = self.claim(db)
+            if not messages:
+                return 0
+
+            by_channel: Dict[str, List[OutboundMessage]] = {}
+            for message in messages:
+                by_channel.setdefault(message.channel, []).append(message)
+
+            futures = []
+            for channel, channel_messages in by_channel.items():
+                transport = self.transports.get(channel)
+                for i in range(0, len(channel_messages), self.batch_size):
+                    batch = channel_messages[i:i + self.batch_size]
+                    if transport is None:
+                        futures.append((batch, None))
+                    else:
+                        futures.append((batch, self._pools[channel].submit(transport.send_batch, batch)))
+
+            outcomes = []
+            for batch, future in futures:
+                if future is None:
+                    errors = [f"No transport for channel {batch[0].channel}."] * len(batch)
+                else:
+                    try:
+                        errors = future.result()
+                    except Exception as e:
+                        errors = [str(e) or e.__class__.__name__] * len(batch)
+                outcomes.extend(zip(batch, errors))
+
+            self.record(db, outcomes)
+            return len(messages)
+        finally:
+            db.close()
+
+    def record(self, db, outcomes) -> None:
+        """Persist delivery outcomes with one executemany per kind."""
+        now = self.clock()
+        sent, retried = [], []
+        for message, error in outcomes:
+            if error is None:
+                sent.append({"b_id": message.delivery_id, "b_attempts": message.attempts + 1})
+            else:
+                attempts = message.attempts + 1
+                retried.append({
+                    "b_id": message.delivery_id,
+                    "b_attempts": attempts,
+                    "b_status": FAILED if attempts >= self.max_attempts else PENDING,
+                    "b_next": now + self.backoff(attempts),
+                    "b_error": error[:1000],
+                })
+
+        table = AffirmationDelivery.__table__
+        connection = db.connection()
+        if sent:
+            connection.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(status=SENT, attempts=bindparam("b_attempts"), sent_at=now, last_error=None),
+                sent,
+            )
+        if retried:
+            connection.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(
+                    status=bindparam("b_status"),
+                    attempts=bindparam("b_attempts"),
+                    next_attempt_at=bindparam("b_next"),
+                    last_error=bindparam("b_error"),
+                ),
+                retried,
+            )
+        db.commit()
+
+
+dispatcher: Optional[DeliveryDispatcher] = None
+
+
+def get_dispatcher() -> DeliveryDispatcher:
+    """Return the process-wide dispatcher, creating it from settings."""
+    global dispatcher
+    if dispatcher is None:
+        dispatcher = DeliveryDispatcher(
+            batch_size=settings.DELIVERY_BATCH_SIZE,
+            concurrency=settings.DELIVERY_CONCURRENCY,
+            max_attempts=settings.DELIVERY_MAX_ATTEMPTS,
+            poll_seconds=settings.DELIVERY_POLL_SECONDS,
+        )
+    return dispatcher
+
+
+def notify_dispatcher() -> None:
+    """Wake the in-process dispatcher if one is running."""
+    if dispatcher is not None:
+        dispatcher.notify()
+
+
+def main():
+    """Run the dispatcher as a standalone worker process."""
+    worker = get_dispatcher()
+    worker.start()
+    print("Delivery dispatcher running. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\nStopping delivery dispatcher...")
+    finally:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
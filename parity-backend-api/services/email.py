@@ -0,0 +1,216 @@
+"""
+Background email sender for account email such as password resets.
+
+Requests only enqueue a message. A small pool of worker threads each keep
+one SMTP connection open, reuse it across messages, reconnect when the
+server drops it, and drain the queue in batches. The queue is bounded, so
+at most ``max_in_flight`` messages wait at any time.
+
+For local testing run an SMTP stand-in, e.g.
+``python -m aiosmtpd -n -l localhost:8025``, and set ``SMTP_HOST=localhost``
+and ``SMTP_PORT=8025``.
+"""
+
+import logging
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from typing import Callable, List, Optional
+
+from core.config import settings
+
+logger = logging.getLogger("parity.email")
+
+# Connections idle for longer than this are checked with NOOP before use
+IDLE_CHECK_SECONDS = 30.0
+
+
+class ConsoleConnection:
+    """Stand-in SMTP connection used without SMTP_HOST.
+
+    Logs the recipient and subject at DEBUG. The body, which may hold a
+    password reset token, is printed only with ``EMAIL_CONSOLE_BODIES``.
+    """
+
+    def send_message(self, message: EmailMessage) -> None:
+        logger.debug("email not sent, no SMTP_HOST", extra={"to": message["To"], "subject": message["Subject"]})
+        if settings.EMAIL_CONSOLE_BODIES:
+            print(f"Email to {message['To']}: {message['Subject']}\n{message.get_content()}")
+
+    def noop(self):
+        return (250, b"OK")
+
+    def quit(self) -> None:
+        pass
+
+
+def smtp_connection_factory() -> Callable[[], object]:
+    """Connection factory configured from settings."""
+    if not settings.SMTP_HOST:
+        return ConsoleConnection
+
+    def connect():
+        smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=10)
+        if settings.SMTP_STARTTLS:
+            smtp.starttls()
+        if settings.SMTP_USERNAME:
+            smtp.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        return smtp
+
+    return connect
+
+
+def reuse_or_connect(connection, last_used: float, connection_factory: Callable[[], object]):
+    """A usable connection: ``connection`` itself, checked with NOOP if it sat
+    idle too long, or a new one from ``connection_factory`` if it is None.
+
+    Raises ``SMTPServerDisconnected`` when the NOOP shows the server dropped it.
+    """
+    if connection is not None and time.monotonic() - last_used > IDLE_CHECK_SECONDS:
+        if connection.noop()[0] != 250:
+            raise smtplib.SMTPServerDisconnected("NOOP failed")
+    if connection is None:
+        connection = connection_factory()
+    return connection
+
+
+def close_connection(connection) -> None:
+    """Quit an SMTP connection, ignoring errors; returns None for reassignment."""
+    if connection is not None:
+        try:
+            connection.quit()
+        except Exception:
+            pass
+    return None
+
+
+class EmailSender:
+    """Pooled, queued SMTP sender.
+
+    ``send`` returns False instead of blocking when the queue is full.
+    Each of the ``connections`` workers takes up to ``batch_size`` queued
+    messages at a time and sends them over its own persistent connection.
+    """
+
+    def __init__(
+        self,
+        connection_factory: Optional[Callable[[], object]] = None,
+        connections: int = 2,
+        max_in_flight: int = 1000,
+        batch_size: int = 20,
+        max_attempts: int = 3,
+    ):
+        self.connection_factory = connection_factory or smtp_connection_factory()
+        self.connections = connections
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.sent = 0
+        self.failed = 0
+        self._queue: "queue.Queue[Optional[EmailMessage]]" = queue.Queue(maxsize=max_in_flight)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.connections):
+                thread = threading.Thread(target=self._run, name=f"email-sender-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Send what is queued, then close the connections."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def send(self, message: EmailMessage) -> bool:
+        """Queue a message for delivery; False if the queue is full."""
+        if not self._threads:
+            self.start()
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def _next_batch(self) -> List[Optional[EmailMessage]]:
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        connection = None
+        last_used = 0.0
+        while True:
+            batch = self._next_batch()
+            stopping = batch[-1] is None
+            messages = [message for message in batch if message is not None]
+
+            for message in messages:
+                for attempt in range(1, self.max_attempts + 1):
+                    try:
+                        connection = reuse_or_connect(connection, last_used, self.connection_factory)
+                        connection.send_message(message)
+                        last_used = time.monotonic()
+                        self.sent += 1
+                        break
+                    except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+                        # Drop the broken connection; the next attempt reconnects
+                        connection = close_connection(connection)
+                        if attempt == self.max_attempts:
+                            self.failed += 1
+                            logger.error("email send failed", extra={"error": str(e)})
+                        else:
+                            time.sleep(0.5 * attempt)
+                    except smtplib.SMTPException as e:
+                        # Rejected by the server; retrying will not help
+                        self.failed += 1
+                        logger.error("email rejected", extra={"error": str(e)})
+                        break
+
+            for _ in batch:
+                self._queue.task_done()
+            if stopping:
+                close_connection(connection)
+                return
+
+
+def build_message(to_address: str, subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.SMTP_FROM
+    message["To"] = to_address
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+email_sender: Optional[EmailSender] = None
+
+
+def get_email_sender() -> EmailSender:
+    """Return the process-wide sender, creating it from settings."""
+    global email_sender
+    if email_sender is None:
+        email_sender = EmailSender(
+            connections=settings.EMAIL_CONNECTIONS,
+            max_in_flight=settings.EMAIL_MAX_IN_FLIGHT,
+            batch_size=settings.EMAIL_BATCH_SIZE,
+        )
+    return email_sender
+
+
+def stop_email_sender() -> None:
+    if email_sender is not None:
+        email_sender.stop()
@@ -0,0 +1,88 @@
+"""
+Joint dashboard data for a linked pair of partners.
+
+Both partners' coaching progress and recent affirmations are loaded with
+one ``IN (me, partner)`` query per table and cached per user. A cached
+slice is reused while the user's ``user_stats.updated_at`` is unchanged;
+every progress update and affirmation bumps that row, so a write by either
+partner invalidates their half of the pair in every worker. The freshness
+check is a single primary-key query for both users.
+"""
+
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+import uuid
+
+from sqlalchemy import select, func
+
+from core.cache import LRUCache
+from core.config import settings
+from models.affirmation import Affirmation
+from models.user_progress import UserProgress
+from models.user_stats import UserStats
+from schemas.affirmation import AffirmationPublic
+from schemas.coaching import UserProgressPublic
+
+RECENT_AFFIRMATIONS = 5
+
+
+class DashboardSlice(NamedTuple):
+    version: Optional[datetime]
+    progress: List[UserProgressPublic]
+    recent_affirmations: List[AffirmationPublic]
+
+
+dashboard_cache = LRUCache("partner_dashboard", max_entries=settings.PARTNER_DASHBOARD_CACHE_SIZE)
+
+
+def load_dashboard_slices(db, user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, DashboardSlice]:
+    """Dashboard data for each user, from cache where still current."""
+    versions = dict(db.execute(
+        select(UserStats.user_id, UserStats.updated_at).where(UserStats.user_id.in_(user_ids))
+    ).all())
+
+    slices: Dict[uuid.UUID, DashboardSlice] = {}
+    missing = []
+    for user_id in user_ids:
+        cached = dashboard_cache.get(user_id, version=versions.get(user_id))
+        if cached is not None:
+            slices[user_id] = cached
+        else:
+            missing.append(user_id)
+    if not missing:
+        return slices
+
+    progress: Dict[uuid.UUID, List[UserProgressPublic]] = {user_id: [] for user_id in missing}
+    for row in db.execute(
+        select(
+            UserProgress.id,
+            UserProgress.user_id,
+            UserProgress.module_id,
+            UserProgress.completed,
+            UserProgress.progress_percentage,
+            UserProgress.completed_at,
+        ).where(UserProgress.user_id.in_(missing))
+    ):
+        progress[row.user_id].append(UserProgressPublic.model_validate(row))
+
+    ranked = select(
+        Affirmation.id,
+        Affirmation.user_id,
+        Affirmation.content,
+        Affirmation.sent_via,
+        Affirmation.created_at,
+        func.row_number().over(
+            partition_by=Affirmation.user_id,
+            order_by=(Affirmation.created_at.desc(), Affirmation.id.desc()),
+        ).label("rank"),
+    ).where(Affirmation.user_id.in_(missing)).subquery()
+    affirmations: Dict[uuid.UUID, List[AffirmationPublic]] = {user_id: [] for user_id in missing}
+    for row in db.execute(
+        select(ranked).where(ranked.c.rank <= RECENT_AFFIRMATIONS).order_by(ranked.c.user_id, ranked.c.rank)
+    ):
+        affirmations[row.user_id].append(AffirmationPublic.model_validate(row))
+
+    for user_id in missing:
+        slices[user_id] = DashboardSlice(versions.get(user_id), progress[user_id], affirmations[user_id])
+        dashboard_cache.set(user_id, slices[user_id])
+    return slices
@@ -0,0 +1,87 @@
+"""
+Read models for the hot list endpoints.
+
+These run Core ``select()`` statements on the session's connection,
+selecting just the columns a response needs, and return plain result
+rows. That skips ORM instances, the identity map and, for UUID columns,
+the ``UUID`` TypeDecorator: ids come back as the driver's string.
+
+Each query returns an iterator of row partitions, fetched with
+``yield_per`` so large results are streamed from the cursor instead of
+buffered. Column labels match the fields of the response schema named in
+each docstring, so ``core.responses.json_rows_response`` can encode the
+rows without validating them. Keep the two in step.
+"""
+
+from typing import Iterator, Sequence
+
+from sqlalchemy import String, desc, select, type_coerce
+from sqlalchemy.engine import Row
+
+from models.caring_gesture import CaringGesture
+from models.comment import Comment
+from models.module import Module
+from models.post import Post
+
+# Rows fetched from the cursor per partition
+YIELD_PER = 500
+
+
+def raw_uuid(column):
+    """A UUID column read as the driver's string, labelled with its key."""
+    return type_coerce(column, String).label(column.key)
+
+
+def stream_rows(db, statement, yield_per: int = YIELD_PER) -> Iterator[Sequence[Row]]:
+    """Execute ``statement`` and yield its rows in partitions."""
+    result = db.connection().execute(statement.execution_options(yield_per=yield_per))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def feed_posts(db, limit: int, offset: int) -> Iterator[Sequence[Row]]:
+    """Rows for ``PostPublic``, newest first."""
+    return stream_rows(db, select(
+        raw_uuid(Post.id),
+        Post.content,
+        Post.anonymous_user_id,
+        Post.created_at,
+        Post.like_count,
+        Post.comment_count,
+        Post.caring_gesture_count,
+    ).order_by(desc(Post.created_at)).limit(limit).offset(offset))
+
+
+def post_comments(db, post_id) -> Iterator[Sequence[Row]]:
+    """Rows for ``CommentPublic``, oldest first."""
+    return stream_rows(db, select(
+        raw_uuid(Comment.id),
+        raw_uuid(Comment.post_id),
+        Comment.content,
+        Comment.anonymous_user_id,
+        Comment.created_at,
+    ).where(Comment.post_id == post_id).order_by(Comment.created_at))
+
+
+def post_caring_gestures(db, post_id) -> Iterator[Sequence[Row]]:
+    """Rows for ``CaringGesturePublic``, oldest first."""
+    return stream_rows(db, select(
+        raw_uuid(CaringGesture.id),
+        raw_uuid(CaringGesture.post_id),
+        CaringGesture.gesture_type,
+        CaringGesture.created_at,
+    ).where(CaringGesture.post_id == post_id).order_by(CaringGesture.created_at))
+
+
+def coaching_modules(db) -> Iterator[Sequence[Row]]:
+    """Rows for ``ModulePublic`` in catalog order."""
+    return stream_rows(db, select(
+        raw_uuid(Module.id),
+        Module.title,
+        Module.description,
+        Module.content,
+        Module.category,
+        Module.order,
+    ).order_by(Module.order))
@@ -0,0 +1,296 @@
+"""
+Timer scheduler for scheduled affirmations.
+
+Rather than polling ``scheduled_affirmations`` for due rows, the scheduler
+keeps only the next ``window`` of occurrences in a min-heap, loaded with one
+range scan of the ``scheduled_at`` index. Memory is bounded by
+``max_loaded`` no matter how many schedules exist. Due occurrences are
+fired in batches: one transaction advances the schedules and inserts the
+affirmations and their outbox rows. The advance only applies to
+schedules that are still due, and affirmations are sent only for those,
+so when several processes run a scheduler each occurrence is sent once.
+
+Schedules created in the same process are handed over by
+``notify_scheduler`` and fire on time. Those created by another process
+(the API workers, when the scheduler runs standalone) are seen by the
+next reload, which happens at least every ``SCHEDULER_POLL_SECONDS``, so
+they fire at most that late.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+import uuid
+
+from sqlalchemy import bindparam, case, select, update
+
+from core.config import settings
+from core.database import SessionLocal
+from models.affirmation import Affirmation
+from models.scheduled_affirmation import ScheduledAffirmation
+from services.delivery import enqueue_delivery, notify_dispatcher
+from services.stats import bump_user_stats
+
+logger = logging.getLogger("parity.scheduler")
+
+RECURRENCE_PERIODS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+}
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Normalize a datetime to the naive UTC values stored in the database."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def next_occurrence(scheduled_at: datetime, recurrence: Optional[str], now: datetime) -> Optional[datetime]:
+    """The first occurrence after ``now``, or None for a one-off schedule.
+
+    Missed occurrences (e.g. after downtime) are skipped rather than sent
+    in a burst.
+    """
+    period = RECURRENCE_PERIODS.get(recurrence)
+    if period is None:
+        return None
+    missed = (now - scheduled_at) // period + 1 if scheduled_at <= now else 1
+    return scheduled_at + period * missed
+
+
+class AffirmationScheduler:
+    """Fires scheduled affirmations from an in-memory window of due items.
+
+    The heap holds ``(scheduled_at, id)`` for occurrences up to the current
+    horizon. When the clock passes the horizon, or ``poll_interval`` after
+    the last load, the window is reloaded from the index. ``clock`` is
+    injectable so the scheduler can be driven with simulated time via
+    ``run_once``.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        window: timedelta = timedelta(minutes=5),
+        max_loaded: int = 10000,
+        batch_size: int = 500,
+        poll_interval: timedelta = timedelta(seconds=5),
+        clock=datetime.utcnow,
+    ):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_loaded = max_loaded
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self._heap: List[Tuple[datetime, uuid.UUID]] = []
+        self._horizon: Optional[datetime] = None
+        self._next_poll: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, schedule_id: uuid.UUID, scheduled_at: datetime) -> None:
+        """Tell the scheduler about a schedule created in this process.
+
+        Anything beyond the horizon is picked up by a later reload.
+        """
+        with self._lock:
+            if self._horizon is not None and scheduled_at <= self._horizon and len(self._heap) < self.max_loaded:
+                heapq.heappush(self._heap, (scheduled_at, schedule_id))
+        self._wakeup.set()
+
+    def reload(self, db, now: datetime) -> None:
+        """Replace the heap with the next window read from the index."""
+        horizon = now + self.window
+        rows = db.execute(
+            select(ScheduledAffirmation.scheduled_at, ScheduledAffirmation.id)
+            .where(ScheduledAffirmation.scheduled_at <= horizon)
+            .order_by(ScheduledAffirmation.scheduled_at)
+            .limit(self.max_loaded)
+        ).all()
+        heap = [(row.scheduled_at, row.id) for row in rows]
+        heapq.heapify(heap)
+        if len(rows) == self.max_loaded:
+            # Window truncated: only trust it up to the last loaded item
+            horizon = rows[-1].scheduled_at
+        with self._lock:
+            self._heap = heap
+            self._horizon = horizon
+            self._next_poll = now + self.poll_interval
+
+    def pop_due(self, now: datetime) -> List[uuid.UUID]:
+        """Pop up to ``batch_size`` occurrences that are due at ``now``."""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def fire(self, db, schedule_ids: List[uuid.UUID], now: datetime) -> int:
+        """Send one batch of due occurrences in a single transaction."""
+        query = select(ScheduledAffirmation).where(
+            ScheduledAffirmation.id.in_(schedule_ids),
+            ScheduledAffirmation.scheduled_at <= now,
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        schedules = db.execute(query).scalars().all()
+        if not schedules:
+            db.rollback()
+            return 0
+
+        # Advance the schedules first, and only where they are still due:
+        # without row locks (SQLite) every worker's heap holds the same
+        # occurrence, and only the worker whose UPDATE moved it may send it
+        table = ScheduledAffirmation.__table__
+        next_at = {
+            schedule.id: next_occurrence(schedule.scheduled_at, schedule.recurrence, now)
+            for schedule in schedules
+        }
+        won = set(db.execute(
+            update(table)
+            .where(table.c.id.in_(list(next_at)), table.c.scheduled_at <= now)
+            .values(
+                scheduled_at=case(
+                    *((table.c.id == schedule_id, bindparam(None, value, type_=table.c.scheduled_at.type))
+                      for schedule_id, value in next_at.items())
+                ),
+                last_sent_at=now,
+            )
+            .returning(table.c.id)
+        ).scalars())
+        schedules = [schedule for schedule in schedules if schedule.id in won]
+        if not schedules:
+            db.rollback()
+            return 0
+
+        sent_per_user = Counter()
+        for schedule in schedules:
+            affirmation = Affirmation(
+                user_id=schedule.user_id,
+                content=schedule.content,
+                template_id=schedule.template_id,
+                sent_via=schedule.sent_via,
+                recipient_info=schedule.recipient_info,
+                created_at=now,
+            )
+            db.add(affirmation)
+            enqueue_delivery(db, affirmation)
+            sent_per_user[schedule.user_id] += 1
+
+        for user_id, count in sent_per_user.items():
+            bump_user_stats(db, user_id, active=False, affirmations_sent=count)
+
+        db.commit()
+        # Only the ids are needed after commit; don't keep the batch in the session
+        db.expunge_all()
+
+        with self._lock:
+            for schedule_id in won:
+                next_time = next_at[schedule_id]
+                if next_time is not None and next_time <= self._horizon and len(self._heap) < self.max_loaded:
+                    heapq.heappush(self._heap, (next_time, schedule_id))
+        notify_dispatcher()
+        return len(schedules)
+
+    def run_once(self) -> int:
+        """Reload if needed and fire everything due now; returns the count fired."""
+        now = self.clock()
+        fired = 0
+        db = self.session_factory()
+        try:
+            if self._horizon is None or now >= min(self._horizon, self._next_poll):
+                self.reload(db, now)
+            while True:
+                due = self.pop_due(now)
+                if not due:
+                    break
+                fired += self.fire(db, due, now)
+        finally:
+            db.close()
+        return fired
+
+    def seconds_until_next(self) -> float:
+        """How long the loop may sleep before something needs doing."""
+        now = self.clock()
+        with self._lock:
+            targets = [min(self._horizon, self._next_poll)] if self._horizon is not None else []
+            if self._heap:
+                targets.append(self._heap[0][0])
+        if not targets:
+            return 0.0
+        return max(0.0, (min(targets) - now).total_seconds())
+
+    def start(self) -> None:
+        """Start the timer thread; a stopped scheduler can be started again."""
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="affirmation-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("affirmation scheduler error")
+                self._wakeup.wait(5)
+            self._wakeup.wait(self.seconds_until_next())
+            self._wakeup.clear()
+
+
+scheduler: Optional[AffirmationScheduler] = None
+
+
+def get_scheduler() -> AffirmationScheduler:
+    """Return the process-wide scheduler, creating it from settings."""
+    global scheduler
+    if scheduler is None:
+        scheduler = AffirmationScheduler(
+            window=timedelta(seconds=settings.SCHEDULER_WINDOW_SECONDS),
+            max_loaded=settings.SCHEDULER_MAX_LOADED,
+            batch_size=settings.SCHEDULER_BATCH_SIZE,
+            poll_interval=timedelta(seconds=settings.SCHEDULER_POLL_SECONDS),
+        )
+    return scheduler
+
+
+def notify_scheduler(schedule_id: uuid.UUID, scheduled_at: datetime) -> None:
+    """Hand a new schedule to the in-process scheduler if one is running."""
+    if scheduler is not None:
+        scheduler.schedule(schedule_id, scheduled_at)
+
+
+def main():
+    """Run the scheduler as a standalone worker process."""
+    worker = get_scheduler()
+    worker.start()
+    print("Affirmation scheduler running. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\nStopping affirmation scheduler...")
+    finally:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Materialized per-user statistics.
+
+Write paths call ``bump_user_stats`` inside their own transaction so the
+``user_stats`` row stays current without COUNT queries on read.
+``rebuild_user_stats`` recomputes every row from the source tables.
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, insert, func, case, literal, bindparam, exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.user import User, anonymous_id_for
+from models.user_stats import UserStats
+from models.user_progress import UserProgress
+from models.affirmation import Affirmation
+from models.post import Post
+
+
+def bump_user_stats(db: Session, user_id, active: bool = True, **deltas: int) -> None:
+    """Apply counter deltas to a user's stats row without committing.
+
+    Uses a single ``UPDATE ... SET col = col + :delta``; the row is created
+    on the user's first write. When ``active`` is set, today's activity
+    extends or restarts the streak.
+    """
+    now = datetime.utcnow()
+    today = now.date()
+
+    values = {name: getattr(UserStats, name) + delta for name, delta in deltas.items()}
+    values["updated_at"] = now
+    if active:
+        values["streak_days"] = case(
+            (UserStats.last_active_date == today, UserStats.streak_days),
+            (UserStats.last_active_date == today - timedelta(days=1), UserStats.streak_days + 1),
+            else_=1,
+        )
+        values["last_active_date"] = today
+
+    stmt = (
+        update(UserStats)
+        .where(UserStats.user_id == user_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(stmt).rowcount:
+        return
+
+    try:
+        with db.begin_nested():
+            db.add(UserStats(
+                user_id=user_id,
+                streak_days=1 if active else 0,
+                last_active_date=today if active else None,
+                updated_at=now,
+                **deltas,
+            ))
+    except IntegrityError:
+        # A concurrent request created the row first
+        db.execute(stmt)
+
+
+def current_streak(stats: UserStats, today=None) -> int:
+    """Streak length as of today; a missed day resets it to zero."""
+    if stats.last_active_date is None:
+        return 0
+    today = today or datetime.utcnow().date()
+    if stats.last_active_date < today - timedelta(days=1):
+        return 0
+    return stats.streak_days
+
+
+def get_user_stats(db: Session, user_id) -> dict:
+    """Read the stats row for a user, falling back to zeros."""
+    stats = db.get(UserStats, user_id)
+    if stats is None:
+        return {
+            "modules_completed": 0,
+            "average_progress": 0.0,
+            "posts": 0,
+            "affirmations_sent": 0,
+            "streak_days": 0,
+        }
+    return {
+        "modules_completed": stats.modules_completed,
+        "average_progress": stats.average_progress,
+        "posts": stats.posts_count,
+        "affirmations_sent": stats.affirmations_sent,
+        "streak_days": current_streak(stats),
+    }
+
+
+def rebuild_user_stats(db: Session) -> int:
+    """Recompute every stats row from the source tables with set-based SQL.
+
+    Streak columns are activity history rather than aggregates, so they are
+    left as they are. Returns the number of users processed.
+    """
+    now = datetime.utcnow()
+
+    # Rows for users who have never written anything
+    missing = select(
+        User.id,
+        literal(0), literal(0), literal(0), literal(0), literal(0), literal(0),
+        literal(now),
+    ).where(~exists().where(UserStats.user_id == User.id))
+    db.execute(insert(UserStats).from_select(
+        ["user_id", "modules_completed", "progress_total", "progress_count",
+         "posts_count", "affirmations_sent", "streak_days", "updated_at"],
+        missing,
+    ))
+
+    def per_user(column):
+        return column.where(UserProgress.user_id == UserStats.user_id).scalar_subquery()
+
+    db.execute(
+        update(UserStats)
+        .values(
+            modules_completed=per_user(
+                select(func.count()).where(UserProgress.completed.is_(True))
+            ),
+            progress_total=per_user(
+                select(func.coalesce(func.sum(UserProgress.progress_percentage), 0))
+            ),
+            progress_count=per_user(select(func.count())),
+            affirmations_sent=(
+                select(func.count())
+                .where(Affirmation.user_id == UserStats.user_id)
+                .scalar_subquery()
+            ),
+            posts_count=0,
+            updated_at=now,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    # Posts are keyed by anonymous ID, which is derived from the user ID
+    # outside the database, so aggregate in SQL and map the groups here.
+    post_counts = dict(db.execute(
+        select(Post.anonymous_user_id, func.count()).group_by(Post.anonymous_user_id)
+    ).all())
+    user_ids = db.execute(select(User.id)).scalars().all()
+    params = [
+        {"b_user_id": user_id, "b_posts": post_counts[anonymous_id]}
+        for user_id in user_ids
+        if (anonymous_id := anonymous_id_for(user_id)) in post_counts
+    ]
+    if params:
+        db.connection().execute(
+            update(UserStats.__table__)
+            .where(UserStats.__table__.c.user_id == bindparam("b_user_id"))
+            .values(posts_count=bindparam("b_posts")),
+            params,
+        )
+
+    db.commit()
+    return len(user_ids)
+
+
+def main():
+    """Rebuild the materialized stats for all users."""
+    db = SessionLocal()
+    try:
+        print("Rebuilding user stats...")
+        count = rebuild_user_stats(db)
+        print(f"✓ Rebuilt stats for {count} users")
+    except Exception as e:
+        print(f"\n✗ Error rebuilding user stats: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+In-memory index of the default affirmation templates.
+
+Templates are seed data, so they are loaded once per cache version,
+grouped by category and pre-serialized to JSON with an ETag per group.
+Each group is also compressed once, so responses are never compressed
+per request.
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+
+from pydantic import TypeAdapter
+
+from core.cache import VersionedCache, bump_cache_version, make_etag
+from core.compression import precompress
+from models.affirmation_template import AffirmationTemplate
+from schemas.affirmation import AffirmationTemplatePublic
+
+TEMPLATES_CACHE = "affirmation_templates"
+
+templates_adapter = TypeAdapter(List[AffirmationTemplatePublic])
+
+
+class SerializedTemplates(NamedTuple):
+    body: bytes
+    etag: str
+    # Content-Encoding -> compressed body
+    encoded: Dict[str, bytes]
+
+
+class TemplateIndex(NamedTuple):
+    all: SerializedTemplates
+    by_category: Dict[str, SerializedTemplates]
+
+    def lookup(self, category: Optional[str] = None) -> SerializedTemplates:
+        if category is None:
+            return self.all
+        return self.by_category.get(category) or EMPTY
+
+
+def serialize(templates: List[AffirmationTemplatePublic]) -> SerializedTemplates:
+    body = templates_adapter.dump_json(templates)
+    return SerializedTemplates(body, make_etag(body), precompress(body))
+
+
+EMPTY = serialize([])
+
+
+def load_template_index(db) -> TemplateIndex:
+    rows = db.query(AffirmationTemplate).filter(
+        AffirmationTemplate.is_default.is_(True)
+    ).order_by(AffirmationTemplate.category, AffirmationTemplate.title).all()
+    templates = [AffirmationTemplatePublic.model_validate(row) for row in rows]
+
+    grouped: Dict[str, List[AffirmationTemplatePublic]] = {}
+    for template in templates:
+        grouped.setdefault(template.category, []).append(template)
+
+    return TemplateIndex(
+        all=serialize(templates),
+        by_category={category: serialize(group) for category, group in grouped.items()},
+    )
+
+
+template_cache = VersionedCache(TEMPLATES_CACHE, load_template_index)
+
+
+def invalidate_templates(db) -> None:
+    """Call in any transaction that adds, edits or removes templates."""
+    bump_cache_version(db, TEMPLATES_CACHE)
@@ -0,0 +1,293 @@
+"""
+Persisted user settings and profile documents.
+
+Each document is stored as a version row plus one JSON row per section.
+Reads probe the version by primary key and serve the sections from a
+per-worker LRU cache while it is current. Writes bump the version
+(conditionally when the client sent ``If-Match``) and rewrite only the
+sections they touch.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from core.cache import LRUCache
+from core.config import settings
+from models.user_document import UserDocument, UserDocumentSection
+
+SETTINGS = "settings"
+PROFILE = "profile"
+
+DEFAULT_SETTINGS = {
+    "notifications": {
+        "pushNotifications": True,
+        "emailNotifications": False,
+        "partnerUpdates": True,
+        "weeklyInsights": True,
+        "soundEnabled": True
+    },
+    "privacy": {
+        "shareProgress": True,
+        "publicProfile": False,
+        "dataCollection": True,
+        "analyticsOptIn": False
+    },
+    "preferences": {
+        "darkMode": False,
+        "language": "English",
+        "hapticFeedback": True
+    },
+    "security": {
+        "biometricAuth": False,
+        "autoLock": False,
+        "twoFactorAuth": False
+    },
+    "data": {
+        "autoBackup": True,
+        "backupFrequency": "weekly",
+        "dataRetention": "1year"
+    },
+    "accessibility": {
+        "screenReader": False,
+        "highContrast": False,
+        "largeText": False
+    }
+}
+
+# Editable profile sections; "stats" is derived from user_stats on read
+PROFILE_SECTIONS = ("personal", "relationship", "preferences", "social")
+
+DOCUMENT_SECTIONS = {
+    SETTINGS: tuple(DEFAULT_SETTINGS),
+    PROFILE: PROFILE_SECTIONS,
+}
+
+
+class StoredDocument(NamedTuple):
+    version: int
+    sections: Dict[str, Dict[str, Any]]
+
+
+class VersionConflict(Exception):
+    """The document changed since the version the client based its edit on."""
+
+
+document_cache = LRUCache("user_documents", max_entries=settings.USER_DOCUMENT_CACHE_SIZE)
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """Apply an RFC 7386 JSON merge patch without mutating ``target``."""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def load_document(db, user_id, name: str) -> StoredDocument:
+    """Return the stored sections of a document, from cache when current."""
+    version = db.execute(
+        select(UserDocument.version).where(UserDocument.user_id == user_id, UserDocument.name == name)
+    ).scalar() or 0
+
+    cached = document_cache.get((user_id, name), version=version)
+    if cached is not None:
+        return cached
+
+    sections = dict(db.execute(
+        select(UserDocumentSection.section, UserDocumentSection.data)
+        .where(UserDocumentSection.user_id == user_id, UserDocumentSection.name == name)
+    ).all()) if version else {}
+    document = StoredDocument(version, sections)
+    document_cache.set((user_id, name), document)
+    return document
+
+
+def _bump_version(db, user_id, name: str, expected_version: Optional[int]) -> int:
+    match = (UserDocument.user_id == user_id, UserDocument.name == name)
+    now = datetime.utcnow()
+
+    if expected_version:
+        result = db.execute(
+            update(UserDocument)
+            .where(*match, UserDocument.version == expected_version)
+            .values(version=UserDocument.version + 1, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            raise VersionConflict()
+        return expected_version + 1
+
+    if expected_version is None:
+        result = db.execute(
+            update(UserDocument)
+            .where(*match)
+            .values(version=UserDocument.version + 1, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            return db.execute(select(UserDocument.version).where(*match)).scalar()
+
+    # First write of this document
+    try:
+        with db.begin_nested():
+            db.add(UserDocument(user_id=user_id, name=name, version=1, updated_at=now))
+    except IntegrityError:
+        if expected_version == 0:
+            raise VersionConflict()
+        return _bump_version(db, user_id, name, None)
+    return 1
+
+
+def write_document(
+    db,
+    user_id,
+    name: str,
+    changes: Dict[str, Optional[Dict[str, Any]]],
+    expected_version: Optional[int] = None,
+    replace: bool = False,
+) -> StoredDocument:
+    """Apply section changes and commit; returns the new stored document.
+
+    With ``replace`` each given section is stored as-is; otherwise it is
+    merge-patched onto the stored section. ``None`` resets a section to its
+    defaults. Raises ``VersionConflict`` if ``expected_version`` is stale.
+    """
+    version = _bump_version(db, user_id, name, expected_version)
+
+    current = dict(db.execute(
+        select(UserDocumentSection.section, UserDocumentSection.data)
+        .where(
+            UserDocumentSection.user_id == user_id,
+            UserDocumentSection.name == name,
+            UserDocumentSection.section.in_(list(changes)),
+        )
+    ).all())
+
+    written: Dict[str, Optional[Dict[str, Any]]] = {}
+    for section, change in changes.items():
+        if change is None:
+            data = None
+        elif replace:
+            data = change
+        else:
+            data = merge_patch(current.get(section, {}), change) or None
+
+        match = (
+            UserDocumentSection.user_id == user_id,
+            UserDocumentSection.name == name,
+            UserDocumentSection.section == section,
+        )
+        if data is None:
+            if section in current:
+                db.execute(delete(UserDocumentSection).where(*match).execution_options(synchronize_session=False))
+        elif section in current:
+            db.execute(
+                update(UserDocumentSection).where(*match).values(data=data)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            db.add(UserDocumentSection(user_id=user_id, name=name, section=section, data=data))
+        written[section] = data
+
+    db.commit()
+
+    key = (user_id, name)
+    cached = document_cache.get(key, version=version - 1)
+    if cached is not None:
+        sections = {**cached.sections, **written}
+        document = StoredDocument(version, {k: v for k, v in sections.items() if v is not None})
+        document_cache.set(key, document)
+        return document
+    document_cache.delete(key)
+    return load_document(db, user_id, name)
+
+
+def render_settings(document: StoredDocument) -> Dict[str, Dict[str, Any]]:
+    """The effective settings: defaults overlaid with the stored sections."""
+    return {
+        section: {**defaults, **document.sections.get(section, {})}
+        for section, defaults in DEFAULT_SETTINGS.items()
+    }
+
+
+def default_profile(user) -> Dict[str, Dict[str, Any]]:
+    return {
+        "personal": {
+            "name": user.email.split('@')[0].title(),
+            "email": user.email,
+            "avatar": "👤",
+            "bio": "Supporting healthy relationships",
+            "location": "",
+            "joinDate": user.created_at.isoformat() if user.created_at else "2024-01-01T00:00:00Z"
+        },
+        "relationship": {
+            "status": "single",
+            "partnerId": None,
+            "relationshipStartDate": None,
+            "communicationGoals": [],
+            "relationshipType": "romantic"
+        },
+        "preferences": {
+            "favoriteTopics": [],
+            "learningStyle": "visual",
+            "communicationLevel": "beginner",
+            "goals": [],
+            "interests": []
+        },
+        "social": {
+            "followers": 0,
+            "following": 0,
+            "posts": 0,
+            "reputation": 0,
+            "level": 1,
+            "isVerified": False,
+            "privacyLevel": "private"
+        }
+    }
+
+
+def render_profile(document: StoredDocument, user, stats: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """The effective profile with the derived stats filled in."""
+    profile = {
+        section: {**defaults, **document.sections.get(section, {})}
+        for section, defaults in default_profile(user).items()
+    }
+    profile["stats"] = {
+        "conversationsAnalyzed": 0,
+        "improvementScore": stats["average_progress"],
+        "streakDays": stats["streak_days"],
+        "partnersConnected": 1 if user.partner_id else 0,
+        "badgesEarned": 0,
+        "totalPoints": 0
+    }
+    profile["social"]["posts"] = stats["posts"]
+    return profile
+
+
+def document_etag(version: int, derived: Optional[Dict[str, Any]] = None) -> str:
+    """ETag for a document version, plus a digest of any derived data."""
+    if derived is None:
+        return f'"{version}"'
+    digest = hashlib.sha256(json.dumps(derived, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    return f'"{version}-{digest}"'
+
+
+def parse_if_match(header: Optional[str]) -> Optional[int]:
+    """Document version named by an If-Match header; None when absent or ``*``.
+
+    Raises ``ValueError`` for a malformed header.
+    """
+    if not header or header.strip() == "*":
+        return None
+    tag = header.split(",")[0].strip().removeprefix("W/").strip('"')
+    return int(tag.split("-")[0])
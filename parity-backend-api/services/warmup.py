@@ -0,0 +1,116 @@
+"""
+Startup warm-up and readiness.
+
+Several things are built lazily on first use: the ORM mappers (including
+the self-referential ``User.partner`` relationship), the pydantic
+adapters behind ``json_response``, pool connections, compiled SQL for
+the read models, the template cache and the bcrypt and JWT code paths.
+``warm_up`` does all of it before the worker takes traffic, so the first
+requests after a deploy cost the same as the rest.
+
+The app's lifespan runs ``warm_up`` in a thread once the server is up.
+``is_ready`` (served at ``/ready``) turns true when it finishes and false
+again at shutdown, so a load balancer only routes to warm workers. A
+failing step is logged and skipped: warm-up only saves latency, and the
+step will simply happen on first use instead.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict
+
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import configure_mappers
+
+from core.config import settings
+from core.database import SessionLocal, engine
+from core.responses import type_adapter
+from core.security import create_access_token, get_password_hash
+from services.read_models import coaching_modules
+from services.templates import template_cache
+
+logger = logging.getLogger("parity.startup")
+
+_ready = threading.Event()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def mark_ready() -> None:
+    _ready.set()
+
+
+def mark_not_ready() -> None:
+    _ready.clear()
+
+
+def build_response_adapters(app) -> None:
+    """Compile the adapter for every route's response model.
+
+    ``json_response`` is called with the same types as ``response_model``,
+    so it finds these in the ``type_adapter`` cache.
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.response_model is not None:
+            type_adapter(route.response_model)
+
+
+def open_pool_connections(count: int) -> None:
+    """Hold ``count`` connections at once so the pool opens that many.
+
+    Capped at the pool size; overflow connections are closed on return.
+    """
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        count = min(count, size())
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def prime_static_caches() -> None:
+    """Load the templates and run the modules read model once."""
+    db = SessionLocal()
+    try:
+        template_cache.get(db)
+        for _ in coaching_modules(db):
+            pass
+    finally:
+        db.close()
+
+
+def exercise_crypto() -> None:
+    get_password_hash("warm-up")
+    create_access_token({"user_id": "warm-up"})
+
+
+def warm_up(app) -> Dict[str, float]:
+    """Run every warm-up step, mark the process ready and return step timings in ms."""
+    steps: Dict[str, Callable[[], None]] = {
+        "mappers": configure_mappers,
+        "response_adapters": lambda: build_response_adapters(app),
+        "pool": lambda: open_pool_connections(settings.WARMUP_POOL_CONNECTIONS),
+        "static_caches": prime_static_caches,
+        "crypto": exercise_crypto,
+    }
+    timings: Dict[str, float] = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("warm-up step failed", extra={"step": name})
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    mark_ready()
+    logger.info("warm-up complete", extra={"total_ms": round(sum(timings.values()), 2), "steps_ms": timings})
+    return timings
@@ -0,0 +1,35 @@
+"""
+Shared fixtures: every test runs against a fresh throwaway SQLite database.
+"""
+
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import main as _  # registers every model on Base
+import models.cache_version, models.rate_limit_bucket  # noqa: F401 - imported lazily by the app
+from core.database import Base, SessionLocal, engine
+from core.request_stats import assert_max_queries as _assert_max_queries
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Pin a query budget: ``with assert_max_queries(3): client.get(...)``."""
+    return lambda limit: _assert_max_queries(limit, engine)
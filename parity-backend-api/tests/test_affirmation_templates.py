@@ -0,0 +1,38 @@
+"""
+ETags of the pre-compressed affirmation templates response.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.security import create_access_token, get_password_hash
+from main import app
+from models.affirmation_template import AffirmationTemplate
+from models.user import User
+
+
+@pytest.fixture
+def client(db):
+    user = User(email="templates@example.com", hashed_password=get_password_hash("password"))
+    db.add(user)
+    db.add_all(
+        AffirmationTemplate(title=f"Template {i}", content="You are doing great. " * 20, category="daily", is_default=True)
+        for i in range(10)
+    )
+    db.commit()
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'user_id': str(user.id)})}"
+    return client
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "identity"])
+def test_not_modified_carries_the_etag_of_the_full_response(client, accept_encoding):
+    headers = {"Accept-Encoding": accept_encoding}
+    full = client.get("/affirmations/templates", headers=headers)
+    assert full.status_code == 200
+    assert full.headers["etag"].startswith("W/") == (accept_encoding == "gzip")
+
+    cached = client.get("/affirmations/templates", headers={**headers, "If-None-Match": full.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == full.headers["etag"]
+    assert cached.headers["vary"] == "Accept-Encoding"
@@ -0,0 +1,204 @@
+"""
+Delivery dispatcher tests with an in-memory transport and a simulated clock.
+"""
+
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from core.security import get_password_hash
+from models.affirmation import Affirmation
+from models.affirmation_delivery import AffirmationDelivery
+from models.user import User
+from services.delivery import (
+    FAILED,
+    PENDING,
+    SENDING,
+    SENT,
+    DeliveryDispatcher,
+    FileTransport,
+    OutboundMessage,
+    Transport,
+    enqueue_delivery,
+)
+
+START = datetime(2026, 1, 5, 8, 0)
+
+
+class MemoryTransport(Transport):
+    """Records sent messages; fails the next ``failures`` sends."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.sent = []
+
+    def send_batch(self, messages):
+        results = []
+        for message in messages:
+            if self.failures:
+                self.failures -= 1
+                results.append("provider unavailable")
+            else:
+                self.sent.append(message)
+                results.append(None)
+        return results
+
+
+class Clock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock(START)
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="delivery@example.com", hashed_password=get_password_hash("password"))
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_dispatcher(clock, transport, **kwargs):
+    kwargs.setdefault("max_attempts", 3)
+    return DeliveryDispatcher(
+        transports={"sms": transport},
+        base_backoff=10.0,
+        lease_seconds=300.0,
+        clock=clock,
+        **kwargs,
+    )
+
+
+def add_delivery(db, user, content="Thinking of you"):
+    affirmation = Affirmation(
+        user_id=user.id, content=content, sent_via="sms", recipient_info={"phone": "+15550100"}
+    )
+    db.add(affirmation)
+    enqueue_delivery(db, affirmation)
+    db.commit()
+    delivery = db.scalars(select(AffirmationDelivery).where(AffirmationDelivery.affirmation_id == affirmation.id)).one()
+    delivery.next_attempt_at = START
+    db.commit()
+    return delivery
+
+
+def test_success(db, user, clock):
+    delivery = add_delivery(db, user)
+    transport = MemoryTransport()
+    dispatcher = make_dispatcher(clock, transport)
+    try:
+        assert dispatcher.run_once() == 1
+        assert dispatcher.run_once() == 0
+    finally:
+        dispatcher.stop()
+
+    assert [message.content for message in transport.sent] == ["Thinking of you"]
+    db.refresh(delivery)
+    assert delivery.status == SENT
+    assert delivery.attempts == 1
+    assert delivery.sent_at == START
+
+
+def test_transient_failure_is_retried_with_backoff(db, user, clock):
+    delivery = add_delivery(db, user)
+    transport = MemoryTransport(failures=1)
+    dispatcher = make_dispatcher(clock, transport)
+    try:
+        assert dispatcher.run_once() == 1
+        db.refresh(delivery)
+        assert delivery.status == PENDING
+        assert delivery.attempts == 1
+        assert delivery.last_error == "provider unavailable"
+        # Half to all of base_backoff after the first attempt
+        assert START + timedelta(seconds=5) <= delivery.next_attempt_at <= START + timedelta(seconds=10)
+
+        # Not due again before the backoff has passed
+        assert dispatcher.run_once() == 0
+        clock.now = delivery.next_attempt_at
+        assert dispatcher.run_once() == 1
+    finally:
+        dispatcher.stop()
+
+    db.refresh(delivery)
+    assert delivery.status == SENT
+    assert delivery.attempts == 2
+    assert len(transport.sent) == 1
+
+
+def test_permanent_failure_after_max_attempts(db, user, clock):
+    delivery = add_delivery(db, user)
+    dispatcher = make_dispatcher(clock, MemoryTransport(failures=10), max_attempts=3)
+    try:
+        for attempt in range(1, 4):
+            assert dispatcher.run_once() == 1
+            db.refresh(delivery)
+            assert delivery.attempts == attempt
+            clock.now = delivery.next_attempt_at
+        assert dispatcher.run_once() == 0
+    finally:
+        dispatcher.stop()
+
+    assert delivery.status == FAILED
+    assert delivery.last_error == "provider unavailable"
+
+
+def test_expired_lease_is_reclaimed(db, user, clock):
+    delivery = add_delivery(db, user)
+    crashed = make_dispatcher(clock, MemoryTransport())
+    session = crashed.session_factory()
+    try:
+        # Claimed, then the worker died before recording an outcome
+        messages = crashed.claim(session)
+    finally:
+        session.close()
+        crashed.stop()
+    assert [message.delivery_id for message in messages] == [delivery.id]
+    db.refresh(delivery)
+    assert delivery.status == SENDING
+
+    transport = MemoryTransport()
+    dispatcher = make_dispatcher(clock, transport)
+    try:
+        # Still leased
+        assert dispatcher.run_once() == 0
+        clock.now = START + timedelta(seconds=300)
+        assert dispatcher.run_once() == 1
+    finally:
+        dispatcher.stop()
+
+    db.refresh(delivery)
+    assert delivery.status == SENT
+    assert len(transport.sent) == 1
+
+
+def test_restarts_after_stop(db, user, clock):
+    dispatcher = make_dispatcher(clock, MemoryTransport())
+    for _ in range(2):
+        dispatcher.start()
+        assert dispatcher._thread.is_alive()
+        dispatcher.stop()
+        assert dispatcher._thread is None
+
+
+def test_file_transport_appends_json_lines(tmp_path):
+    transport = FileTransport(str(tmp_path))
+    messages = [
+        OutboundMessage(uuid.uuid4(), "sms", f"note {i}", {"phone": "+15550100"}, 0)
+        for i in range(2)
+    ]
+    assert transport.send_batch(messages) == [None, None]
+    assert transport.send_batch(messages[:1]) == [None]
+
+    lines = [json.loads(line) for line in (tmp_path / "sms.ndjson").read_text().splitlines()]
+    assert [line["content"] for line in lines] == ["note 0", "note 1", "note 0"]
+    assert lines[0]["recipient"] == {"phone": "+15550100"}
@@ -0,0 +1,145 @@
+"""
+EmailSender against a real SMTP server (aiosmtpd) on localhost.
+"""
+
+import smtplib
+import socket
+import threading
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from services.email import EmailSender, build_message
+
+
+class Inbox:
+    """aiosmtpd handler that keeps every message it accepts."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+    def wait_for(self, count: int, timeout: float = 5.0) -> None:
+        deadline = time.monotonic() + timeout
+        while len(self.messages) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(self.messages) >= count, f"{len(self.messages)} of {count} messages arrived"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def inbox():
+    return Inbox()
+
+
+class SMTPServer:
+    """An aiosmtpd server on a fixed local port that can be restarted."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.hostname = "127.0.0.1"
+        self.port = free_port()
+        self.controller = None
+
+    def start(self) -> None:
+        # A stopped controller's event loop is closed; restart with a new one
+        self.controller = Controller(self.handler, hostname=self.hostname, port=self.port)
+        self.controller.start()
+
+    def stop(self) -> None:
+        self.controller.stop()
+
+
+@pytest.fixture
+def smtp_server(inbox):
+    server = SMTPServer(inbox)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def connects(smtp_server):
+    """Connection factory for the test server that counts its connections."""
+
+    class Factory:
+        count = 0
+        gate = threading.Event()
+
+        def __call__(self):
+            self.gate.wait(5)
+            self.count += 1
+            return smtplib.SMTP(smtp_server.hostname, smtp_server.port, timeout=5)
+
+    factory = Factory()
+    factory.gate.set()
+    return factory
+
+
+def message(i: int):
+    return build_message(f"user{i}@example.com", "Reset your Parity password", f"token {i}")
+
+
+def test_connection_is_reused_across_messages(inbox, connects):
+    sender = EmailSender(connection_factory=connects, connections=1)
+    for i in range(5):
+        assert sender.send(message(i))
+    sender.stop()
+
+    assert len(inbox.messages) == 5
+    assert connects.count == 1
+    assert sender.sent == 5 and sender.failed == 0
+
+
+def test_dropped_connection_is_retried(inbox, connects, smtp_server):
+    sender = EmailSender(connection_factory=connects, connections=1)
+    assert sender.send(message(0))
+    inbox.wait_for(1)
+
+    # The server goes away and comes back; the open connection is dead
+    smtp_server.stop()
+    smtp_server.start()
+    assert sender.send(message(1))
+    sender.stop()
+
+    assert [envelope.rcpt_tos for envelope in inbox.messages] == [["user0@example.com"], ["user1@example.com"]]
+    assert connects.count == 2
+    assert sender.sent == 2 and sender.failed == 0
+
+
+def test_send_returns_false_when_queue_is_full(inbox, connects):
+    connects.gate.clear()
+    sender = EmailSender(connection_factory=connects, connections=1, max_in_flight=2, batch_size=1)
+    try:
+        assert sender.send(message(0))
+        # The worker takes the first message and blocks connecting
+        deadline = time.monotonic() + 5
+        while sender._queue.qsize() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sender.send(message(1))
+        assert sender.send(message(2))
+        assert not sender.send(message(3))
+    finally:
+        connects.gate.set()
+        sender.stop()
+
+    assert len(inbox.messages) == 3
+
+
+def test_stop_sends_everything_queued(inbox, connects):
+    sender = EmailSender(connection_factory=connects, connections=2, batch_size=3)
+    for i in range(20):
+        assert sender.send(message(i))
+    sender.stop()
+
+    assert len(inbox.messages) == 20
+    assert sender.sent == 20
@@ -0,0 +1,11 @@
+"""
+Import-time regression test: ``import main`` must stay within its budget.
+"""
+
+from bench.import_time import BUDGET_MS, measure, total_us
+
+
+def test_import_main_within_budget():
+    # Best of three fresh interpreters, as the bench script reports
+    best_ms = min(total_us(measure("main")) for _ in range(3)) / 1000
+    assert best_ms <= BUDGET_MS, f"import main took {best_ms:.1f} ms, budget {BUDGET_MS:.0f} ms; see python -m bench.import_time"
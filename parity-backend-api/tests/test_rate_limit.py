@@ -0,0 +1,41 @@
+"""
+Login rate limits: per client IP and per account.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core import rate_limit
+from core.config import settings
+from core.rate_limit import MemoryRateLimiter, parse_policy
+from main import app
+
+POLICIES = {"auth": "2/minute", "login": "100/minute", "login_account": "3/minute"}
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "_limiter", MemoryRateLimiter())
+    monkeypatch.setattr(rate_limit, "_policies", {name: parse_policy(name, spec) for name, spec in POLICIES.items()})
+    return TestClient(app)
+
+
+def login(client, email):
+    return client.post("/users/login", data={"username": email, "password": "wrong-password"})
+
+
+def test_login_is_limited_per_account(client):
+    # Well under the per-IP limit, as from an attacker rotating addresses
+    assert [login(client, "target@example.com").status_code for _ in range(4)] == [401, 401, 401, 429]
+    assert login(client, " Target@Example.com").status_code == 429
+    # Other accounts are unaffected
+    assert login(client, "other@example.com").status_code == 401
+
+
+def test_login_has_its_own_bucket(client):
+    for _ in range(2):
+        client.post("/users/forgot-password", json={"email": "someone@example.com"})
+    assert client.post("/users/forgot-password", json={"email": "someone@example.com"}).status_code == 429
+    # Using up the auth bucket leaves login alone
+    assert login(client, "someone@example.com").status_code == 401
@@ -0,0 +1,48 @@
+"""
+Query counting: per-route budgets and failed statements.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from core.request_stats import RequestStats, request_stats
+from core.security import create_access_token, get_password_hash
+from main import app
+from models.user import User
+
+
+@pytest.fixture
+def auth(db):
+    user = User(email="budget@example.com", hashed_password=get_password_hash("password"))
+    db.add(user)
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'user_id': str(user.id)})}"}
+
+
+def test_me_stays_within_budget(auth, assert_max_queries):
+    # Without lifespan, so no background workers share the engine
+    client = TestClient(app)
+    with assert_max_queries(1) as executed:
+        assert client.get("/users/me", headers=auth).status_code == 200
+    assert len(executed) == 1
+
+
+def test_budget_overrun_fails(db, assert_max_queries):
+    with pytest.raises(AssertionError, match="3 queries, expected at most 2"):
+        with assert_max_queries(2):
+            for _ in range(3):
+                db.execute(text("SELECT 1"))
+
+
+def test_failed_statement_does_not_leak_start_time(db):
+    token = request_stats.set(RequestStats())
+    try:
+        connection = db.connection()
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM no_such_table"))
+        assert not connection.info.get("query_started")
+        assert not connection.info.get("slow_query_started")
+    finally:
+        request_stats.reset(token)
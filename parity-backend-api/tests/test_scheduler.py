@@ -0,0 +1,192 @@
+"""
+Scheduler tests driven by a simulated clock through ``run_once``.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, func, select
+
+from core.database import SessionLocal
+from core.security import get_password_hash
+from models.affirmation import Affirmation
+from models.scheduled_affirmation import ScheduledAffirmation
+from models.user import User
+from services.scheduler import AffirmationScheduler
+
+START = datetime(2026, 1, 5, 8, 0)
+
+
+class Clock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, **kwargs) -> None:
+        self.now += timedelta(**kwargs)
+
+
+@pytest.fixture
+def clock():
+    return Clock(START)
+
+
+@pytest.fixture
+def scheduler(clock):
+    return AffirmationScheduler(
+        window=timedelta(minutes=5),
+        poll_interval=timedelta(seconds=5),
+        clock=clock,
+    )
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="scheduled@example.com", hashed_password=get_password_hash("password"))
+    db.add(user)
+    db.commit()
+    return user
+
+
+def add_schedule(db, user, scheduled_at, recurrence=None):
+    schedule = ScheduledAffirmation(
+        user_id=user.id,
+        content="Thinking of you",
+        sent_via="in-app",
+        recipient_info={"name": "Partner"},
+        scheduled_at=scheduled_at,
+        recurrence=recurrence,
+    )
+    db.add(schedule)
+    db.commit()
+    return schedule
+
+
+def sent_count(db) -> int:
+    db.expire_all()
+    return db.scalar(select(func.count()).select_from(Affirmation))
+
+
+def test_one_off_fires_once(db, user, clock, scheduler):
+    schedule = add_schedule(db, user, START + timedelta(minutes=1))
+
+    assert scheduler.run_once() == 0
+    clock.advance(minutes=1)
+    assert scheduler.run_once() == 1
+    for _ in range(3):
+        clock.advance(minutes=10)
+        assert scheduler.run_once() == 0
+
+    assert sent_count(db) == 1
+    db.refresh(schedule)
+    assert schedule.scheduled_at is None
+    assert schedule.last_sent_at == START + timedelta(minutes=1)
+
+
+def test_daily_recurrence_rolls_over(db, user, clock, scheduler):
+    first = START + timedelta(minutes=1)
+    schedule = add_schedule(db, user, first, recurrence="daily")
+
+    clock.now = first
+    assert scheduler.run_once() == 1
+    db.refresh(schedule)
+    assert schedule.scheduled_at == first + timedelta(days=1)
+
+    clock.now = first + timedelta(days=1)
+    assert scheduler.run_once() == 1
+    db.refresh(schedule)
+    assert schedule.scheduled_at == first + timedelta(days=2)
+    assert sent_count(db) == 2
+
+
+def test_missed_occurrences_fire_once_after_downtime(db, user, clock, scheduler):
+    first = START + timedelta(minutes=1)
+    schedule = add_schedule(db, user, first, recurrence="daily")
+
+    clock.now = first + timedelta(days=3, hours=1)
+    assert scheduler.run_once() == 1
+    assert scheduler.run_once() == 0
+
+    db.refresh(schedule)
+    assert schedule.scheduled_at == first + timedelta(days=4)
+    assert sent_count(db) == 1
+
+
+def test_reload_does_not_fire_twice(db, user, clock, scheduler):
+    add_schedule(db, user, START + timedelta(minutes=1))
+    add_schedule(db, user, START + timedelta(minutes=2), recurrence="weekly")
+
+    clock.advance(minutes=2)
+    assert scheduler.run_once() == 2
+
+    # A fresh window at the same instant must not see the fired rows as due
+    scheduler.reload(db, clock.now)
+    assert scheduler.run_once() == 0
+    # Nor must a stale heap entry, e.g. one handed over after it fired
+    scheduler.schedule(db.scalars(select(ScheduledAffirmation.id)).first(), clock.now)
+    assert scheduler.run_once() == 0
+    assert sent_count(db) == 2
+
+
+def test_schedule_created_elsewhere_is_seen_within_poll_interval(db, user, clock, scheduler):
+    assert scheduler.run_once() == 0
+
+    # Inserted without notify_scheduler, as by another process
+    add_schedule(db, user, START + timedelta(seconds=1))
+    clock.advance(seconds=2)
+    assert scheduler.run_once() == 0
+    assert scheduler.seconds_until_next() == pytest.approx(3)
+
+    clock.advance(seconds=3)
+    assert scheduler.run_once() == 1
+    assert sent_count(db) == 1
+
+
+def test_concurrent_schedulers_send_once(db, user, clock, scheduler):
+    schedule = add_schedule(db, user, START, recurrence="daily")
+    other = AffirmationScheduler(window=timedelta(minutes=5), clock=clock)
+
+    # The other scheduler fires between this one's read and its advance,
+    # as a second process would when rows are not locked (SQLite)
+    racing = SessionLocal()
+    raced = []
+
+    @event.listens_for(racing, "do_orm_execute")
+    def fire_elsewhere(state):
+        if state.is_select and not raced:
+            raced.append(True)
+            rows = state.invoke_statement().freeze()
+            assert other.run_once() == 1
+            return rows()
+
+    try:
+        assert scheduler.fire(racing, [schedule.id], clock.now) == 0
+    finally:
+        racing.close()
+    assert raced
+    assert sent_count(db) == 1
+    db.refresh(schedule)
+    assert schedule.scheduled_at == START + timedelta(days=1)
+
+
+def test_restarts_after_stop(db, user, clock, scheduler):
+    for _ in range(2):
+        scheduler.start()
+        assert scheduler._thread.is_alive()
+        scheduler.stop()
+        assert scheduler._thread is None
+
+    # The restarted thread still fires what comes due
+    add_schedule(db, user, START)
+    scheduler.start()
+    try:
+        scheduler.schedule(db.scalars(select(ScheduledAffirmation.id)).one(), START)
+        deadline = time.monotonic() + 5
+        while sent_count(db) == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        scheduler.stop()
+    assert sent_count(db) == 1